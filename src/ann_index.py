@@ -0,0 +1,144 @@
+import numpy as np
+
+
+class AnnIndex:
+    def __init__(self, embed_model, centroids: np.ndarray, list_offsets: np.ndarray, list_word_ids: np.ndarray,
+                 nprobe: int = 16):
+        """
+        Inverted File (IVF) Approximate Nearest Neighbour Index over Word Vectors
+        Word vectors are grouped into lists by their closest centroid, and a lookup only scores
+        the words in the lists whose centroids are closest to the query word
+        :param embed_model: Word embedding model whose vectors are indexed
+        :param centroids: Normalized centroid of each list (num_lists x vector_size)
+        :param list_offsets: Start of each list in list_word_ids, and the end of the last list
+        :param list_word_ids: Word indexes of the embedding model, grouped by list
+        :param nprobe: Number of closest lists scored per lookup
+        """
+        if list_offsets[-1] != len(embed_model.index_to_key):
+            raise ValueError("ANN index was built for a different embedding model vocabulary")
+
+        self.embed_model = embed_model
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_word_ids = list_word_ids
+        self.nprobe = min(nprobe, len(centroids))
+        self.embed_model.fill_norms()
+
+    @classmethod
+    def build(cls, embed_model, num_lists: int = None, sample_size: int = 200000, iterations: int = 10,
+              batch_size: int = 65536, nprobe: int = 16, seed: int = 0):
+        """
+        Cluster the Word Vectors with Spherical k-means and Group Words by Closest Centroid
+        :param embed_model: Word embedding model
+        :param num_lists: Number of lists, default is the square root of the vocabulary size
+        :param sample_size: Number of words used to train the centroids
+        :param iterations: Number of k-means iterations
+        :param batch_size: Number of words scored against the centroids at once, in training and assignment
+        :param nprobe: Number of closest lists scored per lookup
+        :param seed: Random seed
+        :return: ANN Index
+        """
+        embed_model.fill_norms()
+        vocabulary_size = len(embed_model.index_to_key)
+        num_lists = num_lists if num_lists is not None else max(1, int(np.sqrt(vocabulary_size)))
+        random_state = np.random.default_rng(seed)
+
+        # Train Centroids on a Sample of Normalized Vectors
+        sample_ids = np.sort(random_state.choice(vocabulary_size, min(sample_size, vocabulary_size), replace=False))
+        sample = cls.normalized_vectors(embed_model, sample_ids)
+        centroids = sample[random_state.choice(len(sample), num_lists, replace=False)]
+        for _ in range(iterations):
+            assignments = cls.closest_centroids(sample, centroids, batch_size)
+            # Member Sums and Counts of All Lists in One Pass Over the Sample
+            centroid_sums = np.zeros_like(centroids)
+            np.add.at(centroid_sums, assignments, sample)
+            is_empty = np.bincount(assignments, minlength=num_lists) == 0
+            centroids = centroid_sums / np.maximum(np.linalg.norm(centroid_sums, axis=1, keepdims=True), 1e-12)
+            centroids[is_empty] = sample[random_state.integers(len(sample), size=int(is_empty.sum()))]
+
+        # Assign Every Word to its Closest Centroid
+        assignments = np.empty(vocabulary_size, dtype=np.int32)
+        for start in range(0, vocabulary_size, batch_size):
+            word_ids = np.arange(start, min(start + batch_size, vocabulary_size))
+            assignments[word_ids] = cls.closest_centroids(cls.normalized_vectors(embed_model, word_ids), centroids,
+                                                          batch_size)
+
+        list_word_ids = np.argsort(assignments, kind='stable').astype(np.int32)
+        list_offsets = np.zeros(num_lists + 1, dtype=np.int64)
+        list_offsets[1:] = np.cumsum(np.bincount(assignments, minlength=num_lists))
+        return cls(embed_model, centroids, list_offsets, list_word_ids, nprobe)
+
+    @staticmethod
+    def closest_centroids(vectors: np.ndarray, centroids: np.ndarray, batch_size: int) -> np.ndarray:
+        """
+        Closest Centroid of each Vector, Scored in Row Batches so Only a Batch x Centroid Matrix is in Memory
+        :param vectors: Normalized vectors
+        :param centroids: Normalized centroids
+        :param batch_size: Number of vectors scored at once
+        :return: Centroid index of each vector
+        """
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), batch_size):
+            assignments[start:start + batch_size] = np.argmax(vectors[start:start + batch_size] @ centroids.T, axis=1)
+        return assignments
+
+    @classmethod
+    def load(cls, path: str, embed_model, nprobe: int = 16):
+        """
+        Load an ANN Index Saved by save()
+        :param path: ANN index file path (.npz)
+        :param embed_model: Word embedding model the index was built for
+        :param nprobe: Number of closest lists scored per lookup
+        :return: ANN Index
+        """
+        arrays = np.load(path)
+        return cls(embed_model, arrays['centroids'], arrays['list_offsets'], arrays['list_word_ids'], nprobe)
+
+    def save(self, path: str):
+        """
+        Save the Centroids and Lists, Word Vectors Stay in the Embedding Model
+        :param path: ANN index file path (.npz)
+        :return: None
+        """
+        np.savez(path, centroids=self.centroids, list_offsets=self.list_offsets, list_word_ids=self.list_word_ids)
+
+    @staticmethod
+    def normalized_vectors(embed_model, word_ids: np.ndarray) -> np.ndarray:
+        """
+        Unit Length Vectors of the Given Words
+        :param embed_model: Word embedding model
+        :param word_ids: Word indexes
+        :return: Normalized vectors (float32)
+        """
+        vectors = np.asarray(embed_model.vectors[word_ids], dtype=np.float32)
+        return vectors / np.maximum(embed_model.norms[word_ids], 1e-12)[:, np.newaxis]
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.embed_model.key_to_index
+
+    def most_similar(self, term: str, topn: int = 10) -> list:
+        """
+        Approximate Counterpart of KeyedVectors.most_similar for a Single Word
+        :param term: Query Term
+        :param topn: Number of similar words
+        :return: (word, cosine similarity) pairs sorted by similarity, without the term itself,
+                 empty if the term has no word vector
+        """
+        if term not in self:
+            return []
+        term_id = self.embed_model.get_index(term)
+        query_vector = self.normalized_vectors(self.embed_model, np.array([term_id]))[0]
+
+        # Score the Words in the Closest Lists
+        closest_lists = np.argpartition(-(self.centroids @ query_vector), self.nprobe - 1)[:self.nprobe]
+        candidate_ids = np.concatenate([self.list_word_ids[self.list_offsets[list_id]:self.list_offsets[list_id + 1]]
+                                        for list_id in closest_lists])
+        candidate_ids = candidate_ids[candidate_ids != term_id]
+        similarities = self.normalized_vectors(self.embed_model, candidate_ids) @ query_vector
+
+        count = min(topn, len(candidate_ids))
+        if count == 0:
+            return []
+        top_indexes = np.argpartition(-similarities, count - 1)[:count]
+        top_indexes = top_indexes[np.argsort(-similarities[top_indexes])]
+        return [(self.embed_model.index_to_key[candidate_ids[i]], float(similarities[i])) for i in top_indexes]
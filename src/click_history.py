@@ -0,0 +1,93 @@
+from collections import Counter
+import sqlite3
+import threading
+import time
+
+
+class ClickHistoryStore:
+    def __init__(self, path: str = ':memory:', max_entries: int = 100000, max_age_days: float = None):
+        """
+        Durable Store of Clicked Documents per Query, Backed by SQLite
+        Each (query, document) pair is stored once with its click count and last click time
+        :param path: SQLite database path, ':memory:' keeps the history only for this process
+        :param max_entries: Maximum number of (query, document) pairs kept, rare and old pairs are evicted first
+        :param max_age_days: Pairs not clicked for this many days are evicted, None keeps them
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS clicks (query TEXT NOT NULL, doc_id INTEGER NOT NULL, '
+                                'click_count INTEGER NOT NULL, last_clicked REAL NOT NULL, '
+                                'PRIMARY KEY (query, doc_id))')
+        self.connection.commit()
+
+    def record_clicks(self, query: str, doc_ids: list):
+        """
+        Count the Clicks of a Query, Repeated Documents Increase the Count of One Entry
+        :param query: Query without stop words
+        :param doc_ids: Clicked Document IDs
+        :return: None
+        """
+        now = time.time()
+        with self.lock:
+            self.connection.executemany(
+                'INSERT INTO clicks (query, doc_id, click_count, last_clicked) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (query, doc_id) DO UPDATE SET click_count = click_count + excluded.click_count, '
+                'last_clicked = excluded.last_clicked',
+                [(query, int(doc_id), count, now) for doc_id, count in Counter(doc_ids).items()])
+            self.connection.commit()
+
+    def clicked_doc_ids(self, query: str) -> list:
+        """
+        Clicked Documents of a Query, Most Clicked First
+        :param query: Query without stop words
+        :return: Clicked Document IDs
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT doc_id FROM clicks WHERE query = ? '
+                                           'ORDER BY click_count DESC, last_clicked DESC', (query,)).fetchall()
+        return [doc_id for doc_id, in rows]
+
+    def load(self) -> dict:
+        """
+        Read the Whole Click History
+        :return: Query to clicked document IDs, most clicked first
+        """
+        query_clicked_doc_ids = {}
+        with self.lock:
+            rows = self.connection.execute('SELECT query, doc_id FROM clicks '
+                                           'ORDER BY query, click_count DESC, last_clicked DESC').fetchall()
+        for query, doc_id in rows:
+            query_clicked_doc_ids.setdefault(query, []).append(doc_id)
+        return query_clicked_doc_ids
+
+    def evict(self) -> int:
+        """
+        Remove Old Entries and, Above the Budget, the Least Clicked Entries Down to 90% of the Budget
+        :return: Number of removed entries
+        """
+        with self.lock:
+            removed = 0
+            if self.max_age_days is not None:
+                removed += self.connection.execute('DELETE FROM clicks WHERE last_clicked < ?',
+                                                   (time.time() - self.max_age_days * 86400,)).rowcount
+
+            entry_count = self.connection.execute('SELECT COUNT(*) FROM clicks').fetchone()[0]
+            if entry_count > self.max_entries:
+                removed += self.connection.execute(
+                    'DELETE FROM clicks WHERE rowid IN (SELECT rowid FROM clicks '
+                    'ORDER BY click_count ASC, last_clicked ASC LIMIT ?)',
+                    (entry_count - int(self.max_entries * 0.9),)).rowcount
+            self.connection.commit()
+        return removed
+
+    def close(self):
+        """
+        Close the Database Connection
+        :return: None
+        """
+        self.connection.close()
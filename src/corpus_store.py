@@ -0,0 +1,67 @@
+import pandas as pd
+
+DISPLAY_COLUMNS = ('Name', 'Link', 'Content')
+INDEX_COLUMNS = ('Name', 'Data')
+PARQUET_EXTENSIONS = ('.parquet',)
+ARROW_EXTENSIONS = ('.arrow', '.feather')
+
+
+def read_corpus_columns(corpus_path: str, columns: tuple):
+    """
+    Read Some Columns of a CSV, Parquet or Arrow Corpus as an Arrow Table
+    Arrow files are memory-mapped, so the columns that are not selected are never read
+    :param corpus_path: Corpus path (.csv, .parquet, .arrow or .feather)
+    :param columns: Column names
+    :return: Arrow table
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if corpus_path.endswith(PARQUET_EXTENSIONS):
+        return pq.read_table(corpus_path, columns=list(columns), memory_map=True)
+    if corpus_path.endswith(ARROW_EXTENSIONS):
+        return pa.ipc.open_file(pa.memory_map(corpus_path)).read_all().select(list(columns))
+    return pa.Table.from_pandas(pd.read_csv(corpus_path, usecols=list(columns), dtype=str)[list(columns)],
+                                preserve_index=False)
+
+
+class CorpusStore:
+    def __init__(self, corpus_path: str, display_columns: tuple = DISPLAY_COLUMNS):
+        """
+        Display Fields of the Corpus, Read Without the Review Data Column
+        Rows are fetched by document id when results are shown, Data is only read to build the index
+        :param corpus_path: Corpus path (.csv, .parquet, .arrow or .feather)
+        :param display_columns: Columns kept for displaying results
+        """
+        self.corpus_path = corpus_path
+        self.display_columns = display_columns
+        self.display_table = read_corpus_columns(corpus_path, display_columns)
+
+    def __len__(self):
+        return self.display_table.num_rows
+
+    def get(self, doc_id: int) -> dict:
+        """
+        Display Fields of a Document
+        :param doc_id: Document ID (row position in the corpus)
+        :return: Column name - value mapping, missing values are None
+        """
+        return self.get_rows([doc_id])[0]
+
+    def get_rows(self, doc_ids: list) -> list:
+        """
+        Display Fields of Several Documents in the Given Order
+        :param doc_ids: Document IDs
+        :return: Column name - value mappings
+        """
+        return self.display_table.take([int(doc_id) for doc_id in doc_ids]).to_pylist()
+
+    def read_index_data(self) -> pd.DataFrame:
+        """
+        Read the Name and Data Columns the Index is Built From
+        The caller should drop the frame once the ranking model is built
+        :return: Corpus with the index columns
+        """
+        if self.corpus_path.endswith(PARQUET_EXTENSIONS + ARROW_EXTENSIONS):
+            return read_corpus_columns(self.corpus_path, INDEX_COLUMNS).to_pandas()
+        return pd.read_csv(self.corpus_path, usecols=list(INDEX_COLUMNS), dtype=str)[list(INDEX_COLUMNS)]
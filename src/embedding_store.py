@@ -0,0 +1,66 @@
+import os
+import numpy as np
+
+VOCABULARY_FILE_NAME = 'vocabulary.txt'
+VECTORS_FILE_NAME = 'vectors.npy'
+
+
+def is_embedding_store(path: str) -> bool:
+    """
+    Check Whether the Path is a Compact Embedding Store Directory
+    :param path: Embedding model path
+    :return: True if the path contains a store written by build_embedding_store
+    """
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, VECTORS_FILE_NAME)) \
+        and os.path.exists(os.path.join(path, VOCABULARY_FILE_NAME))
+
+
+def build_embedding_store(embed_model, keep_words: set, top_k: int, out_path: str, batch_size: int = 65536):
+    """
+    Write a Vocabulary Restricted Copy of the Embedding Model with Pre-Normalized float32 Vectors
+    :param embed_model: Word embedding model (KeyedVectors)
+    :param keep_words: Words kept in addition to the most frequent ones
+    :param top_k: Number of most frequent words kept
+    :param out_path: Output store directory
+    :param batch_size: Number of vectors normalized at once
+    :return: Number of words in the store
+    """
+    # Keep the Frequency Order of the Source Model
+    word_ids = set(range(min(top_k, len(embed_model.index_to_key))))
+    word_ids.update(embed_model.key_to_index[word] for word in keep_words if word in embed_model.key_to_index)
+    word_ids = np.array(sorted(word_ids), dtype=np.int64)
+
+    os.makedirs(out_path, exist_ok=True)
+    vectors = np.lib.format.open_memmap(os.path.join(out_path, VECTORS_FILE_NAME), mode='w+', dtype=np.float32,
+                                        shape=(len(word_ids), embed_model.vector_size))
+    for start in range(0, len(word_ids), batch_size):
+        batch = np.asarray(embed_model.vectors[word_ids[start:start + batch_size]], dtype=np.float32)
+        vectors[start:start + len(batch)] = batch / np.maximum(np.linalg.norm(batch, axis=1), 1e-12)[:, np.newaxis]
+    vectors.flush()
+
+    with open(os.path.join(out_path, VOCABULARY_FILE_NAME), 'w', encoding='utf-8') as vocabulary_file:
+        for word_id in word_ids:
+            vocabulary_file.write(embed_model.index_to_key[word_id] + '\n')
+    return len(word_ids)
+
+
+def load_embedding_store(path: str):
+    """
+    Open a Compact Embedding Store, Vectors are Memory-Mapped and Shared Between Processes
+    :param path: Store directory
+    :return: Word embedding model (KeyedVectors)
+    """
+    from gensim.models import KeyedVectors
+
+    vectors = np.load(os.path.join(path, VECTORS_FILE_NAME), mmap_mode='r')
+    with open(os.path.join(path, VOCABULARY_FILE_NAME), encoding='utf-8') as vocabulary_file:
+        words = vocabulary_file.read().split('\n')[:-1]
+
+    embed_model = KeyedVectors(vector_size=vectors.shape[1])
+    embed_model.index_to_key = words
+    embed_model.key_to_index = {word: i for i, word in enumerate(words)}
+    embed_model.vectors = vectors
+
+    # Vectors are Stored Unit Length, so Norms do not Need a Pass over the Matrix
+    embed_model.norms = np.ones(len(words), dtype=np.float32)
+    return embed_model
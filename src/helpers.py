@@ -14,4 +14,43 @@ def remove_punctuation(text:string):
     :return: updated text
     """
     translator = str.maketrans('', '', string.punctuation)
-    return text.translate(translator)
\ No newline at end of file
+    return text.translate(translator)
+
+
+MODEL_NAMES = ('mgr_guru', 'supp_model_1', 'supp_model_2')
+INDEX_OPTIONS = ('index_path_name', 'persistent_index', 'analyzer', 'backend')
+EXPANSION_OPTIONS = ('expansion_cache', 'ann_index_path', 'expansion_table_path')
+CLICK_OPTIONS = ('click_history_path', 'max_click_entries', 'max_click_age_days')
+CACHE_OPTIONS = ('result_cache', 'instrumentation')
+
+
+def create_ranking_model(model_name:str, restaurants_data, bm25_parameters:BM25Parameters,
+                         embedding_model_path:str = None, **options):
+    """
+    Create one of the IR Models by Name
+    :param model_name: IR Model Name (mgr_guru, supp_model_1 or supp_model_2)
+    :param restaurants_data: Corpus
+    :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+    :param embedding_model_path: Pretrained word2vec model path, not used by supp_model_1
+    :param options: Index, expansion, click history, result cache and instrumentation options, each model takes the
+                    ones it supports
+    :return: Ranking Model
+    """
+    def select_options(option_names):
+        return {name: options[name] for name in option_names if options.get(name) is not None}
+
+    if model_name == "mgr_guru":
+        from mgr_guru_model import MGRGuru
+        return MGRGuru(restaurants_data=restaurants_data, bm25_parameters=bm25_parameters,
+                       embedding_model_path=embedding_model_path,
+                       **select_options(INDEX_OPTIONS + EXPANSION_OPTIONS + CLICK_OPTIONS + CACHE_OPTIONS))
+    elif model_name == "supp_model_1":
+        from supplementer_model_1 import ModelWithoutQueryExpansion
+        return ModelWithoutQueryExpansion(restaurants_data=restaurants_data, bm25_parameters=bm25_parameters,
+                                          **select_options(INDEX_OPTIONS + CACHE_OPTIONS))
+    elif model_name == "supp_model_2":
+        from supplementer_model_2 import ModelWithEmbedQueryExpansion
+        return ModelWithEmbedQueryExpansion(restaurants_data=restaurants_data, bm25_parameters=bm25_parameters,
+                                            embedding_model_path=embedding_model_path,
+                                            **select_options(INDEX_OPTIONS + EXPANSION_OPTIONS + CACHE_OPTIONS))
+    raise ValueError("Model Name is Invalid! Valid IR Model Names are 'mgr_guru', 'supp_model_1', 'supp_model_2'")
@@ -1,35 +1,323 @@
-from lupyne import engine
+import copy
 import math
 import pandas as pd
 import numpy as np
-import lucene
-from org.apache.lucene.search.similarities import BM25Similarity
 import shutil
-from nltk.stem import PorterStemmer
-from nltk.corpus import stopwords
-import nltk
-nltk.download('stopwords')
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+import threading
 from helpers import BM25Parameters
+from instrumentation import Instrumentation
+from text_analysis import TextAnalyzer, analyze_documents, load_stop_words
+
+MANIFEST_FILE_NAME = 'mgr_guru_manifest.json'
+INDEX_SCHEMA_VERSION = 2
+ANALYZER_NAMES = ('python', 'lucene')
+BACKEND_NAMES = ('lucene', 'sparse')
+# Same as sparse_backend.SPARSE_INDEX_FILE_NAME, not Imported from There so SciPy Stays Lazy
+SPARSE_INDEX_FILE_NAME = 'sparse_bm25_index.npz'
+
+# The JVM is Started at Most Once per Process, by the First Index that Needs Lucene
+_lucene_vm_lock = threading.Lock()
+_lucene_vm_env = None
+
+
+def init_lucene_vm():
+    """
+    Start the JVM if it is not Running Yet, Lucene Modules are Imported Here Instead of at Module Import
+    :return: JVM environment
+    """
+    global _lucene_vm_env
+    with _lucene_vm_lock:
+        if _lucene_vm_env is None:
+            import lucene
+            _lucene_vm_env = lucene.getVMEnv() or lucene.initVM()
+    _lucene_vm_env.attachCurrentThread()
+    return _lucene_vm_env
+
+
+def attach_current_thread():
+    """
+    Attach the Calling Thread to the JVM, Needed Before a Worker Thread Calls Lucene
+    Used as a thread pool initializer, does nothing if the JVM was never started
+    :return: None
+    """
+    if _lucene_vm_env is not None:
+        _lucene_vm_env.attachCurrentThread()
+
+
+def create_lucene_analyzer(stop_words: set):
+    """
+    Lucene Analyzer Chain Used for Both Indexing and Query Terms
+    :param stop_words: Stop Words to Remove
+    :return: Analyzer with standard tokenizer, lowercase, stop and Porter stem filters
+    """
+    from lupyne import engine
+    from org.apache.lucene.analysis import CharArraySet, LowerCaseFilter, StopFilter
+    from org.apache.lucene.analysis.en import PorterStemFilter
+    from org.apache.lucene.analysis.standard import StandardTokenizer
+
+    stop_word_set = CharArraySet(len(stop_words), True)
+    for word in stop_words:
+        stop_word_set.add(word)
+    return engine.Analyzer(StandardTokenizer, LowerCaseFilter, lambda tokens: StopFilter(tokens, stop_word_set),
+                           PorterStemFilter)
+
+
+def is_index_directory(path: str) -> bool:
+    """
+    Check Whether a Directory Holds Only an Index Written by IndexInverter, so it is Safe to Delete
+    :param path: Index directory
+    :return: True if the directory is empty or has a manifest, a Lucene segments file or a sparse index
+    """
+    file_names = os.listdir(path)
+    return len(file_names) == 0 or MANIFEST_FILE_NAME in file_names or SPARSE_INDEX_FILE_NAME in file_names \
+        or any(file_name.startswith('segments') for file_name in file_names)
+
+
+class LuceneBackend:
+    def __init__(self, searcher):
+        """
+        Search Backend that Runs Queries on a Lucene Index Searcher
+        Lucene document numbers change when documents are updated or merged, so results are mapped
+        to Restaurant IDs (corpus row positions) through the 'doc_id_value' doc values
+        :param searcher: Lucene index searcher with BM25 similarity
+        """
+        self.searcher = searcher
+        self.num_documents = searcher.numDocs()
+        self.document_frequencies = dict(searcher.terms('content', counts=True))
+        self.doc_ids = np.array(searcher.docvalues('doc_id_value', int).select(list(range(searcher.maxDoc()))),
+                                dtype=np.int64)
+
+    def search(self, query_terms:list, top_k:int = None):
+        """
+        Search the Multi Term Query with Lucene Searcher and Retrieved Sorted Documents
+        Only document ids and scores are read, stored fields are never loaded
+        :param query_terms: Terms List in Given Query
+        :param top_k: Number of top documents, None returns every matching document
+        :return: Sorted Document IDs and their BM25 Scores
+        """
+        from lupyne import engine
+
+        query = engine.Query.any(*[engine.Query.term('content', term) for term in query_terms])
+
+        # With top_k, the Total Hit Count Does not Need to be Exact, so Lucene can Skip Non-Competitive Blocks
+        if top_k is not None:
+            hits = self.searcher.search(query, count=top_k, scores=True, mincount=top_k)
+        else:
+            hits = self.searcher.search(query, scores=True)
+        return self.doc_ids[list(hits.ids)].tolist(), list(hits.scores)
+
+    def lucene_id(self, document_id:int) -> int:
+        """
+        Lucene Document Number of the Live Document of a Restaurant
+        :param document_id: Restaurant ID
+        :return: Lucene document number
+        """
+        from lupyne import engine
+
+        hits = self.searcher.search(engine.Query.term('doc_id', str(document_id)), count=1)
+        if len(hits) == 0:
+            raise KeyError(f"Restaurant ID {document_id} is not in the index")
+        return hits.ids[0]
+
+    def term_vector(self, document_id:int) -> list:
+        """
+        Terms of a Document with their Frequencies, Sorted by Term
+        :param document_id: Restaurant ID
+        :return: (term, frequency) pairs
+        """
+        return list(self.searcher.termvector(self.lucene_id(document_id), 'content', counts=True))
+
+    def with_bm25_parameters(self, bm25_parameters:BM25Parameters):
+        """
+        Backend with Other BM25 Parameters over the Same Index Reader, Nothing is Re-Indexed
+        :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+        :return: Lucene Backend
+        """
+        from lupyne import engine
+        from org.apache.lucene.search.similarities import BM25Similarity
+
+        backend = copy.copy(self)
+        backend.searcher = engine.IndexSearcher(self.searcher.indexReader)
+        backend.searcher.setSimilarity(BM25Similarity(bm25_parameters.k1, bm25_parameters.b))
+        return backend
+
+    def term_count(self) -> int:
+        """
+        Number of Distinct Index Terms
+        :return: Term count
+        """
+        return len(self.document_frequencies)
+
 
 class IndexInverter:
-    def __init__(self, restaurants_data:pd.DataFrame, bm25_parameters: BM25Parameters):
+    def __init__(self, restaurants_data:pd.DataFrame, bm25_parameters: BM25Parameters,
+                 index_path_name: str = 'temp', persistent_index: bool = False, num_workers: int = None,
+                 analyzer: str = 'python', backend: str = 'lucene', instrumentation: Instrumentation = None):
         """
-        Store & Search Engine based on Java Lucene
+        Store & Search Engine based on Java Lucene, or on an in memory sparse BM25 matrix
         :param restaurants_data: Corpus
         :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+        :param index_path_name: Lucene Directory that Stores Documents
+        :param persistent_index: Reuse the Lucene Directory between runs if its manifest matches the corpus
+        :param num_workers: Number of processes that analyze documents while indexing, default is CPU count
+        :param analyzer: 'python' stems with NLTK before indexing, 'lucene' analyzes documents and queries
+                         with a single Lucene analyzer chain
+        :param backend: 'lucene' searches a Lucene index, 'sparse' searches a SciPy term-document matrix
+                        without starting the JVM (python analyzer only)
+        :param instrumentation: Stage latency and hit count histograms, a new one is created if not given
         """
-        lucene.initVM()
+        if analyzer not in ANALYZER_NAMES:
+            raise ValueError(f"Analyzer Name is Invalid! Valid Analyzer Names are {ANALYZER_NAMES}")
+        if backend not in BACKEND_NAMES:
+            raise ValueError(f"Backend Name is Invalid! Valid Backend Names are {BACKEND_NAMES}")
+        if backend == 'sparse' and analyzer == 'lucene':
+            raise ValueError("The sparse backend only supports the python analyzer")
+        if backend == 'lucene':
+            init_lucene_vm()
 
-        self.index_path_name = 'temp'
+        self.index_path_name = index_path_name
+        self.persistent_index = persistent_index
         self.bm25_parameters = bm25_parameters
-        self.indexer = engine.Indexer(self.index_path_name)
+        self.num_workers = num_workers if num_workers is not None else os.cpu_count()
+        self.backend_name = backend
+        self.indexer = None
         self.searcher = None
+        self.has_pending_changes = False
+        self.index_generation = 0
+        self.backend = None
+        self.document_count = 0
+        self.document_frequencies = {}
+        self.top_tf_idf_terms = {}
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+
+        # Initialize Stemmer, Stop Word Model
+        self.analyzer_name = analyzer
+        self.stop_words = load_stop_words()
+        self.text_analyzer = TextAnalyzer(self.stop_words)
+        if self.analyzer_name == 'lucene':
+            self.lucene_analyzer = create_lucene_analyzer(self.stop_words)
+            self.analyzer_settings = {'name': 'lucene', 'tokenizer': 'standard',
+                                      'filters': ['lowercase', 'stop', 'porter_stem'],
+                                      'stop_words': 'nltk_english', 'stop_word_count': len(self.stop_words)}
+        else:
+            self.lucene_analyzer = None
+            self.analyzer_settings = {'name': 'python', 'tokenizer': 'whitespace', 'stop_words': 'nltk_english',
+                                      'stop_word_count': len(self.stop_words), 'stemmer': 'porter',
+                                      'lucene_analyzer': 'StandardAnalyzer'}
+
+        # Open the Stored Index if it Matches the Corpus, Otherwise Store Documents to Lucene Directory
+        manifest = self.build_manifest(restaurants_data)
+        if not (self.persistent_index and self.open_stored_index(manifest)):
+            self.rebuild_index(restaurants_data)
+            if self.persistent_index:
+                self.write_manifest(manifest)
+
+    def build_manifest(self, restaurants_data:pd.DataFrame) -> dict:
+        """
+        Describe the Index that the Given Corpus and Settings Produce
+        :param restaurants_data: Corpus
+        BM25 parameters are a search time setting, so they are not part of it
+        :return: Manifest with corpus hash, analyzer settings and document count
+        """
+        corpus_hashes = pd.util.hash_pandas_object(restaurants_data[['Name', 'Data']].astype(str), index=True)
+        return {'corpus_hash': hashlib.sha256(corpus_hashes.values.tobytes()).hexdigest(),
+                'analyzer': self.analyzer_settings,
+                'backend': self.backend_name,
+                'schema_version': INDEX_SCHEMA_VERSION,
+                'document_count': len(restaurants_data) if self.backend_name == 'sparse'
+                else int(restaurants_data['Data'].notna().sum())}
+
+    def read_manifest(self):
+        """
+        Read the Manifest Stored Next to the Index
+        :return: Manifest, None if there is no stored index
+        """
+        manifest_path = os.path.join(self.index_path_name, MANIFEST_FILE_NAME)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as manifest_file:
+            return json.load(manifest_file)
+
+    def write_manifest(self, manifest:dict):
+        """
+        Write the Manifest After the Index is Committed
+        :param manifest: Manifest of the stored index
+        :return: None
+        """
+        with open(os.path.join(self.index_path_name, MANIFEST_FILE_NAME), 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
 
-        # Initialize Stemmer, Stop Word Model and Store Documents to Lucene Directory
-        self.stemmer = PorterStemmer()
-        self.stop_words = set(stopwords.words('english'))
-        self.store_restaurants_content(restaurants_data)
+    def open_stored_index(self, manifest:dict) -> bool:
+        """
+        Open the Stored Index Without Re-Indexing
+        :param manifest: Manifest expected for the current corpus and settings
+        :return: True if the stored index matches the manifest and is opened
+        """
+        if self.read_manifest() != manifest:
+            return False
 
+        self.open_searcher()
+        if self.backend.num_documents != manifest['document_count']:
+            self.searcher = None
+            self.backend = None
+            return False
+        return True
+
+    def rebuild_index(self, restaurants_data:pd.DataFrame):
+        """
+        Remove Any Stale Index and Store the Corpus From Scratch
+        :param restaurants_data: Corpus
+        :return: None
+        """
+        if os.path.exists(self.index_path_name):
+            self.delete_directory()
+        if self.backend_name == 'sparse':
+            self.store_sparse_content(restaurants_data)
+        else:
+            from lupyne import engine
+            self.indexer = engine.Indexer(self.index_path_name, mode='w', analyzer=self.lucene_analyzer)
+            self.store_restaurants_content(restaurants_data)
+
+    def open_searcher(self, reader=None):
+        """
+        Open Searcher with BM25 Similarity Configuration
+        :param reader: Lucene index reader to search, default opens the committed index directory
+        :return: None
+        """
+        if self.backend_name == 'sparse':
+            from sparse_backend import SparseBM25Backend
+            self.backend = SparseBM25Backend.load(self.index_path_name, self.bm25_parameters)
+        else:
+            from lupyne import engine
+            from org.apache.lucene.search.similarities import BM25Similarity
+            self.searcher = engine.IndexSearcher(reader if reader is not None else self.index_path_name)
+            self.searcher.setSimilarity(BM25Similarity(self.bm25_parameters.k1, self.bm25_parameters.b))
+            self.backend = LuceneBackend(self.searcher)
+        self.load_document_frequencies()
+
+    def set_bm25_parameters(self, bm25_parameters:BM25Parameters):
+        """
+        Search with Other BM25 Parameters Without Re-Indexing
+        :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+        :return: None
+        """
+        self.bm25_parameters = bm25_parameters
+        self.backend = self.backend.with_bm25_parameters(bm25_parameters)
+        if self.backend_name == 'lucene':
+            self.searcher = self.backend.searcher
+
+    def load_document_frequencies(self):
+        """
+        Read Document Frequencies of All Content Terms Once from the Term Dictionary
+        :return: None
+        """
+        self.document_count = self.backend.num_documents
+        self.document_frequencies = self.backend.document_frequencies
+        self.top_tf_idf_terms = {}
 
 
     def store_restaurants_content(self, restaurants_data):
@@ -39,46 +327,208 @@ class IndexInverter:
         :return: None
         """
 
+        from lupyne import engine
+
         # Set Indexer Field Names
-        self.indexer.set('name', stored=True)
-        self.indexer.set('content', engine.Field.Text, stored=True, storeTermVectors=True)
+        self.set_document_fields()
 
-        # Add Document to Index After Preprocessing
-        for name, content in zip(np.array(restaurants_data['Name']), np.array(restaurants_data['Data'].astype(str))):
-            stemmed_content = ' '.join([self.stem_word(word) for word in content.split() if self.check_stop_word(word)])
-            self.indexer.add(name=name, content=stemmed_content)
+        # Rows Without Data are Deleted Restaurants, They Keep their Row so Restaurant IDs Stay Stable
+        doc_ids = np.flatnonzero(restaurants_data['Data'].notna().values).tolist()
+        names = list(restaurants_data['Name'].iloc[doc_ids].astype(str))
+        contents = list(restaurants_data['Data'].iloc[doc_ids].astype(str))
+        if self.analyzer_name == 'lucene':
+            # Lucene Analyzer Chain Tokenizes, Filters and Stems the Raw Content Inside the JVM
+            for doc_id, name, content in zip(doc_ids, names, contents):
+                self.indexer.add(name=name, doc_id=str(doc_id), doc_id_value=doc_id, content=content)
+        else:
+            # Add Documents to Index in Corpus Order While Worker Processes Preprocess the Next Chunks
+            stemmed_contents = analyze_documents(contents, self.stop_words, self.num_workers)
+            for doc_id, name, stemmed_content in zip(doc_ids, names, stemmed_contents):
+                self.indexer.add(name=name, doc_id=str(doc_id), doc_id_value=doc_id, content=stemmed_content)
 
         # Commit writes and refresh searcher
         self.indexer.commit()
 
         # Set Searcher BM25 Similarity Configuration
-        self.searcher = engine.IndexSearcher(self.index_path_name)
-        self.searcher.setSimilarity(BM25Similarity(self.bm25_parameters.k1, self.bm25_parameters.b))
+        self.open_searcher()
 
+    def set_document_fields(self):
+        """
+        Field Settings of the Indexer, the Restaurant ID is a Keyword so Documents can be Replaced
+        :return: None
+        """
+        from lupyne import engine
+
+        self.indexer.set('name', engine.Field.String, stored=True)
+        self.indexer.set('doc_id', engine.Field.String, stored=True)
+        self.indexer.set('doc_id_value', docValuesType='numeric')
+        self.indexer.set('content', engine.Field.Text, stored=True, storeTermVectors=True)
 
-    def search_query_term(self, query_terms:list):
+    def open_writer(self):
         """
-        Search the Multi Term Query with Lucene Searcher and Retrieved Sorted Documents
+        Open the Index for Writing if it was Opened Read Only
+        :return: None
+        """
+        if self.backend_name != 'lucene':
+            raise ValueError("Incremental updates need the lucene backend, rebuild the sparse index instead")
+        if self.indexer is None:
+            from lupyne import engine
+            self.indexer = engine.Indexer(self.index_path_name, mode='a', analyzer=self.lucene_analyzer)
+            self.set_document_fields()
+
+    def analyze_content(self, content:str) -> str:
+        """
+        Content Stored in the Index, Stemmed in Python Unless Lucene Analyzes it
+        :param content: Restaurant data
+        :return: Content to index
+        """
+        return content if self.analyzer_name == 'lucene' else self.text_analyzer.analyze(content)
+
+    def upsert_restaurant(self, name:str, doc_id:int, content:str):
+        """
+        Add a Restaurant or Replace the Document with the Same Restaurant ID (Lucene updateDocument)
+        Names are not unique, so documents are replaced by their Restaurant ID. Changes are searchable after
+        refresh_searcher
+        :param name: Restaurant name
+        :param doc_id: Restaurant ID, the row position of the restaurant in the corpus
+        :param content: Restaurant data
+        :return: None
+        """
+        self.open_writer()
+        self.indexer.update('doc_id', str(doc_id), name=name, doc_id=str(doc_id), doc_id_value=int(doc_id),
+                            content=self.analyze_content(content))
+        self.has_pending_changes = True
+
+    def delete_restaurant(self, doc_id:int):
+        """
+        Delete the Document of a Restaurant (Lucene deleteDocuments), Searchable After refresh_searcher
+        :param doc_id: Restaurant ID
+        :return: None
+        """
+        self.open_writer()
+        self.indexer.delete('doc_id', str(doc_id))
+        self.has_pending_changes = True
+
+    def append_reviews(self, doc_id:int, reviews:str):
+        """
+        Append New Reviews to the Stored Content of a Restaurant and Replace its Document
+        The restaurant keeps its Restaurant ID, changes are searchable after refresh_searcher
+        :param doc_id: Restaurant ID
+        :param reviews: New review text
+        :return: None
+        """
+        from lupyne import engine
+
+        self.open_writer()
+        # The Stored Content is Read Through a Reader that Sees the Earlier Changes of the Batch
+        if self.has_pending_changes:
+            self.refresh_searcher()
+        hits = self.searcher.search(engine.Query.term('doc_id', str(doc_id)), count=1)
+        if len(hits) == 0:
+            raise KeyError(f"Restaurant ID {doc_id} is not in the index")
+        document = self.searcher.get(hits.ids[0], 'name', 'content')
+        self.indexer.update('doc_id', str(doc_id), name=document['name'], doc_id=str(doc_id),
+                            doc_id_value=int(doc_id), content=document['content'] + ' ' + self.analyze_content(reviews))
+        self.has_pending_changes = True
+
+    def refresh_searcher(self, commit:bool = False):
+        """
+        Reopen the Searcher on a Near Real Time Reader of the Writer, so Uncommitted Changes are Searchable
+        The index generation is increased, so results cached before the changes are no longer looked up
+        :param commit: Also commit the changes to the index directory
+        :return: None
+        """
+        from org.apache.lucene.index import DirectoryReader
+
+        if commit:
+            self.indexer.commit()
+        self.open_searcher(DirectoryReader.open(self.indexer))
+        self.has_pending_changes = False
+        self.index_generation += 1
+
+    def apply_corpus_changes(self, changes:pd.DataFrame, updated_restaurants_data:pd.DataFrame = None):
+        """
+        Apply the Changed Rows Written by tools/corpus_diff.py, Then Commit and Refresh the Searcher
+        :param changes: Changed rows with 'Action' (upsert or delete), 'Doc ID', 'Name' and 'Data' columns
+        :param updated_restaurants_data: Corpus after the changes, its manifest is stored for a persistent index
+        :return: Number of upserted and deleted restaurants
+        """
+        counts = {'upsert': 0, 'delete': 0}
+        for action, doc_id, name, content in zip(changes['Action'], changes['Doc ID'], changes['Name'].astype(str),
+                                                 changes['Data'].astype(str)):
+            if action == 'upsert':
+                self.upsert_restaurant(name, int(doc_id), content)
+            elif action == 'delete':
+                self.delete_restaurant(int(doc_id))
+            else:
+                raise ValueError(f"Unknown corpus change action '{action}'")
+            counts[action] += 1
+
+        self.refresh_searcher(commit=True)
+        if self.persistent_index and updated_restaurants_data is not None:
+            self.write_manifest(self.build_manifest(updated_restaurants_data))
+        return counts
+
+    def store_sparse_content(self, restaurants_data):
+        """
+        Store the Term-Document Matrix of the Analyzed Documents to the Index Directory
+        :param restaurants_data: Our Corpus
+        :return: None
+        """
+        from sparse_backend import SparseBM25Backend
+
+        # Deleted Restaurants Have No Data and Become Empty Documents that Never Match
+        contents = list(restaurants_data['Data'].fillna('').astype(str))
+        sparse_backend = SparseBM25Backend.build(analyze_documents(contents, self.stop_words, self.num_workers),
+                                                 self.bm25_parameters)
+        os.makedirs(self.index_path_name)
+        sparse_backend.save(self.index_path_name)
+        self.open_searcher()
+
+
+    def search_query_term(self, query_terms:list, top_k:int = None):
+        """
+        Search the Multi Term Query with the Search Backend and Retrieved Sorted Documents
         :param query_terms: Terms List in Given Query
-        :return: Sorted Document
+        :param top_k: Number of top documents, None returns every matching document
+        :return: Sorted Document IDs and their BM25 Scores
         """
-        query = engine.Query.any(*[engine.Query.term('content', term) for term in query_terms])
-        hits = self.searcher.search(query, scores=True)  # run search and return sequence of documents
-        return hits
+        with self.instrumentation.stage('search'):
+            documents_id, scores = self.backend.search(query_terms, top_k)
+        self.instrumentation.observe('hits', len(documents_id))
+        return documents_id, scores
+
+    def search_query_terms_batch(self, query_terms_list:list, top_k:int = None, num_threads:int = None) -> list:
+        """
+        Search Several Multi Term Queries Concurrently, Lucene Searches Run on JVM Attached Threads
+        :param query_terms_list: Terms List of each Query
+        :param top_k: Number of top documents per query, None returns every matching document
+        :param num_threads: Number of search threads, default is CPU count
+        :return: Sorted Document ID List of each Query, in the order of the queries
+        """
+        def search_document_ids(query_terms):
+            return self.search_query_term(query_terms, top_k)[0]
+
+        num_threads = num_threads if num_threads is not None else os.cpu_count()
+        with ThreadPoolExecutor(max_workers=num_threads, initializer=attach_current_thread) as executor:
+            return list(executor.map(search_document_ids, query_terms_list))
+
     def determine_highest_tf_idf_terms_in_document(self, document_id:int):
         """
-        Determine the Terms with Highest TF/IDF in Given Document
+        Determine the Terms with Highest TF/IDF in Given Document, Computed Once per Document
         :param document_id: Restaurant ID
         :return: Terms with Highest TF/IDF  List
         """
-        terms_with_tf = self.searcher.termvector(document_id, 'content',counts=True)
-        document_num = self.searcher.numDocs()
+        if document_id in self.top_tf_idf_terms:
+            return self.top_tf_idf_terms[document_id]
+
+        terms_with_tf = self.backend.term_vector(document_id)
 
         terms, tf_idf_values = [], []
         for term, freq in terms_with_tf:
-            document_count = self.searcher.count('content:' + term)
+            document_count = self.document_frequencies.get(term, 0)
             if document_count > 1:
-                idf = math.log(document_num / document_count)
+                idf = math.log(self.document_count / document_count)
                 tf_idf = freq * idf
                 tf_idf_values.append(tf_idf)
                 terms.append(term)
@@ -87,13 +537,46 @@ class IndexInverter:
         if len(sorted_indexes) > 5:
             sorted_indexes = sorted_indexes[:5]
 
-        return np.array(terms)[sorted_indexes]
+        self.top_tf_idf_terms[document_id] = np.array(terms)[sorted_indexes]
+        return self.top_tf_idf_terms[document_id]
+
+    def index_statistics(self) -> dict:
+        """
+        Size of the Stored Index and Size of its Term Dictionary
+        :return: Document count, term count and index size in bytes
+        """
+        size_bytes = sum(os.path.getsize(os.path.join(self.index_path_name, file_name))
+                         for file_name in os.listdir(self.index_path_name))
+        return {'analyzer': self.analyzer_name, 'backend': self.backend_name, 'documents': self.backend.num_documents,
+                'terms': self.backend.term_count(), 'size_bytes': size_bytes}
+
+    def analyze_terms(self, words:list) -> list:
+        """
+        Convert Words to Index Terms with the Same Analysis Used at Index Time
+        :param words: Words of a query or expansion words
+        :return: Index Terms
+        """
+        if self.analyzer_name == 'lucene':
+            return [token.charTerm for token in self.lucene_analyzer.tokens(' '.join(words))]
+        return [self.stem_word(word) for word in words if self.check_stop_word(word)]
+
+    def analyze_query(self, query:str) -> list:
+        """
+        Convert a Query to Index Terms
+        :param query: Query given by User
+        :return: Index Terms
+        """
+        return self.analyze_terms(query.split())
 
     def delete_directory(self):
         """
         Deleting the Lucene Directory that Stores Documents
+        A directory that does not hold an index is never deleted, so a mistyped index path cannot remove other data
         :return: None
         """
+        if not os.path.isdir(self.index_path_name) or not is_index_directory(self.index_path_name):
+            raise ValueError(f"{os.path.abspath(self.index_path_name)} is not an MGR-Guru index directory, "
+                             f"it is not deleted")
         shutil.rmtree(self.index_path_name)
 
     def check_stop_word(self, word:str) -> bool:
@@ -102,7 +585,7 @@ class IndexInverter:
         :param word: Query Term
         :return: False if word is stop word
         """
-        return True if word not in self.stop_words else False
+        return self.text_analyzer.check_stop_word(word)
 
     def stem_word(self, word:str):
         """
@@ -110,4 +593,4 @@ class IndexInverter:
         :param word: Query Term
         :return: Stemmed Word
         """
-        return self.stemmer.stem(word)
\ No newline at end of file
+        return self.text_analyzer.stem_word(word)
\ No newline at end of file
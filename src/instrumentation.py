@@ -0,0 +1,218 @@
+from contextlib import contextmanager
+import bisect
+import json
+import threading
+import time
+
+# Histogram Bucket Upper Bounds, Values Above the Last Bound Fall in the +Inf Bucket
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, 10000)
+
+METRIC_PREFIX = 'mgr_guru'
+METRIC_DESCRIPTIONS = {'stage_seconds': 'Time spent in each search pipeline stage',
+                       'query_terms': 'Number of query index terms before and after expansion',
+                       'feedback_terms': 'Number of TF-IDF terms added from the documents clicked for similar queries',
+                       'clicked_documents': 'Number of documents clicked for the most similar previous query',
+                       'hits': 'Number of documents returned by the search backend'}
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        """
+        Cumulative Bucket Histogram in the Prometheus Format
+        :param buckets: Sorted bucket upper bounds
+        """
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """
+        Add a Value to its Bucket
+        :param value: Observed value
+        :return: None
+        """
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a Quantile by Linear Interpolation Inside its Bucket, Like Prometheus' histogram_quantile
+        :param q: Quantile between 0 and 1
+        :return: Estimated value, None if nothing is observed
+        """
+        if self.count == 0:
+            return None
+        rank, cumulative_count = q * self.count, 0
+        for i, bucket_count in enumerate(self.bucket_counts):
+            if cumulative_count + bucket_count >= rank and bucket_count > 0:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower_bound = self.buckets[i - 1] if i > 0 else 0.0
+                return lower_bound + (self.buckets[i] - lower_bound) * (rank - cumulative_count) / bucket_count
+            cumulative_count += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        """
+        Count, Sum, Mean, Estimated Quantiles and Cumulative Bucket Counts
+        :return: Histogram summary
+        """
+        cumulative_counts, cumulative_count = {}, 0
+        for bound, bucket_count in zip(list(self.buckets) + ['+Inf'], self.bucket_counts):
+            cumulative_count += bucket_count
+            cumulative_counts[str(bound)] = cumulative_count
+        return {'count': self.count, 'sum': self.sum, 'mean': self.sum / self.count if self.count > 0 else None,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'p99': self.quantile(0.99),
+                'buckets': cumulative_counts}
+
+
+class Instrumentation:
+    def __init__(self, trace_log_path: str = None):
+        """
+        Per Stage Latency, Term Count and Hit Count Histograms of the Search Pipeline
+        Can be shared by several models, a trace line per query is appended to trace_log_path if it is given
+        :param trace_log_path: JSON lines file of per query traces, None disables tracing
+        """
+        self.trace_log_path = trace_log_path
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.trace_lock = threading.Lock()
+        self.local = threading.local()
+
+    def observe(self, metric: str, value: float, label_name: str = None, label_value: str = None):
+        """
+        Record a Value in a Histogram, and in the Trace of the Current Query
+        :param metric: Metric name (stage_seconds, query_terms, feedback_terms, clicked_documents or hits)
+        :param value: Observed value
+        :param label_name: Label that splits the metric, such as the stage name
+        :param label_value: Value of the label
+        :return: None
+        """
+        key = (metric, label_name, label_value)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(SECONDS_BUCKETS if metric.endswith('_seconds')
+                                                             else COUNT_BUCKETS)
+            histogram.observe(value)
+
+        trace = getattr(self.local, 'trace', None)
+        if trace is not None:
+            name = metric if label_value is None else f"{metric}.{label_value}"
+            # Stages that Run Several Times in a Query Add Up
+            trace[name] = trace.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time a Pipeline Stage (analyze, expansion, click_matching, feedback_terms, search)
+        :param name: Stage name
+        :return: Context manager
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, 'stage', name)
+
+    @contextmanager
+    def trace(self, model_name: str, query: str, top_k: int = None):
+        """
+        Collect the Stages and Counts of One Query and Record its Total Time
+        The trace line is written when the query finishes, with 'cached' set if no search ran
+        :param model_name: Ranking model name
+        :param query: Query given by User
+        :param top_k: Number of top documents
+        :return: Context manager
+        """
+        outer_trace = getattr(self.local, 'trace', None)
+        self.local.trace = trace = {}
+        start = time.perf_counter()
+        is_failed = True
+        try:
+            yield trace
+            is_failed = False
+        finally:
+            self.local.trace = outer_trace
+            total_seconds = time.perf_counter() - start
+            self.observe('stage_seconds', total_seconds, 'stage', 'total')
+            if self.trace_log_path is not None:
+                self.write_trace({'time': time.time(), 'model': model_name, 'query': query, 'top_k': top_k,
+                                  'total_seconds': total_seconds, 'cached': 'stage_seconds.search' not in trace,
+                                  'failed': is_failed, **trace})
+
+    def write_trace(self, trace: dict):
+        """
+        Append a Trace as One JSON Line
+        :param trace: Stages and counts of a query
+        :return: None
+        """
+        line = json.dumps(trace, ensure_ascii=False)
+        with self.trace_lock:
+            with open(self.trace_log_path, 'a', encoding='utf-8') as trace_file:
+                trace_file.write(line + '\n')
+
+    def snapshot(self) -> dict:
+        """
+        Summary of All Histograms, Grouped by Metric and Label Value
+        :return: JSON serializable snapshot
+        """
+        with self.lock:
+            snapshot = {}
+            for (metric, label_name, label_value), histogram in sorted(self.histograms.items(), key=str):
+                snapshot.setdefault(metric, {})[label_value if label_value is not None else 'all'] = \
+                    histogram.snapshot()
+            return snapshot
+
+    def to_json(self) -> str:
+        """
+        Snapshot as JSON Text
+        :return: JSON text
+        """
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Snapshot in the Prometheus Text Exposition Format
+        :return: Prometheus text
+        """
+        with self.lock:
+            metrics = {}
+            for (metric, label_name, label_value), histogram in sorted(self.histograms.items(), key=str):
+                metrics.setdefault(metric, []).append((label_name, label_value, histogram))
+
+            lines = []
+            for metric, histograms in metrics.items():
+                name = f"{METRIC_PREFIX}_{metric}"
+                lines.append(f"# HELP {name} {METRIC_DESCRIPTIONS.get(metric, metric)}")
+                lines.append(f"# TYPE {name} histogram")
+                for label_name, label_value, histogram in histograms:
+                    labels = f'{label_name}="{label_value}",' if label_name is not None else ''
+                    cumulative_count = 0
+                    for bound, bucket_count in zip(list(histogram.buckets) + ['+Inf'], histogram.bucket_counts):
+                        cumulative_count += bucket_count
+                        lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative_count}')
+                    labels = f'{{{labels[:-1]}}}' if labels else ''
+                    lines.append(f"{name}_sum{labels} {histogram.sum}")
+                    lines.append(f"{name}_count{labels} {histogram.count}")
+            return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """
+        Write the Snapshot, Prometheus Text if the Path Ends with .prom, JSON Otherwise
+        :param path: Output file path
+        :return: None
+        """
+        with open(path, 'w') as metrics_file:
+            metrics_file.write(self.to_prometheus() if path.endswith('.prom') else self.to_json())
+
+    def clear(self):
+        """
+        Remove All Recorded Values
+        :return: None
+        """
+        with self.lock:
+            self.histograms.clear()
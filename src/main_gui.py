@@ -1,16 +1,20 @@
 import sys
 
 from PyQt5 import uic
-from PyQt5.QtCore import QUrl
+from PyQt5.QtCore import QUrl, QThread, pyqtSignal
 from PyQt5.QtGui import QDesktopServices
-from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QDialog, QVBoxLayout, QListWidget, QTextBrowser
+from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QDialog, QVBoxLayout, QListWidget, QTextBrowser, \
+    QMessageBox
 from PyQt5.QtGui import QTextCursor
-import pandas as pd
-from helpers import BM25Parameters, remove_punctuation
+from corpus_store import CorpusStore
+from helpers import BM25Parameters, remove_punctuation, create_ranking_model
+from index_inverter import attach_current_thread
+from instrumentation import Instrumentation
 import urllib.parse
 import argparse
 import csv
 import os
+import traceback
 
 def get_args():
     parser = argparse.ArgumentParser()
@@ -18,28 +22,104 @@ def get_args():
     parser.add_argument('--model_name', default="mgr_guru",
                         type=str, help='IR Model Name (mgr_guru, supp_model_1 or supp_model_2)')
 
-    parser.add_argument('--data_path', default="../data/restaurant_corpus.csv", type=str, help='Corpus path')
+    parser.add_argument('--data_path', default="../data/restaurant_corpus.csv", type=str,
+                        help='Corpus path (.csv, .parquet or .arrow)')
 
     parser.add_argument('--embedding_model_path', default= "../models/GoogleNews-vectors-negative300.bin",
                         type=str, help='word2vec model path')
 
     parser.add_argument('--bm25_parameters', default=[1.2, 0.75], type=list, help='Okapi BM25 parameters (k1 and b)')
+
+    parser.add_argument('--index_path', default="temp", type=str, help='Lucene index directory')
+
+    parser.add_argument('--persistent_index', action='store_true',
+                        help='Keep the index between runs and rebuild it only when the corpus or settings change')
+
+    parser.add_argument('--analyzer', default="python", type=str,
+                        help='Text analysis mode (python: NLTK stemming, lucene: Lucene analyzer chain)')
+
+    parser.add_argument('--backend', default="lucene", type=str,
+                        help='Search backend (lucene: Lucene index, sparse: SciPy BM25 matrix without the JVM)')
+
+    parser.add_argument('--ann_index_path', default=None, type=str,
+                        help='Approximate nearest neighbour index for query expansion (built by tools/build_ann_index.py)')
+
+    parser.add_argument('--expansion_table_path', default=None, type=str,
+                        help='Precomputed query expansion table (built by tools/build_expansion_table.py)')
+
+    parser.add_argument('--click_history_path', default=":memory:", type=str,
+                        help='SQLite file that keeps the MGR-Guru click history between runs')
+
+    parser.add_argument('--max_click_age_days', default=None, type=float,
+                        help='Forget MGR-Guru clicks not repeated for this many days, default keeps them')
+
+    parser.add_argument('--metrics_path', default=None, type=str,
+                        help='File the stage latency histograms are written to on exit (.json or .prom)')
+
+    parser.add_argument('--trace_log_path', default=None, type=str,
+                        help='JSON lines file with the stage timings and term counts of each query')
     args = parser.parse_args()
     return args
 
+class RankingModelLoader(QThread):
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, model_name:str, corpus_store:CorpusStore, model_options:dict):
+        """
+        Builds the Ranking Model in a Background Thread, so the Window Stays Responsive While the Index is Built
+        :param model_name: IR Model Name
+        :param corpus_store: Corpus, its index data is read in the background thread
+        :param model_options: Arguments of create_ranking_model
+        """
+        super().__init__()
+        self.model_name = model_name
+        self.corpus_store = corpus_store
+        self.model_options = model_options
+        self.ranking_model = None
+
+    def run(self):
+        """
+        Build the Ranking Model, Emit loaded with the Model or failed with the Error Message
+        :return: None
+        """
+        try:
+            self.ranking_model = create_ranking_model(self.model_name,
+                                                      restaurants_data=self.corpus_store.read_index_data(),
+                                                      **self.model_options)
+        except Exception as error:
+            traceback.print_exc()
+            self.failed.emit(f"{type(error).__name__}: {error}")
+            return
+        self.loaded.emit(self.ranking_model)
+
 class MainWindow(QMainWindow):
-    def __init__(self,model_name:str , data_path:str , embedding_model_path:str, bm25_parameters:BM25Parameters):
+    def __init__(self,model_name:str , data_path:str , embedding_model_path:str, bm25_parameters:BM25Parameters,
+                 index_path:str = 'temp', persistent_index:bool = False, analyzer:str = 'python',
+                 backend:str = 'lucene', ann_index_path:str = None, expansion_table_path:str = None, click_history_path:str = ':memory:',
+                 max_click_age_days:float = None, metrics_path:str = None, trace_log_path:str = None):
         """
         Main API that accepts query
         :param model_name: IR Model Name
-        :param data_path: path of the document data
+        :param data_path: path of the document data (.csv, .parquet or .arrow)
         :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+        :param index_path: Lucene index directory
+        :param persistent_index: Keep the index between runs
+        :param analyzer: Text analysis mode of the index
+        :param backend: Search backend of the index
+        :param ann_index_path: Approximate nearest neighbour index for query expansion
+        :param expansion_table_path: Precomputed query expansion table
+        :param click_history_path: SQLite file that keeps the click history between runs
+        :param max_click_age_days: Clicks not repeated for this many days are forgotten, None keeps them
+        :param metrics_path: File the stage latency histograms are written to on exit
+        :param trace_log_path: JSON lines file with a trace of each query
         """
 
         super().__init__()
 
         self.model_name = model_name
-        self.restaurant_details = pd.read_csv(data_path, dtype=str)
+        # Only the Display Columns are Kept, the Review Data is Read Once to Build the Index
+        self.corpus_store = CorpusStore(data_path)
         self.query = None
         self.max_number_of_restaurants_in_UI = 10
 
@@ -59,20 +139,42 @@ class MainWindow(QMainWindow):
             self.writer.writerow(['Model Name', 'Query Number', 'Query', 'Model Result', 'Ranking'])
         self.model_name = model_name
 
-        # Model Initialization
-        if model_name == "mgr_guru":
-            from mgr_guru_model import MGRGuru
-            self.ranking_model = MGRGuru(restaurants_data=self.restaurant_details ,bm25_parameters=bm25_parameters,
-                                         embedding_model_path=embedding_model_path)
-        elif model_name == "supp_model_1":
-            from supplementer_model_1 import ModelWithoutQueryExpansion
-            self.ranking_model = ModelWithoutQueryExpansion(restaurants_data=self.restaurant_details ,bm25_parameters=bm25_parameters)
-        elif model_name == "supp_model_2":
-            from supplementer_model_2 import ModelWithEmbedQueryExpansion
-            self.ranking_model = ModelWithEmbedQueryExpansion(restaurants_data=self.restaurant_details, bm25_parameters=bm25_parameters,
-                                                              embedding_model_path=embedding_model_path)
-        else:
-            print("Model Name is Invalid! Valid IR Model Names are 'mgr_guru', 'supp_model_1', 'supp_model_2'")
+        # The Model is Built in a Background Thread, Search is Enabled When the Model is Ready
+        self.ranking_model = None
+        self.metrics_path = metrics_path
+        self.instrumentation = Instrumentation(trace_log_path)
+        self.model_options = dict(bm25_parameters=bm25_parameters, embedding_model_path=embedding_model_path,
+                                  index_path_name=index_path, persistent_index=persistent_index, analyzer=analyzer,
+                                  backend=backend, ann_index_path=ann_index_path,
+                                  expansion_table_path=expansion_table_path, click_history_path=click_history_path,
+                                  max_click_age_days=max_click_age_days, instrumentation=self.instrumentation)
+        self.searchButton.setEnabled(False)
+        self.setWindowTitle("MGR-Guru (Loading Model...)")
+        self.model_loader = RankingModelLoader(self.model_name, self.corpus_store, self.model_options)
+        self.model_loader.loaded.connect(self.on_ranking_model_loaded)
+        self.model_loader.failed.connect(self.on_ranking_model_failed)
+        self.model_loader.start()
+
+    def on_ranking_model_loaded(self, ranking_model):
+        """
+        Enable Search When the Background Thread has Built the Ranking Model
+        :param ranking_model: Ranking Model
+        :return: None
+        """
+        # Searches Run on the GUI Thread, so it is Attached to the JVM the Loader Started
+        attach_current_thread()
+        self.ranking_model = ranking_model
+        self.searchButton.setEnabled(True)
+        self.setWindowTitle("MGR-Guru")
+
+    def on_ranking_model_failed(self, message:str):
+        """
+        Show Why the Ranking Model Could Not be Built, Search Stays Disabled
+        :param message: Error message
+        :return: None
+        """
+        self.setWindowTitle("MGR-Guru (Model Could Not be Loaded)")
+        QMessageBox.critical(self, "MGR-Guru", f"The ranking model could not be loaded.\n\n{message}")
 
     def step(self):
         """
@@ -91,18 +193,14 @@ class MainWindow(QMainWindow):
 
         self.query = remove_punctuation(self.queryText.toPlainText())
         # Calling Document Ranking Model and Get Sorted Document IDs
-        documents_id = self.ranking_model.sort_documents(self.query)
-        if len(documents_id) > self.max_number_of_restaurants_in_UI:
-            documents_id = documents_id[:self.max_number_of_restaurants_in_UI]
-        print(documents_id)
+        documents_id = self.ranking_model.sort_documents(self.query, top_k=self.max_number_of_restaurants_in_UI)
 
         # Showing Sorted Documents
         self.second_window.addResult(" ", " ",
                                      f"Here are {len(documents_id)} restaurants found based on the given query.","")
         self.queries_list.append(self.query)
         query_no = self.queries_list.count(self.query)
-        for i, id in enumerate(documents_id):
-            restaurant = self.restaurant_details.iloc[id]
+        for i, (id, restaurant) in enumerate(zip(documents_id, self.corpus_store.get_rows(documents_id))):
             self.writer.writerow([self.model_name, query_no, self.query ,restaurant['Name'], i+1])
             self.second_window.addResult(restaurant['Name'], restaurant['Link'], restaurant['Content'], id)
 
@@ -115,7 +213,13 @@ class MainWindow(QMainWindow):
         :param event: clicking close button
         :return: None
         """
-        self.ranking_model.index_inverter.delete_directory()
+        # A Model Still Being Built is Awaited, so its Index Directory is not Left Behind
+        self.model_loader.wait()
+        ranking_model = self.model_loader.ranking_model
+        if ranking_model is not None and not ranking_model.index_inverter.persistent_index:
+            ranking_model.index_inverter.delete_directory()
+        if self.metrics_path is not None:
+            self.instrumentation.write(self.metrics_path)
         self.csv_file.close()
         event.accept()
 
@@ -185,6 +289,11 @@ if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = MainWindow(model_name=args.model_name, data_path=args.data_path,
                         embedding_model_path=args.embedding_model_path,
-                        bm25_parameters=BM25Parameters(k1=args.bm25_parameters[0], b=args.bm25_parameters[1]))
+                        bm25_parameters=BM25Parameters(k1=args.bm25_parameters[0], b=args.bm25_parameters[1]),
+                        index_path=args.index_path, persistent_index=args.persistent_index, analyzer=args.analyzer,
+                        backend=args.backend, ann_index_path=args.ann_index_path, expansion_table_path=args.expansion_table_path,
+                        click_history_path=args.click_history_path, max_click_age_days=args.max_click_age_days,
+                        metrics_path=args.metrics_path,
+                        trace_log_path=args.trace_log_path)
     window.show()
     sys.exit(app.exec())
@@ -2,112 +2,248 @@ import pandas as pd
 
 from index_inverter import IndexInverter
 from helpers import BM25Parameters
-from gensim.models import Word2Vec
-from gensim.models import KeyedVectors
-from gensim.utils import simple_preprocess
-from scipy.spatial.distance import cosine
+from query_expansion import ExpansionCache, ExpansionTable, expand_query_terms, expand_query_terms_batch, \
+    load_embedding_model
+from ann_index import AnnIndex
+from click_history import ClickHistoryStore
+from result_cache import ResultCache
+from instrumentation import Instrumentation
 import numpy as np
+import threading
 
 class MGRGuru:
     def __init__(self, restaurants_data:pd.DataFrame , bm25_parameters: BM25Parameters,
-                 embedding_model_path: str):
+                 embedding_model_path: str, index_path_name: str = 'temp', persistent_index: bool = False,
+                 analyzer: str = 'python', backend: str = 'lucene', expansion_cache: ExpansionCache = None,
+                 ann_index_path: str = None, expansion_table_path: str = None,
+                 click_history_path: str = ':memory:', max_click_entries: int = 100000,
+                 max_click_age_days: float = None, result_cache: ResultCache = None, instrumentation: Instrumentation = None):
         """
         IR Model that computes Document Relevance based on Query
         :param restaurants_data: Corpus
         :param bm25_parameters: Okapi BM25 parameters (k1 and b)
         :param embedding_model_path: Pretrained word2vec model path
+        :param index_path_name: Lucene Directory that Stores Documents
+        :param persistent_index: Reuse the Lucene Directory between runs if it matches the corpus
+        :param analyzer: Text analysis mode of the index ('python' or 'lucene')
+        :param backend: Search backend of the index ('lucene' or 'sparse')
+        :param expansion_cache: Expansion cache shared with other models, a new one is created if not given
+        :param ann_index_path: Approximate nearest neighbour index used instead of exact most_similar
+        :param expansion_table_path: Precomputed expansion table, live expansion is only used for words not in it
+        :param click_history_path: SQLite file that keeps query-click history between runs
+        :param max_click_entries: Maximum number of stored (query, clicked document) pairs
+        :param max_click_age_days: Pairs not clicked for this many days are forgotten, None keeps them
+        :param result_cache: Result cache shared with other models, a new one is created if not given
+        :param instrumentation: Stage latency histograms shared with other models, a new one is created if not given
         """
 
-        self.index_inverter = IndexInverter(restaurants_data = restaurants_data, bm25_parameters=bm25_parameters)
-        try:
-            self.embed_model = KeyedVectors.load_word2vec_format(embedding_model_path, binary=True)
-        except:
-            self.embed_model = KeyedVectors.load(embedding_model_path).wv
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.index_inverter = IndexInverter(restaurants_data = restaurants_data, bm25_parameters=bm25_parameters,
+                                            index_path_name=index_path_name, persistent_index=persistent_index,
+                                            analyzer=analyzer, backend=backend, instrumentation=self.instrumentation)
+        self.embed_model = load_embedding_model(embedding_model_path)
+        self.ann_index = AnnIndex.load(ann_index_path, self.embed_model) if ann_index_path is not None else None
 
-        self.previous_query_clicked_links = {}
+        # Load Query-Clicked Documents History
+        self.click_history = ClickHistoryStore(click_history_path, max_entries=max_click_entries,
+                                               max_age_days=max_click_age_days)
+        # Pairs that Expired While the Service was Stopped are Not Loaded
+        self.click_history.evict()
+        self.click_history_lock = threading.Lock()
+        self.load_click_history()
+
+        self.expansion_cache = expansion_cache if expansion_cache is not None else ExpansionCache()
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
 
         # Similarity threshold
         self.embed_similarity_thr = 0.6
         self.query_similarity_thr = 0.7
         self.max_expansion_words = 5
 
+        self.expansion_table = None
+        if expansion_table_path is not None:
+            self.expansion_table = ExpansionTable.load(expansion_table_path)
+            self.expansion_table.check_settings(self.embed_similarity_thr, self.max_expansion_words,
+                                                self.index_inverter.analyzer_settings)
+
 
-    def sort_documents(self, query: str) -> list:
+    def sort_documents(self, query:str, top_k:int = None) -> list:
         """
         Sort Documents based on a given Query
         :param query: Query given by User
+        :param top_k: Number of top documents, None returns every matching document
         :return: Sorted Document ID List
         """
 
-        stemmed_query_terms = [self.index_inverter.stem_word(word) for word in query.split()
-                               if self.index_inverter.check_stop_word(word)]
-
-        # Find Most Similar Terms
-        similar_terms_above_threshold = []
-        query_terms_without_stop_words = [word for word in query.split() if self.index_inverter.check_stop_word(word)]
-        for term in query_terms_without_stop_words:
-            similar_terms = self.embed_model.most_similar(term)
-
-            term_above_threshold = []
-            for word, similarity in similar_terms:
-                if similarity >= self.embed_similarity_thr:
-                    if '_' in word:
-                        split_list = word.split('_')
-                        term_above_threshold.extend(split_list)
-                    else:
-                        term_above_threshold.append(word)
-            if len(term_above_threshold) > self.max_expansion_words:
-                term_above_threshold = term_above_threshold[:self.max_expansion_words]
-
-            similar_terms_above_threshold.extend(term_above_threshold)
-        expanded_terms = [self.index_inverter.stem_word(word) for word in similar_terms_above_threshold if self.index_inverter.check_stop_word(word)]
-
-        # Find Most Similar Queries and Clicked Document IDs
-        highest_tf_idf_terms_from_prev_clicks = []
-        clicked_doc_ids = self.identify_relevant_past_queries_clicked_doc_ids(query)
-        for doc_id in clicked_doc_ids:
-            highest_tf_idf_terms_from_prev_clicks.extend(self.index_inverter.determine_highest_tf_idf_terms_in_document(doc_id))
-
-        # Query Expansion and Ranking
-        expanded_terms = list(set(expanded_terms))
-        stemmed_query_terms.extend(expanded_terms)
-        stemmed_query_terms.extend(highest_tf_idf_terms_from_prev_clicks)
-        stemmed_query_terms = list(np.unique(np.array(stemmed_query_terms)))
-        hits = self.index_inverter.search_query_term(stemmed_query_terms)
-        return [hit.dict()['__id__'] for hit in hits]
-
-    def identify_relevant_past_queries_clicked_doc_ids(self, query:str) -> list:
+        with self.instrumentation.trace(type(self).__name__, query, top_k):
+            with self.instrumentation.stage('analyze'):
+                stemmed_query_terms = self.index_inverter.analyze_query(query)
+            self.instrumentation.observe('query_terms', len(stemmed_query_terms), 'phase', 'analyzed')
+
+            # Find Most Similar Terms
+            with self.instrumentation.stage('expansion'):
+                query_terms_without_stop_words = [word for word in query.split()
+                                                  if self.index_inverter.check_stop_word(word)]
+                expanded_terms = expand_query_terms(self, query_terms_without_stop_words)
+            expanded_terms = list(set(expanded_terms))
+            stemmed_query_terms.extend(expanded_terms)
+            self.instrumentation.observe('query_terms', len(set(stemmed_query_terms)), 'phase', 'expanded')
+
+            # Find Most Similar Queries and Clicked Document IDs, Before the Cache Lookup Since Queries with the
+            # Same Index Terms (e.g. "wine" and "wines") can Match Different Previous Queries
+            with self.instrumentation.stage('click_matching'):
+                query_vector = self.calculate_sentence_vector(' '.join(query_terms_without_stop_words))
+                clicked_doc_ids = self.identify_relevant_past_queries_clicked_doc_ids(query, query_vector)
+            self.instrumentation.observe('clicked_documents', len(clicked_doc_ids))
+
+            def rank_documents():
+                highest_tf_idf_terms_from_prev_clicks = []
+                with self.instrumentation.stage('feedback_terms'):
+                    for doc_id in clicked_doc_ids:
+                        highest_tf_idf_terms_from_prev_clicks.extend(self.index_inverter.determine_highest_tf_idf_terms_in_document(doc_id))
+                self.instrumentation.observe('feedback_terms', len(highest_tf_idf_terms_from_prev_clicks))
+
+                # Query Expansion and Ranking
+                query_terms = list(np.unique(np.array(stemmed_query_terms + highest_tf_idf_terms_from_prev_clicks)))
+                self.instrumentation.observe('query_terms', len(query_terms), 'phase', 'with_feedback')
+                documents_id, _ = self.index_inverter.search_query_term(query_terms, top_k)
+                return documents_id
+
+            # Queries with the Same Index Terms and the Same Clicked Documents Share a Cached Result
+            key = ResultCache.make_key(type(self).__name__, self.index_inverter.bm25_parameters, stemmed_query_terms,
+                                       top_k, clicked_doc_ids, self.index_inverter.index_generation)
+            return self.result_cache.get_or_compute(key, rank_documents, query_vector)
+
+    def sort_documents_batch(self, queries:list, top_k:int = None, num_threads:int = None) -> list:
+        """
+        Sort Documents for Several Queries, Lucene Searches Run Concurrently
+        :param queries: Queries given by Users
+        :param top_k: Number of top documents per query, None returns every matching document
+        :param num_threads: Number of search threads, default is CPU count
+        :return: Sorted Document ID List of each Query
+        """
+        return self.index_inverter.search_query_terms_batch(self.build_query_terms_batch(queries), top_k, num_threads)
+
+    def build_query_terms_batch(self, queries:list) -> list:
+        """
+        Index Terms Searched for Several Queries, They do Not Depend on the BM25 Parameters
+        :param queries: Queries given by Users
+        :return: Terms List of each Query
+        """
+        with self.instrumentation.stage('batch_expansion'):
+            expanded_terms_list = expand_query_terms_batch(self, queries)
+        with self.instrumentation.stage('batch_click_matching'):
+            clicked_doc_ids_list = self.identify_relevant_past_queries_clicked_doc_ids_batch(queries)
+
+        query_terms_list = []
+        for query, expanded_terms, clicked_doc_ids in zip(queries, expanded_terms_list, clicked_doc_ids_list):
+            stemmed_query_terms = self.index_inverter.analyze_query(query)
+            stemmed_query_terms.extend(set(expanded_terms))
+            for doc_id in clicked_doc_ids:
+                stemmed_query_terms.extend(self.index_inverter.determine_highest_tf_idf_terms_in_document(doc_id))
+            query_terms_list.append(list(np.unique(np.array(stemmed_query_terms))))
+        return query_terms_list
+
+    def identify_relevant_past_queries_clicked_doc_ids(self, query:str, sentence_vector=None) -> list:
         """
         Determine the Previous Queries that Similar to the Current Query
         and determine Clicked Document IDs
         :param query: Given Query
+        :param sentence_vector: Sentence vector of the query without stop words, calculated if not given
         :return: Clicked Document Links
         """
 
-        max_similarity = -1000
-        most_similar_prev_query = ""
-        query = ' '.join([word for word in query.split() if self.index_inverter.check_stop_word(word)])
-
-        # Determine Most Similar Previous Query
-        for previous_query, clicked_docs in self.previous_query_clicked_links.items():
-            # Preprocess Query and Previous Query
-            tokens1 = simple_preprocess(query)
-            tokens2 = simple_preprocess(previous_query)
-
-            # Calculate the Sentence Vectors
-            sentence_vec_1 = self.embed_model[tokens1].mean(axis=0)
-            sentence_vec_2 = self.embed_model[tokens2].mean(axis=0)
-            query_similarity = 1 - cosine(sentence_vec_1, sentence_vec_2)
-            if query_similarity > max_similarity:
-                max_similarity = query_similarity
-                most_similar_prev_query = previous_query
-
-        # Determine Clicked Documents
-        clicked_docs =[]
-        if max_similarity > self.query_similarity_thr:
-            clicked_docs = self.previous_query_clicked_links[most_similar_prev_query]
+        if sentence_vector is None:
+            query = ' '.join([word for word in query.split() if self.index_inverter.check_stop_word(word)])
+            sentence_vector = self.calculate_sentence_vector(query)
+        if sentence_vector is None or len(self.previous_queries) == 0:
+            return []
+
+        # Determine Most Similar Previous Query, Cosine Similarity of All Previous Queries at Once
+        with self.click_history_lock:
+            similarities = self.previous_query_vectors[:len(self.previous_queries)] @ sentence_vector
+            most_similar_index = int(np.argmax(similarities))
+
+            # Determine Clicked Documents
+            clicked_docs =[]
+            if similarities[most_similar_index] > self.query_similarity_thr:
+                clicked_docs = self.previous_query_clicked_links[self.previous_queries[most_similar_index]]
         return clicked_docs
 
+    def identify_relevant_past_queries_clicked_doc_ids_batch(self, queries:list) -> list:
+        """
+        Clicked Document IDs of the Most Similar Previous Query of Several Queries, with One Matrix Product
+        :param queries: Given Queries
+        :return: Clicked Document IDs of each Query
+        """
+        clicked_docs_list = [[] for _ in queries]
+        sentence_vectors = [self.calculate_sentence_vector(
+            ' '.join([word for word in query.split() if self.index_inverter.check_stop_word(word)]))
+            for query in queries]
+        query_indexes = [i for i, sentence_vector in enumerate(sentence_vectors) if sentence_vector is not None]
+        if len(query_indexes) == 0:
+            return clicked_docs_list
+
+        with self.click_history_lock:
+            if len(self.previous_queries) == 0:
+                return clicked_docs_list
+            similarities = np.stack([sentence_vectors[i] for i in query_indexes]) @ \
+                self.previous_query_vectors[:len(self.previous_queries)].T
+            most_similar_indexes = np.argmax(similarities, axis=1)
+            for row, i in enumerate(query_indexes):
+                if similarities[row, most_similar_indexes[row]] > self.query_similarity_thr:
+                    clicked_docs_list[i] = self.previous_query_clicked_links[
+                        self.previous_queries[most_similar_indexes[row]]]
+        return clicked_docs_list
+
+    def load_click_history(self):
+        """
+        Read the Stored Click History and Build the Previous Query Matrix
+        :return: None
+        """
+        self.previous_query_clicked_links = self.click_history.load()
+
+        # Normalized Sentence Vectors of the Previous Queries, Row i Belongs to previous_queries[i]
+        self.previous_queries = []
+        self.previous_query_vectors = np.empty((max(16, len(self.previous_query_clicked_links)),
+                                                self.embed_model.vector_size), dtype=np.float32)
+        for previous_query in self.previous_query_clicked_links:
+            self.append_previous_query_vector(previous_query)
+
+    def calculate_sentence_vector(self, query:str):
+        """
+        Calculate the Normalized Mean Word Vector of a Query
+        :param query: Query without stop words
+        :return: Sentence vector, None if no query word has an embedding
+        """
+        from gensim.utils import simple_preprocess
+
+        tokens = [token for token in simple_preprocess(query) if token in self.embed_model.key_to_index]
+        if len(tokens) == 0:
+            return None
+        sentence_vector = np.asarray(self.embed_model[tokens], dtype=np.float32).mean(axis=0)
+        norm = np.linalg.norm(sentence_vector)
+        return sentence_vector / norm if norm > 0 else None
+
+    def append_previous_query_vector(self, previous_query:str):
+        """
+        Add the Sentence Vector of a New Previous Query to the Previous Query Matrix
+        :param previous_query: Previous Query without stop words
+        :return: None
+        """
+        sentence_vector = self.calculate_sentence_vector(previous_query)
+        if sentence_vector is None:
+            return
+
+        # Grow the Matrix Geometrically so Appends Stay Amortized O(1)
+        if len(self.previous_queries) == len(self.previous_query_vectors):
+            grown_vectors = np.empty((2 * len(self.previous_query_vectors), self.previous_query_vectors.shape[1]),
+                                     dtype=np.float32)
+            grown_vectors[:len(self.previous_queries)] = self.previous_query_vectors
+            self.previous_query_vectors = grown_vectors
+        self.previous_query_vectors[len(self.previous_queries)] = sentence_vector
+        self.previous_queries.append(previous_query)
+
     def store_query_clicked_doc_id(self, previous_query:str, previous_clicked_doc_ids:list):
         """
         Store the Query-Clicked Documents Pair
@@ -118,8 +254,25 @@ class MGRGuru:
         query_terms_without_stop_words = [word for word in previous_query.split() if self.index_inverter.check_stop_word(word)]
         query_terms_without_stop_words = ' '.join(query_terms_without_stop_words)
 
-        if query_terms_without_stop_words in self.previous_query_clicked_links:
-            self.previous_query_clicked_links[query_terms_without_stop_words].extend(previous_clicked_doc_ids)
+        # Count Clicks Once per (Query, Document) and Evict Rare or Old Entries Above the Budget
+        self.click_history.record_clicks(query_terms_without_stop_words, previous_clicked_doc_ids)
+        evicted_entry_count = self.click_history.evict()
+
+        with self.click_history_lock:
+            if evicted_entry_count > 0:
+                self.load_click_history()
+            else:
+                is_new_query = query_terms_without_stop_words not in self.previous_query_clicked_links
+                self.previous_query_clicked_links[query_terms_without_stop_words] = \
+                    self.click_history.clicked_doc_ids(query_terms_without_stop_words)
+                if is_new_query:
+                    self.append_previous_query_vector(query_terms_without_stop_words)
+
+        # Remove Cached Results of the Queries that can Match this Query, All of Them if Entries were Evicted
+        if evicted_entry_count > 0:
+            self.result_cache.invalidate(type(self).__name__)
         else:
-            self.previous_query_clicked_links[query_terms_without_stop_words] = previous_clicked_doc_ids
+            query_vector = self.calculate_sentence_vector(query_terms_without_stop_words)
+            if query_vector is not None:
+                self.result_cache.invalidate(type(self).__name__, query_vector, self.query_similarity_thr)
 
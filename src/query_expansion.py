@@ -0,0 +1,283 @@
+from collections import OrderedDict
+import json
+import threading
+import numpy as np
+
+
+def load_embedding_model(embedding_model_path: str):
+    """
+    Load Pretrained Word Vectors (compact embedding store, word2vec binary format or a saved gensim model)
+    :param embedding_model_path: Pretrained word2vec model path
+    :return: Word embedding model (KeyedVectors)
+    """
+    from embedding_store import is_embedding_store, load_embedding_store
+    if is_embedding_store(embedding_model_path):
+        return load_embedding_store(embedding_model_path)
+
+    from gensim.models import KeyedVectors
+    try:
+        return KeyedVectors.load_word2vec_format(embedding_model_path, binary=True)
+    except:
+        return KeyedVectors.load(embedding_model_path).wv
+
+
+def select_expansion_words(similar_terms: list, embed_similarity_thr: float, max_expansion_words: int) -> list:
+    """
+    Select the Similar Words Above the Threshold, Splitting Phrases into Words
+    :param similar_terms: (word, similarity) pairs returned by most_similar
+    :param embed_similarity_thr: Minimum similarity of an expansion word
+    :param max_expansion_words: Maximum number of expansion words per term
+    :return: Expansion Words
+    """
+    term_above_threshold = []
+    for word, similarity in similar_terms:
+        if similarity >= embed_similarity_thr:
+            if '_' in word:
+                split_list = word.split('_')
+                term_above_threshold.extend(split_list)
+            else:
+                term_above_threshold.append(word)
+
+    if len(term_above_threshold) > max_expansion_words:
+        term_above_threshold = term_above_threshold[:max_expansion_words]
+    return term_above_threshold
+
+
+def neighbour_search(ranking_model):
+    """
+    Nearest Neighbour Search Used for Query Expansion
+    :param ranking_model: Ranking model with an embedding model and an optional ANN index
+    :return: ANN index if one is loaded, otherwise the embedding model (exact search)
+    """
+    return ranking_model.ann_index if ranking_model.ann_index is not None else ranking_model.embed_model
+
+
+def expand_query_terms(ranking_model, query_terms: list) -> list:
+    """
+    Index Terms of the Words Most Similar to the Query Terms
+    :param ranking_model: Ranking model with an index, expansion cache, optional expansion table and thresholds
+    :param query_terms: Query Terms without stop words
+    :return: Expanded Index Terms
+    """
+    expanded_terms = []
+    for term in query_terms:
+        table_terms = ranking_model.expansion_table.get(term) if ranking_model.expansion_table is not None else None
+        if table_terms is not None:
+            expanded_terms.extend(table_terms)
+        else:
+            expansion_words = ranking_model.expansion_cache.expand(neighbour_search(ranking_model), term,
+                                                                   ranking_model.embed_similarity_thr,
+                                                                   ranking_model.max_expansion_words)
+            expanded_terms.extend(ranking_model.index_inverter.analyze_terms(expansion_words))
+    return expanded_terms
+
+
+def expand_query_terms_batch(ranking_model, queries: list) -> list:
+    """
+    Expanded Index Terms of Several Queries, Each Distinct Query Term is Expanded Once
+    :param ranking_model: Ranking model with an index, expansion cache, optional expansion table and thresholds
+    :param queries: Queries given by Users
+    :return: Expanded Index Terms of each Query
+    """
+    queries_terms = [[word for word in query.split() if ranking_model.index_inverter.check_stop_word(word)]
+                     for query in queries]
+    distinct_terms = dict.fromkeys(term for query_terms in queries_terms for term in query_terms)
+    expanded_terms_per_term = {term: expand_query_terms(ranking_model, [term]) for term in distinct_terms}
+    return [[expanded_term for term in query_terms for expanded_term in expanded_terms_per_term[term]]
+            for query_terms in queries_terms]
+
+
+class ExpansionCache:
+    def __init__(self, max_size: int = 10000):
+        """
+        Size Bounded LRU Cache of Embedding Based Term Expansions
+        Can be shared by models that use the same embedding model and neighbour search
+        :param max_size: Maximum number of cached terms
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def expand(self, embed_model, term: str, embed_similarity_thr: float, max_expansion_words: int) -> list:
+        """
+        Expansion Words of a Term, most_similar is Only Called on a Cache Miss
+        :param embed_model: Word embedding model or ANN index, anything with a most_similar(term) method
+        :param term: Query Term
+        :param embed_similarity_thr: Minimum similarity of an expansion word
+        :param max_expansion_words: Maximum number of expansion words per term
+        :return: Expansion Words, empty for a term that has no word vector
+        """
+        # A Vocabulary Restricted Store Leaves Many Query Words Without a Vector, They are Not Expanded
+        if term not in embed_model:
+            return []
+
+        key = (term, embed_similarity_thr, max_expansion_words)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return list(self.entries[key])
+            self.misses += 1
+
+        expansion_words = select_expansion_words(embed_model.most_similar(term), embed_similarity_thr,
+                                                 max_expansion_words)
+        with self.lock:
+            self.entries[key] = tuple(expansion_words)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return expansion_words
+
+    def statistics(self) -> dict:
+        """
+        Cache Size and Hit/Miss Counters
+        :return: Cache statistics
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self.entries), 'max_size': self.max_size, 'hits': self.hits,
+                    'misses': self.misses, 'hit_rate': self.hits / lookups if lookups > 0 else 0.0}
+
+    def clear(self):
+        """
+        Remove All Cached Expansions
+        :return: None
+        """
+        with self.lock:
+            self.entries.clear()
+
+
+class ExpansionTable:
+    def __init__(self, entries: dict, settings: dict):
+        """
+        Precomputed Index Term Expansions of Query Words
+        :param entries: Word to expanded index terms
+        :param settings: Thresholds and analyzer settings the table was built with
+        """
+        self.entries = entries
+        self.settings = settings
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Read a Table Written by save()
+        :param path: Expansion table path
+        :return: Expansion Table
+        """
+        entries = {}
+        with open(path, encoding='utf-8') as table_file:
+            settings = json.loads(table_file.readline()[1:])
+            for line in table_file:
+                word, terms = line.rstrip('\n').split('\t')
+                entries[word] = tuple(terms.split()) if len(terms) > 0 else ()
+        return cls(entries, settings)
+
+    def save(self, path: str):
+        """
+        Write the Table as a Settings Header and One 'word<TAB>terms' Line per Word
+        :param path: Expansion table path
+        :return: None
+        """
+        with open(path, 'w', encoding='utf-8') as table_file:
+            table_file.write('#' + json.dumps(self.settings) + '\n')
+            for word, terms in self.entries.items():
+                table_file.write(word + '\t' + ' '.join(terms) + '\n')
+
+    def check_settings(self, embed_similarity_thr: float, max_expansion_words: int, analyzer_settings: dict):
+        """
+        Make Sure the Table Expands Words the Same Way the Model Would
+        :param embed_similarity_thr: Minimum similarity of an expansion word
+        :param max_expansion_words: Maximum number of expansion words per term
+        :param analyzer_settings: Analyzer settings of the index
+        :return: None
+        """
+        expected_settings = {'embed_similarity_thr': embed_similarity_thr, 'max_expansion_words': max_expansion_words,
+                             'analyzer': analyzer_settings}
+        if self.settings != expected_settings:
+            raise ValueError(f"Expansion table was built with {self.settings}, model uses {expected_settings}")
+
+    def get(self, word: str):
+        """
+        Expanded Index Terms of a Query Word
+        :param word: Query Term
+        :return: Expanded index terms, None if the word is not in the table
+        """
+        return self.entries.get(word)
+
+
+def nearest_neighbours(embed_model, word_ids: np.ndarray, topn: int, vocabulary_chunk_size: int = 16384) -> tuple:
+    """
+    Exact Cosine Nearest Neighbours of Several Words, Scored One Vocabulary Chunk at a Time
+    Only a running top-n is kept, so memory is bounded by len(word_ids) x vocabulary_chunk_size similarities
+    instead of a dense matrix over the whole vocabulary
+    :param embed_model: Word embedding model with filled norms
+    :param word_ids: Vocabulary ids of the words
+    :param topn: Number of neighbours per word
+    :param vocabulary_chunk_size: Number of vocabulary words scored at once
+    :return: Neighbour ids and similarities, (len(word_ids), topn) arrays sorted by descending similarity
+    """
+    batch_vectors = np.asarray(embed_model.vectors[word_ids], dtype=np.float32)
+    batch_vectors = batch_vectors / np.maximum(embed_model.norms[word_ids], 1e-12)[:, np.newaxis]
+    rows = np.arange(len(word_ids))[:, np.newaxis]
+    top_ids = np.zeros((len(word_ids), 0), dtype=np.int64)
+    top_similarities = np.zeros((len(word_ids), 0), dtype=np.float32)
+    for start in range(0, len(embed_model.vectors), vocabulary_chunk_size):
+        chunk_vectors = np.asarray(embed_model.vectors[start:start + vocabulary_chunk_size], dtype=np.float32)
+        similarities = batch_vectors @ chunk_vectors.T
+        similarities /= np.maximum(embed_model.norms[start:start + len(chunk_vectors)], 1e-12)
+
+        # Exclude the Word Itself Like most_similar Does
+        is_in_chunk = (word_ids >= start) & (word_ids < start + len(chunk_vectors))
+        similarities[np.flatnonzero(is_in_chunk), word_ids[is_in_chunk] - start] = -np.inf
+
+        if len(chunk_vectors) > topn:
+            chunk_top_ids = np.argpartition(similarities, len(chunk_vectors) - topn, axis=1)[:, -topn:]
+        else:
+            chunk_top_ids = np.broadcast_to(np.arange(len(chunk_vectors)), similarities.shape)
+        candidate_ids = np.concatenate([top_ids, chunk_top_ids + start], axis=1)
+        candidate_similarities = np.concatenate([top_similarities, similarities[rows, chunk_top_ids]], axis=1)
+        kept = np.argsort(-candidate_similarities, axis=1, kind='stable')[:, :topn]
+        top_ids, top_similarities = candidate_ids[rows, kept], candidate_similarities[rows, kept]
+    return top_ids, top_similarities
+
+
+def build_expansion_table(embed_model, words: list, index_inverter, embed_similarity_thr: float,
+                          max_expansion_words: int, ann_index=None, batch_size: int = 1024,
+                          topn: int = 10, vocabulary_chunk_size: int = 16384) -> ExpansionTable:
+    """
+    Precompute the Expanded Index Terms of the Given Words
+    Neighbours are the same top 10 words most_similar returns, found with chunked matrix products per batch
+    :param embed_model: Word embedding model
+    :param words: Query words to precompute
+    :param index_inverter: Index whose analysis turns expansion words into index terms
+    :param embed_similarity_thr: Minimum similarity of an expansion word
+    :param max_expansion_words: Maximum number of expansion words per term
+    :param ann_index: Optional ANN index used instead of the exact matrix product
+    :param batch_size: Number of words scored at once
+    :param topn: Number of neighbours per word
+    :param vocabulary_chunk_size: Number of vocabulary words scored at once, the similarity block of a batch takes
+                                  about batch_size x vocabulary_chunk_size x 12 bytes (192 MB by default)
+    :return: Expansion Table
+    """
+    embed_model.fill_norms()
+    entries = {}
+    for start in range(0, len(words), batch_size):
+        batch_words = words[start:start + batch_size]
+        if ann_index is not None:
+            batch_similar_terms = [ann_index.most_similar(word, topn) for word in batch_words]
+        else:
+            word_ids = np.array([embed_model.key_to_index[word] for word in batch_words], dtype=np.int64)
+            top_ids, top_similarities = nearest_neighbours(embed_model, word_ids, topn, vocabulary_chunk_size)
+            batch_similar_terms = [[(embed_model.index_to_key[i], float(similarity))
+                                    for i, similarity in zip(ids, similarities)]
+                                   for ids, similarities in zip(top_ids, top_similarities)]
+
+        for word, similar_terms in zip(batch_words, batch_similar_terms):
+            expansion_words = select_expansion_words(similar_terms, embed_similarity_thr, max_expansion_words)
+            entries[word] = tuple(index_inverter.analyze_terms(expansion_words))
+
+    settings = {'embed_similarity_thr': embed_similarity_thr, 'max_expansion_words': max_expansion_words,
+                'analyzer': index_inverter.analyzer_settings}
+    return ExpansionTable(entries, settings)
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import threading
+import time
+import numpy as np
+
+
+class ResultCache:
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 3600):
+        """
+        Size and Age Bounded LRU Cache of Ranked Document IDs
+        Concurrent lookups of the same key are collapsed into one computation
+        :param max_size: Maximum number of cached results
+        :param ttl_seconds: Seconds a result stays valid, None keeps results until they are evicted
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name: str, bm25_parameters, query_terms: list, top_k: int = None,
+                 clicked_doc_ids: list = (), index_generation: int = 0) -> tuple:
+        """
+        Cache Key of a Query, Queries with the Same Stemmed and Expanded Terms and Click Feedback Share a Key
+        :param model_name: Ranking model name
+        :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+        :param query_terms: Stemmed query terms and expanded index terms
+        :param top_k: Number of top documents
+        :param clicked_doc_ids: Clicked documents of the matched previous query, their terms are added to the query
+        :param index_generation: Index generation of the searcher, results of an index before its changes do not match
+        :return: Cache key
+        """
+        return model_name, bm25_parameters.k1, bm25_parameters.b, frozenset(str(term) for term in query_terms), \
+            top_k, frozenset(int(doc_id) for doc_id in clicked_doc_ids), index_generation
+
+    def get_or_compute(self, key: tuple, compute, query_vector: np.ndarray = None) -> list:
+        """
+        Cached Result of a Key, compute is Called Once Even if the Key is Requested Concurrently
+        :param key: Cache key
+        :param compute: Function that ranks the documents
+        :param query_vector: Normalized sentence vector of the query, used for click based invalidation
+        :return: Sorted Document ID List
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.is_expired(entry):
+                del self.entries[key]
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry['compute_seconds']
+                return list(entry['documents_id'])
+
+            in_flight = self.in_flight.get(key)
+            if in_flight is None:
+                in_flight = self.in_flight[key] = Future()
+                generation = self.generation
+                self.misses += 1
+                is_owner = True
+            else:
+                self.coalesced += 1
+                is_owner = False
+
+        if not is_owner:
+            return list(in_flight.result())
+
+        start = time.perf_counter()
+        try:
+            documents_id = tuple(compute())
+        except BaseException as error:
+            with self.lock:
+                del self.in_flight[key]
+            in_flight.set_exception(error)
+            raise
+
+        with self.lock:
+            del self.in_flight[key]
+            # Results Computed While an Invalidation Happened may be Stale, so They are Not Stored
+            if generation == self.generation:
+                self.entries[key] = {'documents_id': documents_id, 'query_vector': query_vector,
+                                     'created': time.monotonic(), 'compute_seconds': time.perf_counter() - start}
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+        in_flight.set_result(documents_id)
+        return list(documents_id)
+
+    def is_expired(self, entry: dict) -> bool:
+        """
+        Check Whether an Entry is Older than the TTL
+        :param entry: Cache entry
+        :return: True if the entry is expired
+        """
+        return self.ttl_seconds is not None and time.monotonic() - entry['created'] > self.ttl_seconds
+
+    def invalidate(self, model_name: str, query_vector: np.ndarray = None, similarity_thr: float = None) -> int:
+        """
+        Remove the Results of a Model that Depend on the Click Feedback of a Query
+        :param model_name: Ranking model name
+        :param query_vector: Normalized sentence vector of the query whose feedback changed, None removes all results
+        :param similarity_thr: Results of queries more similar than this to the query are removed
+        :return: Number of removed results
+        """
+        with self.lock:
+            self.generation += 1
+            keys = [key for key in self.entries if key[0] == model_name]
+            if query_vector is not None:
+                keys = [key for key in keys if self.entries[key]['query_vector'] is not None]
+                if len(keys) > 0:
+                    similarities = np.stack([self.entries[key]['query_vector'] for key in keys]) @ query_vector
+                    keys = [key for key, similarity in zip(keys, similarities) if similarity > similarity_thr]
+            for key in keys:
+                del self.entries[key]
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def statistics(self) -> dict:
+        """
+        Cache Size, Hit/Miss Counters and Time Saved by Hits
+        :return: Cache statistics
+        """
+        with self.lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {'size': len(self.entries), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses,
+                    'coalesced': self.coalesced, 'invalidations': self.invalidations,
+                    'hit_rate': (self.hits + self.coalesced) / lookups if lookups > 0 else 0.0,
+                    'saved_seconds': round(self.saved_seconds, 6)}
+
+    def clear(self):
+        """
+        Remove All Cached Results
+        :return: None
+        """
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
@@ -0,0 +1,286 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from corpus_store import CorpusStore
+from helpers import BM25Parameters, remove_punctuation, create_ranking_model, MODEL_NAMES
+from instrumentation import Instrumentation
+
+HTTP_STATUS_TEXTS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                     408: 'Request Timeout', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+MAX_HEADER_COUNT = 100
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--model_name', default="mgr_guru",
+                        type=str, help='IR Model Name (mgr_guru, supp_model_1 or supp_model_2)')
+
+    parser.add_argument('--data_path', default="../data/restaurant_corpus.csv", type=str,
+                        help='Corpus path (.csv, .parquet or .arrow)')
+
+    parser.add_argument('--embedding_model_path', default= "../models/GoogleNews-vectors-negative300.bin",
+                        type=str, help='word2vec model path')
+
+    parser.add_argument('--bm25_parameters', default=[1.2, 0.75], type=float, nargs=2,
+                        help='Okapi BM25 parameters (k1 and b)')
+
+    parser.add_argument('--index_path', default="temp", type=str, help='Lucene index directory')
+
+    parser.add_argument('--persistent_index', action='store_true',
+                        help='Keep the index between runs and rebuild it only when the corpus or settings change')
+
+    parser.add_argument('--analyzer', default="python", type=str, help='Text analysis mode (python or lucene)')
+
+    parser.add_argument('--backend', default="lucene", type=str,
+                        help='Search backend (lucene or sparse, sparse does not start the JVM)')
+
+    parser.add_argument('--ann_index_path', default=None, type=str,
+                        help='Approximate nearest neighbour index for query expansion')
+
+    parser.add_argument('--expansion_table_path', default=None, type=str, help='Precomputed query expansion table')
+
+    parser.add_argument('--click_history_path', default=":memory:", type=str,
+                        help='SQLite file that keeps the MGR-Guru click history between runs')
+
+    parser.add_argument('--max_click_age_days', default=None, type=float,
+                        help='Forget MGR-Guru clicks not repeated for this many days, default keeps them')
+
+    parser.add_argument('--host', default="127.0.0.1", type=str, help='Address the service listens on')
+
+    parser.add_argument('--port', default=8080, type=int, help='Port the service listens on')
+
+    parser.add_argument('--max_concurrency', default=8, type=int,
+                        help='Maximum number of requests processed at the same time')
+
+    parser.add_argument('--num_threads', default=8, type=int,
+                        help='Number of JVM attached threads that run the ranking model')
+
+    parser.add_argument('--trace_log_path', default=None, type=str,
+                        help='JSON lines file with the stage timings and term counts of each query')
+
+    parser.add_argument('--max_top_k', default=100, type=int, help='Largest top_k a search request may ask for')
+
+    parser.add_argument('--max_body_bytes', default=65536, type=int, help='Largest accepted request body')
+
+    parser.add_argument('--read_timeout', default=10, type=float,
+                        help='Seconds a client has to send the headers, and again to send the body, of a request')
+    args = parser.parse_args()
+    return args
+
+
+class SearchService:
+    def __init__(self, ranking_model, corpus_store: CorpusStore, max_concurrency: int = 8,
+                 num_threads: int = 8, default_top_k: int = 10, max_top_k: int = 100,
+                 max_body_bytes: int = 65536, read_timeout: float = 10):
+        """
+        Headless HTTP Service that Serves a Ranking Model with asyncio
+        GET /search?query=...&top_k=10 returns ranked restaurants, POST /click stores clicked documents,
+        GET /stats returns cache counters and stage latencies, GET /metrics returns them in the Prometheus format
+        :param ranking_model: MGRGuru, ModelWithoutQueryExpansion or ModelWithEmbedQueryExpansion
+        :param corpus_store: Display fields of the corpus, used to return names and links of the documents
+        :param max_concurrency: Maximum number of requests processed at the same time
+        :param num_threads: Number of JVM attached threads that run the ranking model
+        :param default_top_k: Number of restaurants returned when the request does not give top_k
+        :param max_top_k: Largest top_k a request may ask for, larger values are answered with 400
+        :param max_body_bytes: Largest request body, larger bodies are answered with 413 without being read
+        :param read_timeout: Seconds to receive the request line and headers, and again to receive the body,
+                             a slower client is answered with 408
+        """
+        from index_inverter import attach_current_thread
+
+        self.ranking_model = ranking_model
+        self.corpus_store = corpus_store
+        self.default_top_k = default_top_k
+        self.max_top_k = max_top_k
+        self.max_body_bytes = max_body_bytes
+        self.read_timeout = read_timeout
+        self.max_concurrency = max_concurrency
+        self.request_slots = None
+        self.executor = ThreadPoolExecutor(max_workers=num_threads, initializer=attach_current_thread)
+
+    async def run_blocking(self, function, *args):
+        """
+        Run Lucene/Embedding Work on the Thread Pool Within the Concurrency Limit
+        :param function: Blocking function
+        :param args: Function arguments
+        :return: Function result
+        """
+        async with self.request_slots:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    def search(self, query: str, top_k: int) -> list:
+        """
+        Rank the Documents and Add Their Display Fields
+        :param query: Query given by User
+        :param top_k: Number of restaurants returned
+        :return: Ranked restaurants
+        """
+        documents_id = self.ranking_model.sort_documents(remove_punctuation(query), top_k=top_k)
+        results = []
+        for i, (doc_id, restaurant) in enumerate(zip(documents_id, self.corpus_store.get_rows(documents_id))):
+            results.append({'rank': i + 1, 'id': int(doc_id), 'name': restaurant['Name'], 'link': restaurant['Link']})
+        return results
+
+    async def handle_request(self, method: str, target: str, body: bytes):
+        """
+        Route a Request to its Endpoint
+        :param method: HTTP method
+        :param target: Request path and query string
+        :param body: Request body
+        :return: HTTP status and response, JSON unless it is already text
+        """
+        url = urlsplit(target)
+        if url.path == '/health':
+            return 200, {'status': 'ok'}
+
+        if url.path == '/stats':
+            statistics = {name: getattr(self.ranking_model, name).statistics()
+                          for name in ('result_cache', 'expansion_cache') if hasattr(self.ranking_model, name)}
+            statistics['instrumentation'] = self.ranking_model.instrumentation.snapshot()
+            return 200, statistics
+
+        if url.path == '/metrics':
+            return 200, self.ranking_model.instrumentation.to_prometheus()
+
+        if url.path == '/search':
+            if method != 'GET':
+                return 405, {'error': 'Use GET for /search'}
+            parameters = parse_qs(url.query)
+            if 'query' not in parameters:
+                return 400, {'error': "Missing 'query' parameter"}
+            query = parameters['query'][0]
+            top_k = parameters.get('top_k', [str(self.default_top_k)])[0]
+            if not top_k.isdigit() or not 1 <= int(top_k) <= self.max_top_k:
+                return 400, {'error': f"'top_k' must be an integer from 1 to {self.max_top_k}"}
+            top_k = int(top_k)
+            return 200, {'query': query, 'results': await self.run_blocking(self.search, query, top_k)}
+
+        if url.path == '/click':
+            if method != 'POST':
+                return 405, {'error': 'Use POST for /click'}
+            if not hasattr(self.ranking_model, 'store_query_clicked_doc_id'):
+                return 400, {'error': 'The ranking model does not use click feedback'}
+            request = json.loads(body)
+            query, doc_ids = remove_punctuation(request['query']), [int(doc_id) for doc_id in request['doc_ids']]
+            await self.run_blocking(self.ranking_model.store_query_clicked_doc_id, query, doc_ids)
+            return 200, {'query': query, 'stored': len(doc_ids)}
+
+        return 404, {'error': f"Unknown path '{url.path}'"}
+
+    @staticmethod
+    async def read_request_head(reader: asyncio.StreamReader) -> tuple:
+        """
+        Read the Request Line and the Headers of a Request
+        :param reader: Connection reader
+        :return: Request line words and headers with lower case names
+        """
+        request_line = (await reader.readline()).decode('latin-1').split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if line == '':
+                break
+            if len(headers) >= MAX_HEADER_COUNT:
+                raise ValueError(f"More than {MAX_HEADER_COUNT} headers")
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return request_line, headers
+
+    async def read_request(self, reader: asyncio.StreamReader) -> tuple:
+        """
+        Read One Request, Each Read is Bounded by read_timeout and the Body by max_body_bytes
+        :param reader: Connection reader
+        :return: HTTP status and error response if the request can not be served, otherwise None, request line
+                 words and body
+        """
+        try:
+            request_line, headers = await asyncio.wait_for(self.read_request_head(reader), self.read_timeout)
+            content_length = headers.get('content-length', '0')
+            if not content_length.isdigit():
+                return (400, {'error': f"Invalid Content-Length '{content_length}'"}), None, None
+            if int(content_length) > self.max_body_bytes:
+                return (413, {'error': f"Request body is larger than {self.max_body_bytes} bytes"}), None, None
+            body = await asyncio.wait_for(reader.readexactly(int(content_length)), self.read_timeout)
+        except asyncio.TimeoutError:
+            return (408, {'error': f"Request was not received in {self.read_timeout} seconds"}), None, None
+        except ValueError as error:
+            # Lines Longer than the Stream Limit Also Raise ValueError
+            return (400, {'error': str(error)}), None, None
+        return None, request_line, body
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Read One HTTP/1.1 Request, Answer it with JSON and Close the Connection
+        :param reader: Connection reader
+        :param writer: Connection writer
+        :return: None
+        """
+        try:
+            request_error, request_line, body = await self.read_request(reader)
+
+            if request_error is not None:
+                status, response = request_error
+            elif len(request_line) < 2:
+                status, response = 400, {'error': 'Malformed request line'}
+            else:
+                try:
+                    status, response = await self.handle_request(request_line[0], request_line[1], body)
+                except (ValueError, KeyError) as error:
+                    status, response = 400, {'error': str(error)}
+                except Exception as error:
+                    status, response = 500, {'error': str(error)}
+
+            if isinstance(response, str):
+                payload, content_type = response.encode('utf-8'), 'text/plain; version=0.0.4'
+            else:
+                payload, content_type = json.dumps(response).encode('utf-8'), 'application/json'
+            writer.write(f"HTTP/1.1 {status} {HTTP_STATUS_TEXTS[status]}\r\n"
+                         f"Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n"
+                         f"Connection: close\r\n\r\n".encode('latin-1') + payload)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        """
+        Accept Connections Until the Process is Stopped
+        :param host: Address the service listens on
+        :param port: Port the service listens on
+        :return: None
+        """
+        self.request_slots = asyncio.Semaphore(self.max_concurrency)
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    args = get_args()
+    if args.model_name not in MODEL_NAMES:
+        raise ValueError(f"Model Name is Invalid! Valid IR Model Names are {MODEL_NAMES}")
+
+    corpus_store = CorpusStore(args.data_path)
+    ranking_model = create_ranking_model(args.model_name, restaurants_data=corpus_store.read_index_data(),
+                                         bm25_parameters=BM25Parameters(k1=args.bm25_parameters[0],
+                                                                        b=args.bm25_parameters[1]),
+                                         embedding_model_path=args.embedding_model_path,
+                                         index_path_name=args.index_path, persistent_index=args.persistent_index,
+                                         analyzer=args.analyzer, backend=args.backend, ann_index_path=args.ann_index_path,
+                                         expansion_table_path=args.expansion_table_path,
+                                         click_history_path=args.click_history_path,
+                                         max_click_age_days=args.max_click_age_days,
+                                         instrumentation=Instrumentation(args.trace_log_path))
+    service = SearchService(ranking_model, corpus_store, max_concurrency=args.max_concurrency,
+                            num_threads=args.num_threads, max_top_k=args.max_top_k,
+                            max_body_bytes=args.max_body_bytes, read_timeout=args.read_timeout)
+    asyncio.run(service.serve(args.host, args.port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+from collections import Counter
+import copy
+import os
+import re
+import numpy as np
+from scipy import sparse
+
+SPARSE_INDEX_FILE_NAME = 'sparse_bm25_index.npz'
+
+# Lucene SmallFloat Encoding of Document Lengths, Lengths Below NUM_FREE_VALUES are Stored Exactly
+NUM_FREE_VALUES = 24
+
+# Word Boundaries of Lucene's StandardTokenizer: Letters and Digits Joined by '.' or Apostrophes, Digits by ','
+TOKEN_PATTERN = re.compile(r"\w+(?:(?:[.'’]|(?<=\d),(?=\d))\w+)*")
+
+
+def long_to_int4(value: int) -> int:
+    """
+    Lucene SmallFloat.longToInt4, Keeps the 4 Most Significant Bits and the Shift
+    :param value: Non negative integer
+    :return: Encoded value
+    """
+    num_bits = value.bit_length()
+    if num_bits < 4:
+        return value
+    shift = num_bits - 4
+    return ((value >> shift) & 0x07) | ((shift + 1) << 3)
+
+
+def int4_to_long(value: int) -> int:
+    """
+    Lucene SmallFloat.int4ToLong, Inverse of long_to_int4
+    :param value: Encoded value
+    :return: Decoded integer
+    """
+    bits = value & 0x07
+    shift = (value >> 3) - 1
+    return bits if shift == -1 else (bits | 0x08) << shift
+
+
+def int_to_byte4(value: int) -> int:
+    """
+    Lucene SmallFloat.intToByte4, the Norm BM25Similarity Stores for a Document Length
+    :param value: Document length
+    :return: Norm byte (0-255)
+    """
+    if value < NUM_FREE_VALUES:
+        return value
+    return NUM_FREE_VALUES + long_to_int4(value - NUM_FREE_VALUES)
+
+
+def byte4_to_int(value: int) -> int:
+    """
+    Lucene SmallFloat.byte4ToInt, the Document Length BM25Similarity Scores With
+    :param value: Norm byte (0-255)
+    :return: Quantized document length
+    """
+    if value < NUM_FREE_VALUES:
+        return value
+    return NUM_FREE_VALUES + int4_to_long(value - NUM_FREE_VALUES)
+
+
+def tokenize(text: str) -> list:
+    """
+    Split Text into Lowercase Tokens the Way StandardAnalyzer (Without Stop Words) Does
+    :param text: Analyzed document text
+    :return: Tokens
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class SparseBM25Backend:
+    def __init__(self, vocabulary: list, term_document: sparse.csr_matrix, document_lengths: np.ndarray,
+                 bm25_parameters):
+        """
+        In Memory BM25 Search over a CSR Term-Document Matrix, Scores Follow Lucene's BM25Similarity
+        :param vocabulary: Sorted index terms, row i of the matrix belongs to vocabulary[i]
+        :param term_document: Term frequencies (terms x documents)
+        :param document_lengths: Number of tokens of each document
+        :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+        """
+        self.vocabulary = vocabulary
+        self.term_ids = {term: i for i, term in enumerate(vocabulary)}
+        self.term_document = term_document
+        self.document_lengths = document_lengths
+        self.bm25_parameters = bm25_parameters
+
+        self.num_documents = term_document.shape[1]
+        self.document_frequencies = dict(zip(vocabulary, np.diff(term_document.indptr).tolist()))
+        self.document_term = term_document.T.tocsr()
+        self.document_term.sort_indices()
+        self.weights = self.compute_weights()
+
+    @classmethod
+    def build(cls, analyzed_contents, bm25_parameters):
+        """
+        Count the Tokens of Analyzed Documents
+        :param analyzed_contents: Analyzed document texts in corpus order
+        :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+        :return: Sparse BM25 Backend
+        """
+        term_ids, rows, columns, frequencies, document_lengths = {}, [], [], [], []
+        for document_id, content in enumerate(analyzed_contents):
+            tokens = tokenize(content)
+            document_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                rows.append(term_ids.setdefault(term, len(term_ids)))
+                columns.append(document_id)
+                frequencies.append(frequency)
+
+        # Rows in Term Order, so Term Vectors are Sorted Like Lucene's
+        vocabulary = sorted(term_ids)
+        term_order = np.empty(len(term_ids), dtype=np.int32)
+        term_order[[term_ids[term] for term in vocabulary]] = np.arange(len(vocabulary), dtype=np.int32)
+        term_document = sparse.csr_matrix(
+            (np.array(frequencies, dtype=np.int32), (term_order[np.array(rows, dtype=np.int32)], columns)),
+            shape=(len(vocabulary), len(document_lengths)))
+        term_document.sort_indices()
+        return cls(vocabulary, term_document, np.array(document_lengths, dtype=np.int64), bm25_parameters)
+
+    @classmethod
+    def load(cls, path: str, bm25_parameters):
+        """
+        Load a Backend Saved by save(), BM25 Weights are Recomputed for the Given Parameters
+        :param path: Index directory
+        :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+        :return: Sparse BM25 Backend
+        """
+        arrays = np.load(os.path.join(path, SPARSE_INDEX_FILE_NAME))
+        term_document = sparse.csr_matrix((arrays['frequencies'], arrays['indices'], arrays['indptr']),
+                                          shape=tuple(arrays['shape']))
+        return cls(arrays['vocabulary'].tolist(), term_document, arrays['document_lengths'], bm25_parameters)
+
+    def save(self, path: str):
+        """
+        Save the Term-Document Matrix and Document Lengths
+        :param path: Index directory
+        :return: None
+        """
+        np.savez(os.path.join(path, SPARSE_INDEX_FILE_NAME), vocabulary=np.array(self.vocabulary),
+                 frequencies=self.term_document.data, indices=self.term_document.indices,
+                 indptr=self.term_document.indptr, shape=np.array(self.term_document.shape),
+                 document_lengths=self.document_lengths)
+
+    def with_bm25_parameters(self, bm25_parameters):
+        """
+        Backend with Other BM25 Parameters that Shares the Term-Document Matrix, Only the Weights are Recomputed
+        :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+        :return: Sparse BM25 Backend
+        """
+        backend = copy.copy(self)
+        backend.bm25_parameters = bm25_parameters
+        backend.weights = backend.compute_weights()
+        return backend
+
+    def compute_weights(self) -> sparse.csr_matrix:
+        """
+        BM25 Score of Every (Term, Document) Pair, Computed in float32 in the Order Lucene Computes it
+        :return: BM25 weights (terms x documents)
+        """
+        k1, b = np.float32(self.bm25_parameters.k1), np.float32(self.bm25_parameters.b)
+
+        # Collection Statistics Count Only Documents that Have Content Tokens
+        field_document_count = int(np.count_nonzero(self.document_lengths))
+        average_length = np.float32(self.document_lengths.sum() / max(field_document_count, 1))
+        document_frequencies = np.diff(self.term_document.indptr).astype(np.float64)
+        idf = np.log(1 + (field_document_count - document_frequencies + 0.5) / (document_frequencies + 0.5))
+
+        # Lucene Scores with the Quantized Length Stored in the Norm, Not the Exact Length
+        quantized_lengths = np.array([byte4_to_int(int_to_byte4(int(length))) for length in self.document_lengths],
+                                     dtype=np.float32)
+        norm_inverse = np.float32(1) / (k1 * ((np.float32(1) - b) + b * quantized_lengths / average_length))
+
+        term_ids = np.repeat(np.arange(len(self.vocabulary)), np.diff(self.term_document.indptr))
+        weight = idf.astype(np.float32)[term_ids]
+        frequencies = self.term_document.data.astype(np.float32)
+        scores = weight - weight / (np.float32(1) + frequencies * norm_inverse[self.term_document.indices])
+        return sparse.csr_matrix((scores.astype(np.float32), self.term_document.indices, self.term_document.indptr),
+                                 shape=self.term_document.shape)
+
+    def search(self, query_terms: list, top_k: int = None):
+        """
+        Score the Disjunction of the Query Terms and Sort Documents by Score, then by Document ID
+        :param query_terms: Terms List in Given Query
+        :param top_k: Number of top documents, None returns every matching document
+        :return: Sorted Document IDs and their BM25 Scores
+        """
+        term_ids = sorted({self.term_ids[str(term)] for term in query_terms if str(term) in self.term_ids})
+        if len(term_ids) == 0:
+            return [], []
+
+        # Clause Scores are Summed in Double Precision and Rounded to float32, Like Lucene's Disjunction Scorers
+        term_weights = self.weights[term_ids]
+        document_scores = np.bincount(term_weights.indices, weights=term_weights.data.astype(np.float64),
+                                      minlength=self.num_documents)
+        document_ids = np.unique(term_weights.indices)
+        scores = document_scores[document_ids].astype(np.float32)
+
+        if top_k is not None and len(document_ids) > top_k:
+            # Keep Every Document Tied with the k-th Score so Ties are Broken by Document ID
+            kth_score = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+            candidates = scores >= kth_score
+            document_ids, scores = document_ids[candidates], scores[candidates]
+
+        order = np.lexsort((document_ids, -scores))[:top_k]
+        return document_ids[order].tolist(), scores[order].tolist()
+
+    def term_vector(self, document_id: int) -> list:
+        """
+        Terms of a Document with their Frequencies, Sorted by Term
+        :param document_id: Restaurant ID
+        :return: (term, frequency) pairs
+        """
+        start, end = self.document_term.indptr[document_id], self.document_term.indptr[document_id + 1]
+        return [(self.vocabulary[term_id], int(frequency)) for term_id, frequency
+                in zip(self.document_term.indices[start:end], self.document_term.data[start:end])]
+
+    def term_count(self) -> int:
+        """
+        Number of Distinct Index Terms
+        :return: Term count
+        """
+        return len(self.vocabulary)
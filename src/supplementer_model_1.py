@@ -2,21 +2,61 @@ import pandas as pd
 
 from index_inverter import IndexInverter
 from helpers import BM25Parameters
+from result_cache import ResultCache
+from instrumentation import Instrumentation
 class ModelWithoutQueryExpansion:
-    def __init__(self, restaurants_data: pd.DataFrame, bm25_parameters: BM25Parameters):
+    def __init__(self, restaurants_data: pd.DataFrame, bm25_parameters: BM25Parameters,
+                 index_path_name: str = 'temp', persistent_index: bool = False,
+                 analyzer: str = 'python', backend: str = 'lucene', result_cache: ResultCache = None,
+                 instrumentation: Instrumentation = None):
         """
         IR Model that computes Document Relevance based on Query
         :param restaurants_data: Corpus
         :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+        :param index_path_name: Lucene Directory that Stores Documents
+        :param persistent_index: Reuse the Lucene Directory between runs if it matches the corpus
+        :param analyzer: Text analysis mode of the index ('python' or 'lucene')
+        :param backend: Search backend of the index ('lucene' or 'sparse')
+        :param result_cache: Result cache shared with other models, a new one is created if not given
+        :param instrumentation: Stage latency histograms shared with other models, a new one is created if not given
         """
-        self.index_inverter = IndexInverter(restaurants_data= restaurants_data, bm25_parameters=bm25_parameters)
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.index_inverter = IndexInverter(restaurants_data= restaurants_data, bm25_parameters=bm25_parameters,
+                                            index_path_name=index_path_name, persistent_index=persistent_index,
+                                            analyzer=analyzer, backend=backend, instrumentation=self.instrumentation)
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
 
-    def sort_documents(self, query:str) -> list:
+    def sort_documents(self, query:str, top_k:int = None) -> list:
         """
         Sort Documents based on a given Query
         :param query: Query given by User
+        :param top_k: Number of top documents, None returns every matching document
         :return: Sorted Document ID List
         """
-        stemmed_query_terms = [self.index_inverter.stem_word(word) for word in query.split() if self.index_inverter.check_stop_word(word)]
-        hits = self.index_inverter.search_query_term(stemmed_query_terms)
-        return [hit.dict()['__id__'] for hit in hits]
+        with self.instrumentation.trace(type(self).__name__, query, top_k):
+            with self.instrumentation.stage('analyze'):
+                stemmed_query_terms = self.index_inverter.analyze_query(query)
+            self.instrumentation.observe('query_terms', len(stemmed_query_terms), 'phase', 'analyzed')
+
+            key = ResultCache.make_key(type(self).__name__, self.index_inverter.bm25_parameters, stemmed_query_terms,
+                                       top_k, index_generation=self.index_inverter.index_generation)
+            return self.result_cache.get_or_compute(
+                key, lambda: self.index_inverter.search_query_term(stemmed_query_terms, top_k)[0])
+
+    def sort_documents_batch(self, queries:list, top_k:int = None, num_threads:int = None) -> list:
+        """
+        Sort Documents for Several Queries, Lucene Searches Run Concurrently
+        :param queries: Queries given by Users
+        :param top_k: Number of top documents per query, None returns every matching document
+        :param num_threads: Number of search threads, default is CPU count
+        :return: Sorted Document ID List of each Query
+        """
+        return self.index_inverter.search_query_terms_batch(self.build_query_terms_batch(queries), top_k, num_threads)
+
+    def build_query_terms_batch(self, queries:list) -> list:
+        """
+        Index Terms Searched for Several Queries, They do Not Depend on the BM25 Parameters
+        :param queries: Queries given by Users
+        :return: Terms List of each Query
+        """
+        return [self.index_inverter.analyze_query(query) for query in queries]
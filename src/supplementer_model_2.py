@@ -1,64 +1,108 @@
 
 from index_inverter import IndexInverter
 from helpers import BM25Parameters
-from gensim.models import Word2Vec
-from gensim.models import KeyedVectors
+from query_expansion import ExpansionCache, ExpansionTable, expand_query_terms, expand_query_terms_batch, \
+    load_embedding_model
+from ann_index import AnnIndex
+from result_cache import ResultCache
+from instrumentation import Instrumentation
 import numpy as np
 import pandas as pd
 class ModelWithEmbedQueryExpansion:
     def __init__(self, restaurants_data: pd.DataFrame, bm25_parameters: BM25Parameters,
-                 embedding_model_path: str):
+                 embedding_model_path: str, index_path_name: str = 'temp', persistent_index: bool = False,
+                 analyzer: str = 'python', backend: str = 'lucene', expansion_cache: ExpansionCache = None,
+                 ann_index_path: str = None, expansion_table_path: str = None, result_cache: ResultCache = None,
+                 instrumentation: Instrumentation = None):
         """
         IR Model that computes Document Relevance based on Query
 
         :param restaurants_data: Corpus
         :param bm25_parameters: Okapi BM25 parameters (k1 and b)
         :param embedding_model_path: Pretrained word2vec model path
+        :param index_path_name: Lucene Directory that Stores Documents
+        :param persistent_index: Reuse the Lucene Directory between runs if it matches the corpus
+        :param analyzer: Text analysis mode of the index ('python' or 'lucene')
+        :param backend: Search backend of the index ('lucene' or 'sparse')
+        :param expansion_cache: Expansion cache shared with other models, a new one is created if not given
+        :param ann_index_path: Approximate nearest neighbour index used instead of exact most_similar
+        :param expansion_table_path: Precomputed expansion table, live expansion is only used for words not in it
+        :param result_cache: Result cache shared with other models, a new one is created if not given
+        :param instrumentation: Stage latency histograms shared with other models, a new one is created if not given
         """
 
-        self.index_inverter = IndexInverter(restaurants_data= restaurants_data, bm25_parameters=bm25_parameters)
-        try:
-            self.embed_model = KeyedVectors.load_word2vec_format(embedding_model_path, binary=True)
-        except:
-            self.embed_model = KeyedVectors.load(embedding_model_path).wv
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.index_inverter = IndexInverter(restaurants_data= restaurants_data, bm25_parameters=bm25_parameters,
+                                            index_path_name=index_path_name, persistent_index=persistent_index,
+                                            analyzer=analyzer, backend=backend, instrumentation=self.instrumentation)
+        self.embed_model = load_embedding_model(embedding_model_path)
+        self.ann_index = AnnIndex.load(ann_index_path, self.embed_model) if ann_index_path is not None else None
+
+        self.expansion_cache = expansion_cache if expansion_cache is not None else ExpansionCache()
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
 
         # Similarity threshold
         self.embed_similarity_thr = 0.6
         self.max_expansion_words = 5
 
+        self.expansion_table = None
+        if expansion_table_path is not None:
+            self.expansion_table = ExpansionTable.load(expansion_table_path)
+            self.expansion_table.check_settings(self.embed_similarity_thr, self.max_expansion_words,
+                                                self.index_inverter.analyzer_settings)
+
 
-    def sort_documents(self, query:str) -> list:
+    def sort_documents(self, query:str, top_k:int = None) -> list:
         """
         Sort Documents based on a given Query
         :param query: Query given by User
+        :param top_k: Number of top documents, None returns every matching document
         :return: Sorted Document ID List
         """
-        stemmed_query_terms = [self.index_inverter.stem_word(word) for word in query.split() if self.index_inverter.check_stop_word(word)]
+        with self.instrumentation.trace(type(self).__name__, query, top_k):
+            with self.instrumentation.stage('analyze'):
+                stemmed_query_terms = self.index_inverter.analyze_query(query)
+            self.instrumentation.observe('query_terms', len(stemmed_query_terms), 'phase', 'analyzed')
 
-        # Find most similar terms
-        similar_terms_above_threshold = []
-        query_terms_without_stop_words = [word for word in query.split() if self.index_inverter.check_stop_word(word)]
-        for term in query_terms_without_stop_words:
-            similar_terms = self.embed_model.most_similar(term)
+            # Find most similar terms
+            with self.instrumentation.stage('expansion'):
+                query_terms_without_stop_words = [word for word in query.split()
+                                                  if self.index_inverter.check_stop_word(word)]
+                expanded_terms = expand_query_terms(self, query_terms_without_stop_words)
 
-            term_above_threshold = []
-            for word, similarity in similar_terms:
-                if similarity >= self.embed_similarity_thr:
-                    if '_' in word:
-                        split_list = word.split('_')
-                        term_above_threshold.extend(split_list)
-                    else:
-                        term_above_threshold.append(word)
+            expanded_terms = list(set(expanded_terms))
+            stemmed_query_terms.extend(expanded_terms)
+            stemmed_query_terms = list(np.unique(np.array(stemmed_query_terms)))
+            self.instrumentation.observe('query_terms', len(stemmed_query_terms), 'phase', 'expanded')
 
-            if len(term_above_threshold) > self.max_expansion_words:
-                term_above_threshold = term_above_threshold[:self.max_expansion_words]
+            # Queries with the Same Index Terms Share a Cached Result
+            key = ResultCache.make_key(type(self).__name__, self.index_inverter.bm25_parameters, stemmed_query_terms,
+                                       top_k, index_generation=self.index_inverter.index_generation)
+            return self.result_cache.get_or_compute(
+                key, lambda: self.index_inverter.search_query_term(stemmed_query_terms, top_k)[0])
 
-            similar_terms_above_threshold.extend(term_above_threshold)
-        expanded_terms = [self.index_inverter.stem_word(word) for word in similar_terms_above_threshold if self.index_inverter.check_stop_word(word)]
+    def sort_documents_batch(self, queries:list, top_k:int = None, num_threads:int = None) -> list:
+        """
+        Sort Documents for Several Queries, Lucene Searches Run Concurrently
+        :param queries: Queries given by Users
+        :param top_k: Number of top documents per query, None returns every matching document
+        :param num_threads: Number of search threads, default is CPU count
+        :return: Sorted Document ID List of each Query
+        """
+        return self.index_inverter.search_query_terms_batch(self.build_query_terms_batch(queries), top_k, num_threads)
 
-        expanded_terms = list(set(expanded_terms))
-        stemmed_query_terms.extend(expanded_terms)
-        stemmed_query_terms = list(np.unique(np.array(stemmed_query_terms)))
-        hits = self.index_inverter.search_query_term(stemmed_query_terms)
+    def build_query_terms_batch(self, queries:list) -> list:
+        """
+        Index Terms Searched for Several Queries, They do Not Depend on the BM25 Parameters
+        :param queries: Queries given by Users
+        :return: Terms List of each Query
+        """
+        with self.instrumentation.stage('batch_expansion'):
+            expanded_terms_list = expand_query_terms_batch(self, queries)
 
-        return [hit.dict()['__id__'] for hit in hits]
+        query_terms_list = []
+        for query, expanded_terms in zip(queries, expanded_terms_list):
+            stemmed_query_terms = self.index_inverter.analyze_query(query)
+            stemmed_query_terms.extend(set(expanded_terms))
+            query_terms_list.append(list(np.unique(np.array(stemmed_query_terms))))
+        return query_terms_list
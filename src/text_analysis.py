@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+STOP_WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'stop_words_english.txt')
+
+
+def load_stop_words(stop_words_path: str = STOP_WORDS_PATH) -> set:
+    """
+    English Stop Words of NLTK, Read from the Word List Committed in data/
+    :param stop_words_path: Stop word file, one word per line
+    :return: Stop Words
+    """
+    with open(stop_words_path, encoding='utf-8') as stop_words_file:
+        return set(stop_words_file.read().split())
+
+
+class TextAnalyzer:
+    def __init__(self, stop_words: set):
+        """
+        Stop Word Filter and Porter Stemmer with a Word to Stem Memo Table
+        :param stop_words: Stop Words to Remove
+        """
+        from nltk.stem import PorterStemmer
+
+        self.stemmer = PorterStemmer()
+        self.stop_words = stop_words
+        self.stem_cache = {}
+
+    def check_stop_word(self, word:str) -> bool:
+        """
+        Controlling Word is Stop Word or Not
+        :param word: Query Term
+        :return: False if word is stop word
+        """
+        return word not in self.stop_words
+
+    def stem_word(self, word:str) -> str:
+        """
+        Stemming the Word, Each Distinct Word is Stemmed Only Once
+        :param word: Query Term
+        :return: Stemmed Word
+        """
+        stemmed_word = self.stem_cache.get(word)
+        if stemmed_word is None:
+            stemmed_word = self.stemmer.stem(word)
+            self.stem_cache[word] = stemmed_word
+        return stemmed_word
+
+    def analyze(self, content:str) -> str:
+        """
+        Remove Stop Words and Stem the Remaining Words of a Document
+        :param content: Document Text
+        :return: Stemmed Document Text
+        """
+        return ' '.join([self.stem_word(word) for word in content.split() if word not in self.stop_words])
+
+
+# Analyzer of the Current Worker Process, Its Memo Table Lives as Long as the Worker
+_worker_analyzer = None
+
+
+def _initialize_worker(stop_words: set):
+    global _worker_analyzer
+    _worker_analyzer = TextAnalyzer(stop_words)
+
+
+def _analyze_chunk(contents: list) -> list:
+    return [_worker_analyzer.analyze(content) for content in contents]
+
+
+def analyze_documents(contents: list, stop_words: set, num_workers: int = 1, chunk_size: int = 256):
+    """
+    Analyze Documents in a Process Pool and Yield Them in Corpus Order
+    :param contents: Document Texts
+    :param stop_words: Stop Words to Remove
+    :param num_workers: Number of worker processes, 1 analyzes in the current process
+    :param chunk_size: Number of documents sent to a worker at once
+    :return: Generator of stemmed document texts
+    """
+    if num_workers <= 1:
+        analyzer = TextAnalyzer(stop_words)
+        for content in contents:
+            yield analyzer.analyze(content)
+        return
+
+    # Spawn Workers so the Children do not Inherit the Running JVM
+    chunks = [contents[i:i + chunk_size] for i in range(0, len(contents), chunk_size)]
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_initialize_worker, initargs=(stop_words,)) as pool:
+        for analyzed_chunk in pool.map(_analyze_chunk, chunks):
+            yield from analyzed_chunk
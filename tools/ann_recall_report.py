@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from ann_index import AnnIndex
+from query_expansion import load_embedding_model, select_expansion_words
+from text_analysis import load_stop_words
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--embedding_model_path', default="../models/GoogleNews-vectors-negative300.bin",
+                        type=str, help='word2vec model path')
+    parser.add_argument('--ann_index_path', default="../models/ann_index.npz", type=str, help='ANN index path')
+    parser.add_argument('--query_results_path', default="../data/query_results.csv", type=str,
+                        help='Query log whose queries are used for the report')
+    parser.add_argument('--nprobe', default=[4, 8, 16, 32, 64], type=int, nargs='+',
+                        help='Numbers of closest lists scored per lookup')
+    parser.add_argument('--embed_similarity_thr', default=0.6, type=float, help='Expansion similarity threshold')
+    parser.add_argument('--max_expansion_words', default=5, type=int, help='Maximum expansion words per term')
+
+    args = parser.parse_args()
+    return args
+
+
+def read_query_log_terms(query_results_path: str, embed_model) -> list:
+    """
+    Distinct Non Stop Word Query Terms of the Query Log that Have an Embedding
+    :param query_results_path: Query log path
+    :param embed_model: Word embedding model
+    :return: Query Terms
+    """
+    stop_words = load_stop_words()
+    queries = pd.read_csv(query_results_path)['Query'].unique()
+    terms = {word for query in queries for word in query.split() if word not in stop_words}
+    return sorted(term for term in terms if term in embed_model.key_to_index)
+
+
+def timed_most_similar(neighbour_search, term: str):
+    start = time.perf_counter()
+    similar_terms = neighbour_search.most_similar(term)
+    return similar_terms, (time.perf_counter() - start) * 1000
+
+
+def recall_latency_report(embed_model, ann_index: AnnIndex, terms: list, nprobes: list,
+                          embed_similarity_thr: float, max_expansion_words: int) -> pd.DataFrame:
+    """
+    Compare ANN Lookups with Exact most_similar on the Given Terms
+    :param embed_model: Word embedding model
+    :param ann_index: ANN index built for the embedding model
+    :param terms: Query Terms
+    :param nprobes: Numbers of closest lists scored per lookup
+    :param embed_similarity_thr: Expansion similarity threshold
+    :param max_expansion_words: Maximum expansion words per term
+    :return: Recall and latency per nprobe
+    """
+    exact_results = {term: timed_most_similar(embed_model, term) for term in terms}
+    exact_latencies = [latency for _, latency in exact_results.values()]
+
+    report = []
+    for nprobe in nprobes:
+        ann_index.nprobe = min(nprobe, len(ann_index.centroids))
+        recalls, expansion_recalls, latencies = [], [], []
+        for term in terms:
+            exact_similar_terms = exact_results[term][0]
+            ann_similar_terms, latency = timed_most_similar(ann_index, term)
+            latencies.append(latency)
+
+            exact_words = {word for word, _ in exact_similar_terms}
+            recalls.append(len(exact_words.intersection(word for word, _ in ann_similar_terms)) / len(exact_words))
+
+            # Recall of the Words That Query Expansion Actually Uses
+            exact_expansion = set(select_expansion_words(exact_similar_terms, embed_similarity_thr, max_expansion_words))
+            if len(exact_expansion) > 0:
+                ann_expansion = set(select_expansion_words(ann_similar_terms, embed_similarity_thr, max_expansion_words))
+                expansion_recalls.append(len(exact_expansion.intersection(ann_expansion)) / len(exact_expansion))
+
+        report.append({'nprobe': ann_index.nprobe, 'Recall@10': round(np.mean(recalls), 3),
+                       'Expansion Recall': round(np.mean(expansion_recalls), 3) if expansion_recalls else None,
+                       'ANN p50 ms': round(np.percentile(latencies, 50), 2),
+                       'ANN p99 ms': round(np.percentile(latencies, 99), 2),
+                       'Exact p50 ms': round(np.percentile(exact_latencies, 50), 2),
+                       'Exact p99 ms': round(np.percentile(exact_latencies, 99), 2)})
+    return pd.DataFrame(report)
+
+
+def main():
+    args = get_args()
+    embed_model = load_embedding_model(args.embedding_model_path)
+    ann_index = AnnIndex.load(args.ann_index_path, embed_model)
+    terms = read_query_log_terms(args.query_results_path, embed_model)
+    print(f"{len(terms)} distinct query terms")
+
+    report = recall_latency_report(embed_model, ann_index, terms, args.nprobe, args.embed_similarity_thr,
+                                   args.max_expansion_words)
+    print(report.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
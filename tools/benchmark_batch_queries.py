@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from helpers import BM25Parameters, remove_punctuation, create_ranking_model
+from result_cache import ResultCache
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--model_name', default="mgr_guru",
+                        type=str, help='IR Model Name (mgr_guru, supp_model_1 or supp_model_2)')
+    parser.add_argument('--corpus_path', default="../data/restaurant_corpus.csv", type=str, help='Corpus path')
+    parser.add_argument('--embedding_model_path', default="../models/GoogleNews-vectors-negative300.bin",
+                        type=str, help='word2vec model path')
+    parser.add_argument('--query_results_path', default="../data/query_results.csv", type=str,
+                        help='Query log whose queries are replayed')
+    parser.add_argument('--threads', default=[1, 2, 4, 8], type=int, nargs='+',
+                        help='Numbers of search threads to benchmark')
+    parser.add_argument('--repeat', default=10, type=int, help='Number of times the query log is replayed')
+    parser.add_argument('--top_k', default=10, type=int, help='Number of top documents per query')
+    parser.add_argument('--index_path', default="benchmark_index", type=str,
+                        help='Temporary Lucene index directory')
+
+    args = parser.parse_args()
+    return args
+
+
+def benchmark_batch_queries(ranking_model, queries: list, thread_counts: list, top_k: int) -> pd.DataFrame:
+    """
+    Compare Query Throughput of sort_documents and sort_documents_batch, and Check Both Rank the Same Documents
+    :param ranking_model: Ranking Model
+    :param queries: Replayed queries
+    :param thread_counts: Numbers of search threads
+    :param top_k: Number of top documents per query
+    :return: Benchmark results (mode, threads, seconds, queries/sec, speedup)
+    """
+    start = time.perf_counter()
+    expected_results = [ranking_model.sort_documents(query, top_k) for query in queries]
+    sequential_seconds = time.perf_counter() - start
+    results = [{'Mode': 'sort_documents', 'Threads': 1, 'Seconds': round(sequential_seconds, 2),
+                'Queries/sec': round(len(queries) / sequential_seconds, 1), 'Speedup': 1.0, 'Same Results': True}]
+    print(results[-1])
+
+    for num_threads in thread_counts:
+        start = time.perf_counter()
+        batch_results = ranking_model.sort_documents_batch(queries, top_k=top_k, num_threads=num_threads)
+        elapsed = time.perf_counter() - start
+        results.append({'Mode': 'sort_documents_batch', 'Threads': num_threads, 'Seconds': round(elapsed, 2),
+                        'Queries/sec': round(len(queries) / elapsed, 1),
+                        'Speedup': round(sequential_seconds / elapsed, 2),
+                        'Same Results': batch_results == expected_results})
+        print(results[-1])
+    return pd.DataFrame(results)
+
+
+def main():
+    args = get_args()
+    restaurants_data = pd.read_csv(args.corpus_path, dtype=str)
+    queries = [remove_punctuation(query) for query in pd.read_csv(args.query_results_path)['Query'].unique()]
+    queries = queries * args.repeat
+
+    ranking_model = create_ranking_model(args.model_name, restaurants_data=restaurants_data,
+                                         bm25_parameters=BM25Parameters(),
+                                         embedding_model_path=args.embedding_model_path,
+                                         index_path_name=args.index_path,
+                                         result_cache=ResultCache(max_size=0))  # Replayed queries are not cached
+    try:
+        results = benchmark_batch_queries(ranking_model, queries, args.threads, args.top_k)
+    finally:
+        ranking_model.index_inverter.delete_directory()
+    print(results.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from generate_corpus import REVIEW_SEPARATOR, merge_restaurant_data_and_reviews, build_restaurant_corpus
+from benchmark_scaling import peak_rss_mb
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--restaurant_michelin_data_path', default="../data/restaurants_details.csv",
+                        type=str, help='Michelin Site Restaurant Data, a placeholder is made from the list if missing')
+    parser.add_argument('--restaurants_list_path', default="../data/raw_data/restaurants_list.csv", type=str,
+                        help='Restaurant list used when the Michelin data is missing')
+    parser.add_argument('--reviews_paths', default=["../data/raw_data/restaurant_reviews.csv",
+                                                    "../data/raw_data/restaurant_reviews_2.csv",
+                                                    "../data/raw_data/restaurant_reviews_5.csv"],
+                        type=str, nargs='+', help='TripAdvisor review files')
+    parser.add_argument('--copies', default=20, type=int,
+                        help='Number of copies of the review files, each copy renames its restaurants')
+    parser.add_argument('--num_partitions', default=64, type=int, help='Number of review partitions')
+    parser.add_argument('--chunk_size', default=200000, type=int, help='Number of reviews read at once')
+    parser.add_argument('--work_path', default="corpus_benchmark", type=str,
+                        help='Directory of the generated inputs and outputs')
+    parser.add_argument('--skip_legacy', action='store_true',
+                        help='Only run the streaming builder, for inputs too large for the previous script')
+    parser.add_argument('--child', default=None, type=str, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    return args
+
+
+def prepare_inputs(args) -> tuple:
+    """
+    Write the Scaled Review Files and, if Needed, a Placeholder Michelin Data File
+    :param args: Command line arguments
+    :return: Michelin data path, review file paths and number of reviews
+    """
+    michelin_guide_data_path = args.restaurant_michelin_data_path
+    if not os.path.exists(michelin_guide_data_path):
+        michelin_guide_data = pd.read_csv(args.restaurants_list_path)
+        for column in ['Content', 'Detail', 'Services', 'Hour']:
+            michelin_guide_data[column] = f"Placeholder {column.lower()} of the restaurant. "
+        michelin_guide_data_path = os.path.join(args.work_path, 'restaurants_details.csv')
+        michelin_guide_data.to_csv(michelin_guide_data_path, index=False)
+
+    review_paths, num_reviews = [], 0
+    for i, review_path in enumerate(args.reviews_paths):
+        reviews = pd.read_csv(review_path, sep=REVIEW_SEPARATOR, dtype=str, engine='python').drop('Unnamed: 0', axis=1)
+        copies = [reviews] + [reviews.assign(Name=reviews['Name'] + f" #{copy}") for copy in range(1, args.copies)]
+        review_paths.append(os.path.join(args.work_path, f"reviews_{i}.csv"))
+        pd.concat(copies, ignore_index=True).to_csv(review_paths[-1], sep=REVIEW_SEPARATOR)
+        num_reviews += len(reviews) * args.copies
+    return michelin_guide_data_path, review_paths, num_reviews
+
+
+def run_child(config: dict):
+    """
+    Runs in a Fresh Process: Build the Corpus with One Implementation and Print Time and Peak Memory as JSON
+    :param config: Implementation, inputs and output path
+    :return: None
+    """
+    start = time.perf_counter()
+    if config['implementation'] == 'legacy':
+        merge_restaurant_data_and_reviews(config['michelin_guide_data_path'], config['review_paths'],
+                                          config['out_corpus_path'])
+    else:
+        build_restaurant_corpus(config['michelin_guide_data_path'], config['review_paths'], config['out_corpus_path'],
+                                work_path=config['build_path'], num_partitions=config['num_partitions'],
+                                chunk_size=config['chunk_size'])
+    print(json.dumps({'seconds': time.perf_counter() - start,
+                      'peak_rss_mb': peak_rss_mb()}))
+
+
+def main():
+    args = get_args()
+    if args.child is not None:
+        run_child(json.loads(args.child))
+        return
+
+    os.makedirs(args.work_path, exist_ok=True)
+    michelin_guide_data_path, review_paths, num_reviews = prepare_inputs(args)
+    print(f"Inputs: {num_reviews} reviews in {len(review_paths)} files")
+
+    runs = [('streaming csv', 'streaming', 'corpus_streaming.csv'),
+            ('streaming parquet', 'streaming', 'corpus_streaming.parquet')]
+    if not args.skip_legacy:
+        runs.insert(0, ('legacy csv', 'legacy', 'corpus_legacy.csv'))
+
+    results = []
+    for name, implementation, out_file_name in runs:
+        config = {'implementation': implementation, 'michelin_guide_data_path': michelin_guide_data_path,
+                  'review_paths': review_paths, 'out_corpus_path': os.path.join(args.work_path, out_file_name),
+                  'build_path': os.path.join(args.work_path, 'build'), 'num_partitions': args.num_partitions,
+                  'chunk_size': args.chunk_size}
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(config)],
+                                 capture_output=True, text=True)
+        if process.returncode != 0:
+            print(f"{name} failed:\n{process.stderr}")
+            sys.exit(1)
+        timings = json.loads(process.stdout.strip().splitlines()[-1])
+        results.append({'Implementation': name, 'Seconds': round(timings['seconds'], 2),
+                        'Reviews/sec': round(num_reviews / timings['seconds']),
+                        'Peak RSS MB': round(timings['peak_rss_mb'], 1)})
+        print(results[-1])
+
+    # Both Streaming Outputs Must Match the Previous Script Row by Row, Compared as object Columns
+    streaming_corpus = pd.read_csv(os.path.join(args.work_path, 'corpus_streaming.csv'), dtype=str)
+    parquet_corpus = pd.read_parquet(os.path.join(args.work_path, 'corpus_streaming.parquet'))
+    is_same = streaming_corpus.drop(columns='Unnamed: 0').astype(object).equals(parquet_corpus.astype(object))
+    if not args.skip_legacy:
+        legacy_corpus = pd.read_csv(os.path.join(args.work_path, 'corpus_legacy.csv'), dtype=str)
+        is_same = is_same and legacy_corpus.equals(streaming_corpus)
+
+    print(pd.DataFrame(results).to_string(index=False))
+    print(f"Same output: {is_same}")
+    if not is_same:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from corpus_store import CorpusStore, DISPLAY_COLUMNS
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--data_path', default="../data/restaurant_corpus.csv", type=str,
+                        help='Corpus CSV, a synthetic corpus is generated if it is missing')
+    parser.add_argument('--reviews_paths', default=["../data/raw_data/restaurant_reviews.csv",
+                                                    "../data/raw_data/restaurant_reviews_2.csv",
+                                                    "../data/raw_data/restaurant_reviews_5.csv"],
+                        type=str, nargs='+', help='TripAdvisor review files the synthetic corpus is drawn from')
+    parser.add_argument('--synthetic_size', default=50000, type=int, help='Number of synthetic restaurants')
+    parser.add_argument('--lookups', default=1000, type=int, help='Number of 10 document result pages fetched')
+    parser.add_argument('--work_path', default="corpus_store_benchmark", type=str,
+                        help='Directory of the Parquet and Arrow copies of the corpus')
+    parser.add_argument('--seed', default=0, type=int, help='Random seed')
+    parser.add_argument('--child', default=None, type=str, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    return args
+
+
+def memory_mb(field: str) -> float:
+    """
+    Resident Memory of the Current Process from /proc, Unlike ru_maxrss it is Not Inherited from the Parent
+    :param field: VmRSS for the current or VmHWM for the peak resident memory
+    :return: Memory in MB, the peak from getrusage where /proc is not available
+    """
+    try:
+        with open('/proc/self/status') as status_file:
+            for line in status_file:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(config: dict):
+    """
+    Runs in a Fresh Process: Open the Corpus, Fetch Result Pages and Print Timings and Memory as JSON
+    :param config: Implementation, corpus path and result pages
+    :return: None
+    """
+    start = time.perf_counter()
+    if config['implementation'] == 'dataframe':
+        # Previous UI: the Whole Corpus in a Data Frame, Rows by iloc
+        restaurant_details = pd.read_csv(config['corpus_path'], dtype=str)
+        get_rows = lambda doc_ids: [{column: restaurant_details.iloc[doc_id][column] for column in DISPLAY_COLUMNS}
+                                    for doc_id in doc_ids]
+    else:
+        corpus_store = CorpusStore(config['corpus_path'])
+        get_rows = corpus_store.get_rows
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pages = [get_rows(doc_ids) for doc_ids in config['pages']]
+    fetch_seconds = time.perf_counter() - start
+
+    # Missing Values are NaN in the Data Frame and None in the Store
+    rows = [{column: None if pd.isna(value) else value for column, value in row.items()} for row in pages[0]]
+    print(json.dumps({'load_seconds': load_seconds, 'fetch_ms': 1000 * fetch_seconds / len(pages),
+                      'rss_mb': memory_mb('VmRSS'), 'peak_rss_mb': memory_mb('VmHWM'),
+                      'rows': rows}))
+
+
+def write_columnar_copies(corpus_path: str, work_path: str) -> tuple:
+    """
+    Write Parquet and Uncompressed Arrow Copies of the Corpus
+    :param corpus_path: Corpus CSV
+    :param work_path: Output directory
+    :return: Parquet path and Arrow path
+    """
+    import pyarrow.feather as feather
+
+    corpus = pd.read_csv(corpus_path, dtype=str)
+    corpus = corpus.drop(columns=[column for column in corpus.columns if column.startswith('Unnamed')])
+    parquet_path, arrow_path = os.path.join(work_path, 'corpus.parquet'), os.path.join(work_path, 'corpus.arrow')
+    corpus.to_parquet(parquet_path, index=False)
+    # Uncompressed so the File Can be Memory-Mapped Without Decoding
+    feather.write_feather(corpus, arrow_path, compression='uncompressed')
+    return parquet_path, arrow_path
+
+
+def main():
+    args = get_args()
+    if args.child is not None:
+        run_child(json.loads(args.child))
+        return
+
+    os.makedirs(args.work_path, exist_ok=True)
+    corpus_path = args.data_path
+    if not os.path.exists(corpus_path):
+        from benchmark_scaling import read_review_statistics, generate_corpus
+
+        corpus_path = os.path.join(args.work_path, 'corpus.csv')
+        generate_corpus(args.synthetic_size, read_review_statistics(args.reviews_paths), 1.0, corpus_path, args.seed)
+    parquet_path, arrow_path = write_columnar_copies(corpus_path, args.work_path)
+
+    num_documents = len(CorpusStore(parquet_path))
+    random_state = np.random.default_rng(args.seed)
+    pages = [random_state.integers(0, num_documents, 10).tolist() for _ in range(args.lookups)]
+    print(f"Corpus: {num_documents} restaurants, CSV {os.path.getsize(corpus_path) / (1 << 20):.1f} MB, "
+          f"Parquet {os.path.getsize(parquet_path) / (1 << 20):.1f} MB, "
+          f"Arrow {os.path.getsize(arrow_path) / (1 << 20):.1f} MB")
+
+    runs = [('data frame csv', 'dataframe', corpus_path), ('store csv', 'store', corpus_path),
+            ('store parquet', 'store', parquet_path), ('store arrow', 'store', arrow_path)]
+    results, first_pages = [], []
+    for name, implementation, path in runs:
+        config = {'implementation': implementation, 'corpus_path': path, 'pages': pages}
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(config)],
+                                 capture_output=True, text=True)
+        if process.returncode != 0:
+            print(f"{name} failed:\n{process.stderr}")
+            sys.exit(1)
+        measurements = json.loads(process.stdout.strip().splitlines()[-1])
+        first_pages.append(measurements['rows'])
+        results.append({'Implementation': name, 'Load Seconds': round(measurements['load_seconds'], 3),
+                        'RSS MB': round(measurements['rss_mb'], 1),
+                        'Peak RSS MB': round(measurements['peak_rss_mb'], 1),
+                        'Page Fetch ms': round(measurements['fetch_ms'], 3)})
+
+    print(pd.DataFrame(results).to_string(index=False))
+    is_same = all(rows == first_pages[0] for rows in first_pages)
+    print(f"Same rows: {is_same}")
+    if not is_same:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
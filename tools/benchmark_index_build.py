@@ -0,0 +1,55 @@
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from index_inverter import IndexInverter
+from helpers import BM25Parameters
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--corpus_path', default="../data/restaurant_corpus.csv", type=str, help='Corpus path')
+    parser.add_argument('--workers', default=[1, 2, 4, 8], type=int, nargs='+',
+                        help='Numbers of analysis worker processes to benchmark')
+    parser.add_argument('--index_path', default="benchmark_index", type=str,
+                        help='Temporary Lucene index directory')
+
+    args = parser.parse_args()
+    return args
+
+
+def benchmark_index_build(restaurants_data: pd.DataFrame, worker_counts: list, index_path: str):
+    """
+    Measure Index Build Throughput for Different Numbers of Worker Processes
+    :param restaurants_data: Corpus
+    :param worker_counts: Numbers of worker processes
+    :param index_path: Temporary Lucene index directory
+    :return: Benchmark results (workers, seconds, docs/sec)
+    """
+    results = []
+    for num_workers in worker_counts:
+        start = time.perf_counter()
+        index_inverter = IndexInverter(restaurants_data=restaurants_data, bm25_parameters=BM25Parameters(),
+                                       index_path_name=index_path, num_workers=num_workers)
+        elapsed = time.perf_counter() - start
+        index_inverter.delete_directory()
+
+        results.append({'Workers': num_workers, 'Seconds': round(elapsed, 2),
+                        'Docs/sec': round(len(restaurants_data) / elapsed, 1)})
+        print(results[-1])
+    return pd.DataFrame(results)
+
+
+def main():
+    args = get_args()
+    restaurants_data = pd.read_csv(args.corpus_path, dtype=str)
+    results = benchmark_index_build(restaurants_data, args.workers, args.index_path)
+    print(results.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
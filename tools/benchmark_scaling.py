@@ -0,0 +1,292 @@
+import argparse
+from collections import Counter
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from helpers import BM25Parameters, MODEL_NAMES
+
+RESULT_KEY_COLUMNS = ['Corpus Size', 'Model', 'Expansion Terms']
+# Metrics Compared with the Baseline, Larger is Worse for All of Them
+REGRESSION_COLUMNS = ['Build Seconds', 'Index MB', 'Peak RSS MB', 'p50 ms', 'p99 ms']
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--reviews_paths', default=["../data/raw_data/restaurant_reviews.csv",
+                                                    "../data/raw_data/restaurant_reviews_2.csv",
+                                                    "../data/raw_data/restaurant_reviews_5.csv"],
+                        type=str, nargs='+', help='TripAdvisor review files the vocabulary is drawn from')
+    parser.add_argument('--corpus_sizes', default=[16000, 64000, 256000, 1000000], type=int, nargs='+',
+                        help='Numbers of synthetic restaurants')
+    parser.add_argument('--expansion_terms', default=[1, 10, 100], type=int, nargs='+',
+                        help='Numbers of expansion terms per query word')
+    parser.add_argument('--models', default=list(MODEL_NAMES), type=str, nargs='+', help='IR Model Names')
+    parser.add_argument('--embedding_model_path', default="../models/GoogleNews-vectors-negative300.bin",
+                        type=str, help='word2vec model path')
+    parser.add_argument('--backend', default="lucene", type=str, help='Search backend (lucene or sparse)')
+    parser.add_argument('--document_length_scale', default=1.0, type=float,
+                        help='Scale of the review based document lengths, below 1 keeps large corpora on disk small')
+    parser.add_argument('--queries', default=200, type=int, help='Number of queries per configuration')
+    parser.add_argument('--query_words', default=1, type=int, help='Number of words per query')
+    parser.add_argument('--top_k', default=10, type=int, help='Number of top documents per query')
+    parser.add_argument('--work_path', default="scaling_benchmark", type=str,
+                        help='Directory of the synthetic corpora and temporary indexes')
+    parser.add_argument('--out_path', default="../data/scaling_benchmark.csv", type=str, help='Results file')
+    parser.add_argument('--baseline_path', default=None, type=str,
+                        help='Results file of a previous run, the run fails if a metric regresses')
+    parser.add_argument('--max_regression', default=0.2, type=float,
+                        help='Allowed relative increase of a metric over the baseline')
+    parser.add_argument('--seed', default=0, type=int, help='Random seed')
+    parser.add_argument('--child_config', default=None, type=str, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    return args
+
+
+def read_review_statistics(reviews_paths: list) -> tuple:
+    """
+    Word Frequencies, Restaurant Document Lengths and Ratings of the Real Reviews
+    :param reviews_paths: TripAdvisor review files
+    :return: Vocabulary, word probabilities, document lengths in words and ratings
+    """
+    reviews = pd.concat([pd.read_csv(path, sep="½", dtype=str, engine='python') for path in reviews_paths])
+    reviews['Review'] = reviews['Title'].fillna('-') + ' ' + reviews['Text'].fillna('-')
+
+    word_counts = Counter()
+    for review in reviews['Review']:
+        word_counts.update(re.findall(r"[a-z]+", review.lower()))
+    vocabulary, counts = zip(*word_counts.most_common())
+    probabilities = np.array(counts, dtype=np.float64) / sum(counts)
+
+    # A Corpus Document Holds All Reviews of a Restaurant
+    document_lengths = reviews.groupby('Name')['Review'].agg(' '.join).str.split().str.len().values
+    ratings = reviews['Rating'].dropna().values
+    return np.array(vocabulary), probabilities, document_lengths, ratings
+
+
+def generate_corpus(corpus_size: int, review_statistics: tuple, length_scale: float, out_path: str, seed: int,
+                    chunk_size: int = 10000):
+    """
+    Write a Synthetic Corpus with the Columns of restaurant_corpus.csv, Written in Chunks to Bound Memory
+    :param corpus_size: Number of restaurants
+    :param review_statistics: Vocabulary, word probabilities, document lengths and ratings of the real reviews
+    :param length_scale: Scale of the document lengths
+    :param out_path: Corpus path
+    :param seed: Random seed
+    :param chunk_size: Number of restaurants generated at once
+    :return: None
+    """
+    vocabulary, probabilities, document_lengths, ratings = review_statistics
+    random_state = np.random.default_rng(seed)
+
+    def sample_texts(lengths):
+        words = vocabulary[random_state.choice(len(vocabulary), int(lengths.sum()), p=probabilities)]
+        return [' '.join(text_words) for text_words in np.split(words, np.cumsum(lengths)[:-1])]
+
+    for start in range(0, corpus_size, chunk_size):
+        doc_ids = np.arange(start, min(start + chunk_size, corpus_size))
+        lengths = np.maximum(1, (random_state.choice(document_lengths, len(doc_ids)) * length_scale).astype(int))
+        chunk = pd.DataFrame({'Name': [f"Synthetic Restaurant {doc_id}" for doc_id in doc_ids],
+                              'Link': [f"https://guide.michelin.com/restaurant/synthetic-{doc_id}" for doc_id in doc_ids],
+                              'Content': sample_texts(np.full(len(doc_ids), 60)),
+                              'Rating': random_state.choice(ratings, len(doc_ids)),
+                              'Data': sample_texts(lengths)}, index=doc_ids)
+        chunk.to_csv(out_path, mode='w' if start == 0 else 'a', header=start == 0)
+
+
+class FixedWidthNeighbours:
+    def __init__(self, embed_model, num_words: int):
+        """
+        Neighbour Search that Returns Exactly num_words Neighbours, so Every Query Word Gets the Same Expansion Width
+        :param embed_model: Word embedding model (KeyedVectors)
+        :param num_words: Number of neighbours per word
+        """
+        self.embed_model = embed_model
+        self.num_words = num_words
+
+    def most_similar(self, term: str) -> list:
+        """
+        Nearest Neighbours of a Word, All Reported Above Any Similarity Threshold
+        :param term: Query word
+        :return: (word, similarity) pairs
+        """
+        if term not in self.embed_model.key_to_index:
+            return []
+        return [(word, 1.0) for word, _ in self.embed_model.most_similar(term, topn=self.num_words)]
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak Resident Memory of the Current Process
+    VmHWM is used where /proc exists, ru_maxrss keeps the peak of the parent process across exec
+    :return: Peak RSS in MB
+    """
+    try:
+        with open('/proc/self/status') as status_file:
+            for line in status_file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_configuration(config: dict) -> list:
+    """
+    Runs in a Fresh Process: Build One Model on One Corpus and Measure Query Latency for Each Expansion Width
+    :param config: Corpus path, model name, expansion widths and query settings
+    :return: Result rows
+    """
+    from instrumentation import Instrumentation
+    from helpers import create_ranking_model
+    from query_expansion import ExpansionCache
+    from result_cache import ResultCache
+
+    restaurants_data = pd.read_csv(config['corpus_path'], dtype=str)
+    instrumentation = Instrumentation()
+    start = time.perf_counter()
+    ranking_model = create_ranking_model(config['model_name'], restaurants_data=restaurants_data,
+                                         bm25_parameters=BM25Parameters(),
+                                         embedding_model_path=config['embedding_model_path'],
+                                         index_path_name=config['index_path'], backend=config['backend'],
+                                         result_cache=ResultCache(max_size=0), instrumentation=instrumentation)
+    build_seconds = time.perf_counter() - start
+    index_mb = ranking_model.index_inverter.index_statistics()['size_bytes'] / 2 ** 20
+
+    # Query Words are Frequent Review Words the Embedding Model Knows, Without Stop Words
+    index_inverter = ranking_model.index_inverter
+    embed_model = getattr(ranking_model, 'embed_model', None)
+    candidate_words = [word for word in config['query_vocabulary'] if index_inverter.check_stop_word(word)
+                       and (embed_model is None or word in embed_model.key_to_index)]
+    random_state = np.random.default_rng(config['seed'])
+    queries = [' '.join(random_state.choice(candidate_words, config['query_words'], replace=False))
+               for _ in range(config['queries'])]
+
+    rows = []
+    expansion_widths = config['expansion_terms'] if embed_model is not None else [0]
+    for num_words in expansion_widths:
+        if embed_model is not None:
+            ranking_model.ann_index = FixedWidthNeighbours(embed_model, num_words)
+            ranking_model.expansion_table = None
+            ranking_model.expansion_cache = ExpansionCache()
+            ranking_model.embed_similarity_thr = 0.0
+            ranking_model.max_expansion_words = num_words
+        instrumentation.clear()
+
+        latencies = []
+        for query in queries:
+            query_start = time.perf_counter()
+            ranking_model.sort_documents(query, top_k=config['top_k'])
+            latencies.append(time.perf_counter() - query_start)
+
+        stage_seconds = instrumentation.snapshot()['stage_seconds']
+        rows.append({'Corpus Size': len(restaurants_data), 'Model': config['model_name'],
+                     'Expansion Terms': num_words, 'Backend': config['backend'],
+                     'Build Seconds': round(build_seconds, 2), 'Index MB': round(index_mb, 2),
+                     'Peak RSS MB': round(peak_rss_mb(), 1),
+                     'p50 ms': round(1000 * np.percentile(latencies, 50), 3),
+                     'p99 ms': round(1000 * np.percentile(latencies, 99), 3),
+                     'Search p50 ms': round(1000 * stage_seconds['search']['p50'], 3),
+                     'Expansion p50 ms': round(1000 * stage_seconds['expansion']['p50'], 3)
+                     if 'expansion' in stage_seconds else None,
+                     'QPS': round(len(latencies) / sum(latencies), 1)})
+    index_inverter.delete_directory()
+    return rows
+
+
+def compare_with_baseline(results: pd.DataFrame, baseline: pd.DataFrame, max_regression: float) -> pd.DataFrame:
+    """
+    Metrics that Grew More than the Allowed Ratio Compared with a Previous Run
+    :param results: Results of this run
+    :param baseline: Results of a previous run
+    :param max_regression: Allowed relative increase
+    :return: Regressed (configuration, metric) rows
+    """
+    merged = results.merge(baseline, on=RESULT_KEY_COLUMNS, suffixes=('', ' Baseline'))
+    regressions = []
+    for column in REGRESSION_COLUMNS:
+        ratios = merged[column] / merged[f"{column} Baseline"].replace(0, np.nan)
+        for _, row in merged[ratios > 1 + max_regression].iterrows():
+            regressions.append({**{key: row[key] for key in RESULT_KEY_COLUMNS}, 'Metric': column,
+                                'Baseline': row[f"{column} Baseline"], 'Current': row[column]})
+    return pd.DataFrame(regressions)
+
+
+def git_commit() -> str:
+    """
+    Commit of the Benchmarked Code, so Results Files can be Compared
+    :return: Short commit hash, None outside a git checkout
+    """
+    process = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    return process.stdout.strip() if process.returncode == 0 else None
+
+
+def main():
+    args = get_args()
+    if args.child_config is not None:
+        with open(args.child_config) as config_file:
+            print(json.dumps(run_configuration(json.load(config_file))))
+        return
+
+    os.makedirs(args.work_path, exist_ok=True)
+    review_statistics = read_review_statistics(args.reviews_paths)
+    query_vocabulary = review_statistics[0][:5000].tolist()
+
+    rows, is_failed = [], False
+    for corpus_size in args.corpus_sizes:
+        corpus_path = os.path.join(args.work_path, f"synthetic_corpus_{corpus_size}.csv")
+        if not os.path.exists(corpus_path):
+            start = time.perf_counter()
+            generate_corpus(corpus_size, review_statistics, args.document_length_scale, corpus_path, args.seed)
+            print(f"Generated {corpus_path} in {time.perf_counter() - start:.1f}s")
+
+        for model_name in args.models:
+            # Each Configuration Runs in its Own Process, so Peak Memory and JVM State are Not Shared
+            config = {'corpus_path': os.path.abspath(corpus_path), 'model_name': model_name,
+                      'embedding_model_path': os.path.abspath(args.embedding_model_path),
+                      'index_path': os.path.abspath(os.path.join(args.work_path, 'index')),
+                      'backend': args.backend, 'expansion_terms': args.expansion_terms,
+                      'query_vocabulary': query_vocabulary, 'queries': args.queries,
+                      'query_words': args.query_words, 'top_k': args.top_k, 'seed': args.seed}
+            config_path = os.path.join(args.work_path, 'config.json')
+            with open(config_path, 'w') as config_file:
+                json.dump(config, config_file)
+
+            process = subprocess.run([sys.executable, os.path.abspath(__file__), '--child_config', config_path],
+                                     capture_output=True, text=True)
+            if process.returncode != 0:
+                print(f"{model_name} on {corpus_size} restaurants failed:\n{process.stderr}")
+                is_failed = True
+                continue
+            for row in json.loads(process.stdout.strip().splitlines()[-1]):
+                rows.append({**row, 'Commit': git_commit()})
+                print(rows[-1])
+
+    results = pd.DataFrame(rows)
+    results.to_csv(args.out_path, index=False)
+    print(results.to_string(index=False))
+
+    if args.baseline_path is not None and len(results) > 0:
+        regressions = compare_with_baseline(results, pd.read_csv(args.baseline_path), args.max_regression)
+        if len(regressions) > 0:
+            print(f"\nRegressions above {args.max_regression:.0%}:\n{regressions.to_string(index=False)}")
+            is_failed = True
+        else:
+            print(f"\nNo metric regressed more than {args.max_regression:.0%} against {args.baseline_path}")
+
+    if is_failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
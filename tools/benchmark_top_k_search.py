@@ -0,0 +1,109 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from lupyne import engine
+from helpers import BM25Parameters, remove_punctuation, create_ranking_model
+from query_expansion import expand_query_terms
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--model_name', default="supp_model_2",
+                        type=str, help='IR Model Name (mgr_guru, supp_model_1 or supp_model_2)')
+    parser.add_argument('--corpus_path', default="../data/restaurant_corpus.csv", type=str, help='Corpus path')
+    parser.add_argument('--embedding_model_path', default="../models/GoogleNews-vectors-negative300.bin",
+                        type=str, help='word2vec model path')
+    parser.add_argument('--query_results_path', default="../data/query_results.csv", type=str,
+                        help='Query log whose queries are searched')
+    parser.add_argument('--top_k', default=10, type=int, help='Number of top documents per query')
+    parser.add_argument('--repeat', default=5, type=int, help='Number of times each query is searched')
+    parser.add_argument('--index_path', default="benchmark_index", type=str,
+                        help='Temporary Lucene index directory')
+
+    args = parser.parse_args()
+    return args
+
+
+def build_query_terms(ranking_model, query: str) -> list:
+    """
+    Index Terms of a Query, Expanded the Same Way sort_documents Expands them
+    :param ranking_model: Ranking Model
+    :param query: Query
+    :return: Index Terms
+    """
+    index_inverter = ranking_model.index_inverter
+    query_terms = index_inverter.analyze_query(query)
+    if hasattr(ranking_model, 'expansion_cache'):
+        query_terms.extend(set(expand_query_terms(
+            ranking_model, [word for word in query.split() if index_inverter.check_stop_word(word)])))
+    return list(np.unique(np.array(query_terms)))
+
+
+def search_with_stored_fields(index_inverter, query_terms: list) -> list:
+    """
+    Previous Retrieval, Every Matching Document is Loaded with its Stored Fields
+    :param index_inverter: Index
+    :param query_terms: Index Terms
+    :return: Sorted Document IDs
+    """
+    query = engine.Query.any(*[engine.Query.term('content', term) for term in query_terms])
+    return [hit.dict()['__id__'] for hit in index_inverter.searcher.search(query, scores=True)]
+
+
+def benchmark_top_k_search(ranking_model, queries: list, top_k: int, repeat: int) -> pd.DataFrame:
+    """
+    Measure Search Latency of the Previous Retrieval, All Document IDs and Top-k Document IDs
+    :param ranking_model: Ranking Model
+    :param queries: Queries
+    :param top_k: Number of top documents per query
+    :param repeat: Number of times each query is searched
+    :return: Latency per mode (mean and p95 in ms) and whether the top documents match the previous retrieval
+    """
+    index_inverter = ranking_model.index_inverter
+    queries_terms = [build_query_terms(ranking_model, query) for query in queries]
+    modes = {'stored fields': lambda terms: search_with_stored_fields(index_inverter, terms)[:top_k],
+             'all ids': lambda terms: index_inverter.search_query_term(terms)[0][:top_k],
+             'top_k ids': lambda terms: index_inverter.search_query_term(terms, top_k)[0]}
+
+    results, expected_results = [], None
+    for mode, search in modes.items():
+        latencies, mode_results = [], []
+        for query_terms in queries_terms:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                document_ids = search(query_terms)
+                latencies.append(time.perf_counter() - start)
+            mode_results.append(document_ids)
+        expected_results = expected_results if expected_results is not None else mode_results
+
+        results.append({'Mode': mode, 'Mean ms': round(1000 * np.mean(latencies), 2),
+                        'p95 ms': round(1000 * np.percentile(latencies, 95), 2),
+                        'Same Top Documents': mode_results == expected_results})
+        print(results[-1])
+    return pd.DataFrame(results)
+
+
+def main():
+    args = get_args()
+    restaurants_data = pd.read_csv(args.corpus_path, dtype=str)
+    queries = [remove_punctuation(query) for query in pd.read_csv(args.query_results_path)['Query'].unique()]
+
+    ranking_model = create_ranking_model(args.model_name, restaurants_data=restaurants_data,
+                                         bm25_parameters=BM25Parameters(),
+                                         embedding_model_path=args.embedding_model_path,
+                                         index_path_name=args.index_path)
+    try:
+        results = benchmark_top_k_search(ranking_model, queries, args.top_k, args.repeat)
+    finally:
+        ranking_model.index_inverter.delete_directory()
+    print(results.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from ann_index import AnnIndex
+from query_expansion import load_embedding_model
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--embedding_model_path', default="../models/GoogleNews-vectors-negative300.bin",
+                        type=str, help='word2vec model path')
+    parser.add_argument('--out_ann_index_path', default="../models/ann_index.npz", type=str,
+                        help='Output ANN index path')
+    parser.add_argument('--num_lists', default=None, type=int,
+                        help='Number of IVF lists, default is the square root of the vocabulary size')
+    parser.add_argument('--sample_size', default=200000, type=int, help='Number of words used to train centroids')
+    parser.add_argument('--iterations', default=10, type=int, help='Number of k-means iterations')
+    parser.add_argument('--batch_size', default=65536, type=int,
+                        help='Number of words scored against the centroids at once, bounds the memory of the build')
+
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = get_args()
+    embed_model = load_embedding_model(args.embedding_model_path)
+
+    start = time.perf_counter()
+    ann_index = AnnIndex.build(embed_model, num_lists=args.num_lists, sample_size=args.sample_size,
+                               iterations=args.iterations, batch_size=args.batch_size)
+    ann_index.save(args.out_ann_index_path)
+    print(f"ANN index with {len(ann_index.centroids)} lists built in {time.perf_counter() - start:.1f} seconds")
+
+
+if __name__ == '__main__':
+    main()
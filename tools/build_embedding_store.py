@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from embedding_store import build_embedding_store
+from index_inverter import IndexInverter
+from helpers import BM25Parameters
+from query_expansion import load_embedding_model
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--embedding_model_path', default="../models/GoogleNews-vectors-negative300.bin",
+                        type=str, help='word2vec model path')
+    parser.add_argument('--corpus_path', default="../data/restaurant_corpus.csv", type=str, help='Corpus path')
+    parser.add_argument('--index_path', default="../src/temp", type=str, help='Persistent Lucene index directory')
+    parser.add_argument('--analyzer', default="python", type=str, help='Text analysis mode of the index')
+    parser.add_argument('--top_k', default=100000, type=int, help='Number of most frequent words always kept')
+    parser.add_argument('--out_store_path', default="../models/embedding_store", type=str,
+                        help='Output embedding store directory')
+
+    args = parser.parse_args()
+    return args
+
+
+def find_index_matching_words(embed_model, index_inverter: IndexInverter) -> set:
+    """
+    Words of the Embedding Vocabulary that Can Match an Index Term
+    Phrases are kept if one of their words matches, since expansion splits them on '_'
+    :param embed_model: Word embedding model
+    :param index_inverter: Index whose terms are matched
+    :return: Matching Words
+    """
+    index_terms = index_inverter.document_frequencies
+    matching_words = set()
+    for word in embed_model.index_to_key:
+        if any(term in index_terms for term in index_inverter.analyze_terms(word.split('_'))):
+            matching_words.add(word)
+    return matching_words
+
+
+def main():
+    args = get_args()
+    embed_model = load_embedding_model(args.embedding_model_path)
+    restaurants_data = pd.read_csv(args.corpus_path, dtype=str)
+    index_inverter = IndexInverter(restaurants_data=restaurants_data, bm25_parameters=BM25Parameters(),
+                                   index_path_name=args.index_path, persistent_index=True, analyzer=args.analyzer)
+
+    start = time.perf_counter()
+    matching_words = find_index_matching_words(embed_model, index_inverter)
+    word_count = build_embedding_store(embed_model, matching_words, args.top_k, args.out_store_path)
+    print(f"{word_count} of {len(embed_model.index_to_key)} words written to {args.out_store_path} "
+          f"in {time.perf_counter() - start:.1f} seconds")
+
+
+if __name__ == '__main__':
+    main()
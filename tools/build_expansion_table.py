@@ -0,0 +1,64 @@
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from ann_index import AnnIndex
+from index_inverter import IndexInverter
+from helpers import BM25Parameters
+from query_expansion import build_expansion_table, load_embedding_model
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--embedding_model_path', default="../models/GoogleNews-vectors-negative300.bin",
+                        type=str, help='word2vec model path')
+    parser.add_argument('--ann_index_path', default=None, type=str,
+                        help='Optional ANN index used instead of exact neighbour search')
+    parser.add_argument('--corpus_path', default="../data/restaurant_corpus.csv", type=str, help='Corpus path')
+    parser.add_argument('--index_path', default="../src/temp", type=str, help='Persistent Lucene index directory')
+    parser.add_argument('--analyzer', default="python", type=str, help='Text analysis mode of the index')
+    parser.add_argument('--embed_similarity_thr', default=0.6, type=float, help='Expansion similarity threshold')
+    parser.add_argument('--max_expansion_words', default=5, type=int, help='Maximum expansion words per term')
+    parser.add_argument('--out_table_path', default="../models/expansion_table.tsv", type=str,
+                        help='Output expansion table path')
+
+    args = parser.parse_args()
+    return args
+
+
+def find_query_words(embed_model, index_inverter: IndexInverter) -> list:
+    """
+    Surface Words of the Embedding Vocabulary that Stem to an Index Term
+    :param embed_model: Word embedding model
+    :param index_inverter: Index whose terms are matched
+    :return: Query words worth precomputing
+    """
+    index_terms = index_inverter.document_frequencies
+    return [word for word in embed_model.index_to_key
+            if '_' not in word and index_inverter.check_stop_word(word)
+            and any(term in index_terms for term in index_inverter.analyze_terms([word]))]
+
+
+def main():
+    args = get_args()
+    embed_model = load_embedding_model(args.embedding_model_path)
+    ann_index = AnnIndex.load(args.ann_index_path, embed_model) if args.ann_index_path is not None else None
+    restaurants_data = pd.read_csv(args.corpus_path, dtype=str)
+    index_inverter = IndexInverter(restaurants_data=restaurants_data, bm25_parameters=BM25Parameters(),
+                                   index_path_name=args.index_path, persistent_index=True, analyzer=args.analyzer)
+
+    start = time.perf_counter()
+    words = find_query_words(embed_model, index_inverter)
+    expansion_table = build_expansion_table(embed_model, words, index_inverter, args.embed_similarity_thr,
+                                            args.max_expansion_words, ann_index=ann_index)
+    expansion_table.save(args.out_table_path)
+    print(f"Expansions of {len(words)} words written to {args.out_table_path} "
+          f"in {time.perf_counter() - start:.1f} seconds")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from helpers import BM25Parameters, create_ranking_model
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--corpus_path', default="../data/restaurant_corpus.csv", type=str, help='Corpus')
+    parser.add_argument('--num_restaurants', default=500, type=int, help='Number of restaurants indexed')
+    parser.add_argument('--model', default="supp_model_1", type=str,
+                        help='IR model (mgr_guru, supp_model_1 or supp_model_2)')
+    parser.add_argument('--embedding_model_path', default="../data/word2vec.model", type=str,
+                        help='Pretrained word2vec model path, not used by supp_model_1')
+    parser.add_argument('--queries', default=["sushi omakase", "french wine terrace", "spicy noodles"], type=str,
+                        nargs='+', help='Queries searched before and after the delete')
+    parser.add_argument('--top_k', default=10, type=int, help='Number of top documents')
+    parser.add_argument('--index_path', default="incremental_index_check", type=str,
+                        help='Lucene directory of the check, deleted afterwards')
+
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = get_args()
+    restaurants_data = pd.read_csv(args.corpus_path).head(args.num_restaurants)
+    ranking_model = create_ranking_model(args.model, restaurants_data, BM25Parameters(),
+                                         embedding_model_path=args.embedding_model_path,
+                                         index_path_name=args.index_path)
+    index_inverter = ranking_model.index_inverter
+
+    is_failed = False
+    try:
+        for query in args.queries:
+            documents_id = ranking_model.sort_documents(query, args.top_k)
+            if len(documents_id) == 0:
+                print(f"'{query}': no results, skipped")
+                continue
+
+            # The Repeated Query is Answered from the Result Cache, Then the Top Restaurant is Deleted
+            hits = ranking_model.result_cache.statistics()['hits']
+            is_cached = ranking_model.sort_documents(query, args.top_k) == documents_id and \
+                ranking_model.result_cache.statistics()['hits'] == hits + 1
+            deleted_doc_id = int(documents_id[0])
+            changes = pd.DataFrame({'Action': ['delete'], 'Doc ID': [deleted_doc_id],
+                                    'Name': [restaurants_data['Name'].iloc[deleted_doc_id]], 'Data': [None]})
+            index_inverter.apply_corpus_changes(changes)
+
+            documents_id_after_delete = ranking_model.sort_documents(query, args.top_k)
+            is_deleted = deleted_doc_id not in documents_id_after_delete
+            print(f"'{query}': restaurant {deleted_doc_id} deleted, cached before: {is_cached}, "
+                  f"gone from the next result: {is_deleted}")
+            is_failed |= not (is_cached and is_deleted)
+    finally:
+        index_inverter.indexer.close()
+        index_inverter.delete_directory()
+
+    if is_failed:
+        print("FAILED: a deleted restaurant is still returned or the result cache was not used")
+        sys.exit(1)
+    print("PASSED")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import os
+import subprocess
+import sys
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.tripadvisor_fixture_server import TripadvisorFixtureServer
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--restaurants_path', default="../data/raw_data/restaurants_list.csv", type=str,
+                        help='Restaurant list, the first restaurants with saved reviews are crawled')
+    parser.add_argument('--reviews_paths', default=["../data/raw_data/restaurant_reviews.csv"], type=str,
+                        nargs='+', help='Saved reviews the fixture server shows')
+    parser.add_argument('--pages_path', default=None, type=str, help='Directory of saved TripAdvisor pages')
+    parser.add_argument('--num_restaurants', default=8, type=int, help='Number of restaurants crawled')
+    parser.add_argument('--num_pages_per_item', default=2, type=int, help='Number of review pages per restaurant')
+    parser.add_argument('--num_drivers', default=2, type=int, help='Number of drivers of the resumed run')
+    parser.add_argument('--headless', action='store_true', help='Run Chrome without a window')
+    parser.add_argument('--work_path', default="crawler_check", type=str, help='Directory of the generated files')
+
+    args = parser.parse_args()
+    return args
+
+
+def run_generator(args, restaurants_path: str, results_path: str, queue_path: str, base_url: str,
+                  num_drivers: int, max_jobs: int = None):
+    """
+    Run the Review Generator in Crawler Mode Against the Fixture Server
+    :param args: Command line arguments
+    :param restaurants_path: Restaurant list to crawl
+    :param results_path: Results file
+    :param queue_path: Job queue
+    :param base_url: Fixture server address
+    :param num_drivers: Number of drivers
+    :param max_jobs: Number of restaurants of this run, None crawls the rest
+    :return: None
+    """
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                            'tripadvisor_reviews_generator.py'),
+               '--crawler', '--restaurants_path', restaurants_path, '--results_path', results_path,
+               '--queue_path', queue_path, '--base_url', base_url, '--num_drivers', str(num_drivers),
+               '--num_pages_per_item', str(args.num_pages_per_item)]
+    if max_jobs is not None:
+        command += ['--max_jobs', str(max_jobs)]
+    if args.headless:
+        command.append('--headless')
+    subprocess.run(command, check=True)
+
+
+def main():
+    args = get_args()
+    os.makedirs(args.work_path, exist_ok=True)
+    results_path = os.path.join(args.work_path, 'ratings_reviews.csv')
+    queue_path = os.path.join(args.work_path, 'ratings_reviews_queue.sqlite')
+    for path in [results_path, queue_path, queue_path + '-wal', queue_path + '-shm']:
+        if os.path.exists(path):
+            os.remove(path)
+
+    # Restaurants with Saved Reviews, so Every Crawl is Compared with Something
+    saved_reviews = pd.concat([pd.read_csv(reviews_path, sep="½", dtype=str, keep_default_na=False, engine='python')
+                               for reviews_path in args.reviews_paths], ignore_index=True)
+    restaurants = pd.read_csv(args.restaurants_path)
+    restaurants = restaurants[restaurants['Name'].isin(saved_reviews['Name'])].head(args.num_restaurants)
+    restaurants_path = os.path.join(args.work_path, 'restaurants_list.csv')
+    restaurants.to_csv(restaurants_path, index=False)
+
+    fixture_server = TripadvisorFixtureServer(restaurants_path, args.reviews_paths, pages_path=args.pages_path)
+    base_url = fixture_server.start()
+    try:
+        # An Interrupted Run Followed by a Resumed Run with a Pool of Drivers
+        run_generator(args, restaurants_path, results_path, queue_path, base_url, num_drivers=1,
+                      max_jobs=len(restaurants) // 2)
+        run_generator(args, restaurants_path, results_path, queue_path, base_url, num_drivers=args.num_drivers)
+    finally:
+        fixture_server.stop()
+
+    crawled_reviews = pd.read_csv(results_path, sep="½", dtype=str, keep_default_na=False, engine='python')
+    columns = ['Name', 'Title', 'User', 'Date', 'Rating', 'Text']
+    num_reviews = args.num_pages_per_item * 10
+    is_same = True
+    for restaurant_name in restaurants['Name']:
+        expected = saved_reviews.loc[saved_reviews['Name'] == restaurant_name, columns].head(num_reviews)
+        crawled = crawled_reviews.loc[crawled_reviews['Name'] == restaurant_name, columns]
+        # The Browser Trims the Texts It Returns
+        expected = expected.apply(lambda column: column.str.strip()).reset_index(drop=True)
+        crawled = crawled.apply(lambda column: column.str.strip()).reset_index(drop=True)
+        restaurant_is_same = expected.equals(crawled)
+        print(f"{restaurant_name}: {len(crawled)} of {len(expected)} reviews {'' if restaurant_is_same else 'DIFFERENT'}")
+        is_same &= restaurant_is_same
+
+    if not is_same:
+        print("FAILED: the crawled reviews differ from the saved reviews")
+        sys.exit(1)
+    print("PASSED")
+
+
+if __name__ == '__main__':
+    main()
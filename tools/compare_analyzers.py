@@ -0,0 +1,45 @@
+import argparse
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from index_inverter import IndexInverter, ANALYZER_NAMES
+from helpers import BM25Parameters
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--corpus_path', default="../data/restaurant_corpus.csv", type=str, help='Corpus path')
+    parser.add_argument('--index_path', default="analyzer_index", type=str,
+                        help='Temporary Lucene index directory')
+
+    args = parser.parse_args()
+    return args
+
+
+def compare_analyzers(restaurants_data: pd.DataFrame, index_path: str):
+    """
+    Build the Index with Each Analyzer Mode and Report Index Size and Term Count
+    :param restaurants_data: Corpus
+    :param index_path: Temporary Lucene index directory
+    :return: Index statistics per analyzer
+    """
+    statistics = []
+    for analyzer in ANALYZER_NAMES:
+        index_inverter = IndexInverter(restaurants_data=restaurants_data, bm25_parameters=BM25Parameters(),
+                                       index_path_name=index_path, analyzer=analyzer)
+        statistics.append(index_inverter.index_statistics())
+        index_inverter.delete_directory()
+    return pd.DataFrame(statistics)
+
+
+def main():
+    args = get_args()
+    restaurants_data = pd.read_csv(args.corpus_path, dtype=str)
+    print(compare_analyzers(restaurants_data, args.index_path).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
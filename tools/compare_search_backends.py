@@ -0,0 +1,106 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from index_inverter import IndexInverter
+from helpers import BM25Parameters, remove_punctuation
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--corpus_path', default="../data/restaurant_corpus.csv", type=str, help='Corpus path')
+    parser.add_argument('--query_results_path', default="../data/query_results.csv", type=str,
+                        help='Query log whose queries are compared')
+    parser.add_argument('--random_queries', default=500, type=int,
+                        help='Number of additional queries made of random index terms')
+    parser.add_argument('--terms_per_query', default=8, type=int, help='Number of terms of a random query')
+    parser.add_argument('--top_k', default=10, type=int, help='Number of top documents compared per query')
+    parser.add_argument('--score_tolerance', default=1e-4, type=float,
+                        help='Maximum relative score difference of a document ranked by both backends')
+    parser.add_argument('--min_overlap', default=0.99, type=float,
+                        help='Minimum mean fraction of shared top documents')
+    parser.add_argument('--seed', default=0, type=int, help='Random seed')
+
+    args = parser.parse_args()
+    return args
+
+
+def build_index(restaurants_data: pd.DataFrame, backend: str) -> tuple:
+    """
+    Build an Index with the Given Backend and Measure the Build Time
+    :param restaurants_data: Corpus
+    :param backend: Search backend name
+    :return: Index and build time in seconds
+    """
+    start = time.perf_counter()
+    index_inverter = IndexInverter(restaurants_data=restaurants_data, bm25_parameters=BM25Parameters(),
+                                   index_path_name=f"compare_{backend}_index", backend=backend)
+    return index_inverter, time.perf_counter() - start
+
+
+def compare_rankings(lucene_index: IndexInverter, sparse_index: IndexInverter, queries_terms: list,
+                     top_k: int) -> pd.DataFrame:
+    """
+    Compare the Top Documents and Scores of Both Backends per Query
+    :param lucene_index: Index with the Lucene backend
+    :param sparse_index: Index with the sparse backend
+    :param queries_terms: Terms List of each Query
+    :param top_k: Number of top documents compared per query
+    :return: Per query comparison (same order, overlap, maximum relative score difference)
+    """
+    rows = []
+    for query_terms in queries_terms:
+        lucene_ids, lucene_scores = lucene_index.search_query_term(query_terms, top_k)
+        sparse_ids, sparse_scores = sparse_index.search_query_term(query_terms, top_k)
+
+        sparse_score_of = dict(zip(sparse_ids, sparse_scores))
+        score_differences = [abs(sparse_score_of[doc_id] - score) / max(abs(score), 1e-12)
+                             for doc_id, score in zip(lucene_ids, lucene_scores) if doc_id in sparse_score_of]
+        rows.append({'Same Order': lucene_ids == sparse_ids,
+                     'Overlap': len(set(lucene_ids) & set(sparse_ids)) / max(len(lucene_ids), 1),
+                     'Max Score Difference': max(score_differences, default=0.0)})
+    return pd.DataFrame(rows)
+
+
+def main():
+    args = get_args()
+    restaurants_data = pd.read_csv(args.corpus_path, dtype=str)
+    lucene_index, lucene_seconds = build_index(restaurants_data, 'lucene')
+    sparse_index, sparse_seconds = build_index(restaurants_data, 'sparse')
+    print(f"Build time: lucene {lucene_seconds:.1f}s, sparse {sparse_seconds:.1f}s")
+
+    # Query Log Queries and Random Queries Over the Whole Vocabulary
+    queries = [remove_punctuation(query) for query in pd.read_csv(args.query_results_path)['Query'].unique()]
+    queries_terms = [lucene_index.analyze_query(query) for query in queries]
+    random_state = np.random.default_rng(args.seed)
+    vocabulary = sorted(lucene_index.document_frequencies)
+    queries_terms += [list(random_state.choice(vocabulary, args.terms_per_query, replace=False))
+                      for _ in range(args.random_queries)]
+
+    try:
+        comparison = compare_rankings(lucene_index, sparse_index, queries_terms, args.top_k)
+    finally:
+        lucene_index.delete_directory()
+        sparse_index.delete_directory()
+
+    same_order_rate = comparison['Same Order'].mean()
+    mean_overlap = comparison['Overlap'].mean()
+    max_score_difference = comparison['Max Score Difference'].max()
+    print(f"Queries: {len(comparison)}")
+    print(f"Identical top-{args.top_k} order: {same_order_rate:.2%}")
+    print(f"Mean top-{args.top_k} overlap: {mean_overlap:.4f} (minimum {args.min_overlap})")
+    print(f"Max relative score difference: {max_score_difference:.2e} (tolerance {args.score_tolerance:.0e})")
+
+    if mean_overlap < args.min_overlap or max_score_difference > args.score_tolerance:
+        print("FAILED: sparse backend does not agree with Lucene within the tolerance")
+        sys.exit(1)
+    print("PASSED")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from helpers import BM25Parameters
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--old_corpus_path', default="../data/restaurant_corpus.csv", type=str,
+                        help='Corpus the index was built from')
+    parser.add_argument('--new_corpus_path', default="../data/restaurant_corpus_new.csv", type=str,
+                        help='Newly generated corpus')
+    parser.add_argument('--out_changes_path', default="../data/corpus_changes.csv", type=str,
+                        help='Changed rows (upserts and deletes)')
+    parser.add_argument('--out_corpus_path', default="../data/restaurant_corpus_updated.csv", type=str,
+                        help='New corpus in the row order of the old corpus, so Restaurant IDs stay stable')
+    parser.add_argument('--index_path', default=None, type=str,
+                        help='Persistent Lucene index to apply the changes to, default only writes the changes')
+    parser.add_argument('--analyzer', default="python", type=str,
+                        help='Analyzer the index was built with (python or lucene)')
+
+    args = parser.parse_args()
+    return args
+
+
+def row_keys(restaurants_data: pd.DataFrame) -> pd.Index:
+    """
+    Unique Key of each Restaurant: Name, Michelin Guide Link and the Occurrence of the Pair
+    Names are not unique (e.g. Nobu or Zuma in several cities), the occurrence tells exact duplicate rows apart
+    :param restaurants_data: Corpus
+    :return: Row keys in corpus order
+    """
+    names = restaurants_data['Name'].astype(object).fillna('')
+    links = restaurants_data['Link'].astype(object).fillna('')
+    occurrences = restaurants_data.groupby([names, links], sort=False).cumcount()
+    return pd.Index(names + '\x1f' + links + '\x1f' + occurrences.astype(str), name='Key')
+
+
+def row_hashes(restaurants_data: pd.DataFrame) -> pd.Series:
+    """
+    Hash of the Indexed Columns of each Restaurant, Keyed by the Unique Row Key
+    :param restaurants_data: Corpus
+    :return: Row hashes indexed by row key
+    """
+    hashes = pd.util.hash_pandas_object(restaurants_data[['Name', 'Data']], index=False)
+    return pd.Series(hashes.values, index=row_keys(restaurants_data))
+
+
+def diff_corpora(old_restaurants_data: pd.DataFrame, new_restaurants_data: pd.DataFrame) -> tuple:
+    """
+    Find Added, Changed and Removed Restaurants
+    Changed restaurants keep their row, added ones are appended and removed ones keep their row without data,
+    so the Restaurant IDs of the index and of logged clicks remain valid
+    :param old_restaurants_data: Corpus the index was built from
+    :param new_restaurants_data: Newly generated corpus
+    :return: Changed rows and the updated corpus
+    """
+    old_hashes, new_hashes = row_hashes(old_restaurants_data), row_hashes(new_restaurants_data)
+    new_rows = new_restaurants_data.set_axis(new_hashes.index)
+
+    # Changed and Unchanged Restaurants in the Old Row Order, Then the Added Restaurants
+    updated_restaurants_data = old_restaurants_data.copy()
+    is_kept = old_hashes.index.isin(new_hashes.index)
+    kept_keys = old_hashes.index[is_kept]
+    for column in new_restaurants_data.columns.intersection(updated_restaurants_data.columns):
+        updated_restaurants_data.loc[is_kept, column] = new_rows.loc[kept_keys, column].values
+    updated_restaurants_data.loc[~is_kept, 'Data'] = np.nan
+    added_keys = new_hashes.index.difference(old_hashes.index, sort=False)
+    updated_restaurants_data = pd.concat([updated_restaurants_data, new_rows.loc[added_keys]], ignore_index=True)
+
+    # Changed or Added Restaurants are Upserted, Removed Ones are Deleted Unless they Were Already Deleted
+    is_changed = np.zeros(len(updated_restaurants_data), dtype=bool)
+    is_changed[np.flatnonzero(is_kept)] = old_hashes.values[is_kept] != new_hashes[kept_keys].values
+    is_changed[len(old_restaurants_data):] = True
+    is_removed = np.zeros(len(updated_restaurants_data), dtype=bool)
+    is_removed[:len(old_restaurants_data)] = ~is_kept & old_restaurants_data['Data'].notna().values
+    has_data = updated_restaurants_data['Data'].notna().values
+
+    changes = pd.DataFrame({'Action': np.where(has_data, 'upsert', 'delete'),
+                            'Doc ID': np.arange(len(updated_restaurants_data)),
+                            'Name': updated_restaurants_data['Name'].values,
+                            'Data': updated_restaurants_data['Data'].values})[is_changed | is_removed]
+    return changes.reset_index(drop=True), updated_restaurants_data
+
+
+def main():
+    args = get_args()
+    old_restaurants_data = pd.read_csv(args.old_corpus_path, dtype=str)
+    new_restaurants_data = pd.read_csv(args.new_corpus_path, dtype=str)
+    changes, updated_restaurants_data = diff_corpora(old_restaurants_data, new_restaurants_data)
+
+    changes.to_csv(args.out_changes_path, index=False)
+    updated_restaurants_data.to_csv(args.out_corpus_path, index=False)
+    print(f"Restaurants: {len(updated_restaurants_data)}, upserts: {(changes['Action'] == 'upsert').sum()}, "
+          f"deletes: {(changes['Action'] == 'delete').sum()}")
+
+    if args.index_path is not None:
+        from index_inverter import IndexInverter
+
+        # The Stored Index Matches the Old Corpus, so it is Opened Without Re-Indexing
+        index_inverter = IndexInverter(restaurants_data=old_restaurants_data, bm25_parameters=BM25Parameters(),
+                                       index_path_name=args.index_path, persistent_index=True,
+                                       analyzer=args.analyzer)
+        counts = index_inverter.apply_corpus_changes(changes, updated_restaurants_data)
+        print(f"Applied to {args.index_path}: {counts['upsert']} upserts, {counts['delete']} deletes, "
+              f"{index_inverter.backend.num_documents} documents")
+        index_inverter.indexer.close()
+
+
+if __name__ == '__main__':
+    main()
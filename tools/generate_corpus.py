@@ -1,6 +1,35 @@
 
 import pandas as pd
+import numpy as np
 import argparse
+import heapq
+import os
+import shutil
+
+# Review Files Use the Two Byte '½' Separator, it is Rewritten to a One Byte Separator for pandas' C Parser
+REVIEW_SEPARATOR = '½'
+FAST_SEPARATOR = '\x1f'
+REVIEW_COLUMNS_TO_DROP = ['Unnamed: 0']
+CORPUS_COLUMNS = ['Name', 'Link', 'Content', 'Rating', 'Data']
+
+def merge_in_michelin_order(michelin_guide_data: pd.DataFrame, reviews: pd.DataFrame) -> pd.DataFrame:
+    """
+    Outer Merge of the Michelin Guide Data and the Joined Reviews in the Row Order of the Existing Data Files
+    Names come in order of first appearance in the Michelin Guide data with the rows of a repeated name together,
+    then the restaurants that only have reviews in name order. pandas gave an outer merge this order before
+    version 2.2, later versions sort all names, which would change the document ids
+    :param michelin_guide_data: Michelin Guide Data
+    :param reviews: Reviews joined per restaurant, sorted by name
+    :return: Merged restaurant data
+    """
+    codes, _ = pd.factorize(michelin_guide_data['Name'], use_na_sentinel=False)
+    michelin_guide_data = michelin_guide_data.iloc[np.argsort(codes, kind='stable')]
+    restaurant_data = pd.merge(michelin_guide_data, reviews, on='Name', how='left')
+    reviews_only = reviews[~reviews['Name'].isin(michelin_guide_data['Name'])]
+    if len(reviews_only) > 0:
+        restaurant_data = pd.concat([restaurant_data, reviews_only], ignore_index=True)
+    return restaurant_data
+
 
 def merge_restaurant_data_and_reviews(michelin_guide_data_path: str, tripadvisor_restaurant_reviews_paths:list,
                                       out_corpus_path: str):
@@ -22,10 +51,10 @@ def merge_restaurant_data_and_reviews(michelin_guide_data_path: str, tripadvisor
 
     merged_tripadvisor_reviews = pd.concat(tripadvisor_reviews)
     for column in merged_tripadvisor_reviews.columns:
-        merged_tripadvisor_reviews[column] = merged_tripadvisor_reviews[column].astype(str)
+        merged_tripadvisor_reviews[column] = merged_tripadvisor_reviews[column].fillna('nan').astype(str)
 
     merged_tripadvisor_reviews = merged_tripadvisor_reviews.groupby('Name').agg(' '.join).reset_index()
-    restaurant_corpus = pd.merge(michelin_guide_data, merged_tripadvisor_reviews, on='Name', how='outer')
+    restaurant_corpus = merge_in_michelin_order(michelin_guide_data, merged_tripadvisor_reviews)
 
     # Merge Michelin Guide Data and Reviews
     restaurant_corpus['Data'] = restaurant_corpus['Content'] +\
@@ -41,10 +70,291 @@ def merge_restaurant_data_and_reviews(michelin_guide_data_path: str, tripadvisor
     restaurant_corpus.to_csv(out_corpus_path)
 
 
+class SeparatorTranslatingFile:
+    def __init__(self, path: str, block_size: int = 1 << 22):
+        """
+        Binary File Reader that Replaces the '½' Separator with a One Byte Separator While Reading
+        :param path: Review file path
+        :param block_size: Number of bytes read at once
+        """
+        self.file = open(path, 'rb')
+        self.block_size = block_size
+        self.pending = b''
+        self.source_separator = REVIEW_SEPARATOR.encode('utf-8')
+        self.target_separator = FAST_SEPARATOR.encode('utf-8')
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read Translated Bytes, a Separator Split Between Two Blocks is Kept Until the Next Read
+        :param size: Requested number of bytes, the translated block may be shorter
+        :return: Translated bytes
+        """
+        block = self.pending + self.file.read(self.block_size if size is None or size < 0 else max(size, 2))
+        if self.target_separator in block:
+            raise ValueError(f"{self.file.name} contains the byte {self.target_separator!r} used as separator")
+        keep = 1 if block.endswith(self.source_separator[:1]) else 0
+        self.pending = block[len(block) - keep:]
+        return block[:len(block) - keep].replace(self.source_separator, self.target_separator)
+
+    def close(self):
+        self.file.close()
+
+
+def read_reviews_in_chunks(review_paths: list, chunk_size: int):
+    """
+    Read Review Files Chunk by Chunk with the C Parser, Values are Cast to str Like merge_restaurant_data_and_reviews
+    :param review_paths: TripAdvisor review files
+    :param chunk_size: Number of reviews per chunk
+    :return: Review chunk generator
+    """
+    for review_path in review_paths:
+        review_file = SeparatorTranslatingFile(review_path)
+        try:
+            for chunk in pd.read_csv(review_file, sep=FAST_SEPARATOR, dtype=str, chunksize=chunk_size,
+                                     encoding='utf-8'):
+                chunk = chunk.drop(columns=REVIEW_COLUMNS_TO_DROP, errors='ignore')
+                # A '½' Inside a Quoted Review was Translated Too, it is Restored After Parsing
+                for column in chunk.columns:
+                    if chunk[column].str.contains(FAST_SEPARATOR, regex=False).any():
+                        chunk[column] = chunk[column].str.replace(FAST_SEPARATOR, REVIEW_SEPARATOR, regex=False)
+                # Missing Values Become 'nan' as with astype(str) in pandas 2
+                yield chunk.fillna('nan').astype(str)
+        finally:
+            review_file.close()
+
+
+def partition_of_names(names: pd.Series, num_partitions: int) -> np.ndarray:
+    """
+    Partition of each Restaurant Name, Reviews and Michelin Guide Rows of a Restaurant Share the Partition
+    :param names: Restaurant names
+    :param num_partitions: Number of partitions
+    :return: Partition numbers
+    """
+    return pd.util.hash_array(names.to_numpy(dtype=object)) % num_partitions
+
+
+def spill_reviews_to_partitions(review_paths: list, work_path: str, num_partitions: int, chunk_size: int) -> int:
+    """
+    Append Each Review to an Arrow Partition File Chosen by the Hash of the Restaurant Name
+    All reviews of a restaurant land in one partition, in file order
+    :param review_paths: TripAdvisor review files
+    :param work_path: Directory of the partition files
+    :param num_partitions: Number of partitions
+    :param chunk_size: Number of reviews per chunk
+    :return: Number of reviews
+    """
+    import pyarrow as pa
+
+    schema, writers, num_reviews = None, {}, 0
+    try:
+        for chunk in read_reviews_in_chunks(review_paths, chunk_size):
+            if schema is None:
+                schema = pa.schema([(column, pa.string()) for column in chunk.columns])
+            chunk = chunk[schema.names]
+            num_reviews += len(chunk)
+            for partition, partition_chunk in chunk.groupby(partition_of_names(chunk['Name'], num_partitions),
+                                                            sort=False):
+                if partition not in writers:
+                    writers[partition] = pa.ipc.new_stream(os.path.join(work_path, f"reviews_{partition}.arrow"),
+                                                           schema)
+                writers[partition].write_table(pa.Table.from_pandas(partition_chunk, schema=schema,
+                                                                    preserve_index=False))
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return num_reviews
+
+
+def read_arrow(path: str) -> pd.DataFrame:
+    """
+    Read an Arrow Partition File with object Columns, Like the Data Frames of the Previous Script
+    :param path: Arrow stream file path
+    :return: Data frame
+    """
+    import pyarrow as pa
+
+    with pa.ipc.open_stream(path) as reader:
+        return reader.read_all().to_pandas().astype(object)
+
+
+def merge_partitions(michelin_guide_data: pd.DataFrame, work_path: str, num_partitions: int,
+                     is_corpus: bool = True, is_evaluation_set: bool = False) -> tuple:
+    """
+    Join the Reviews of each Restaurant and Merge them with the Michelin Guide Data One Partition at a Time
+    Each partition is merged exactly like merge_restaurant_data_and_reviews and its corpus rows are written with
+    their position in the merge order, the evaluation set labels are derived from the same merge
+    :param michelin_guide_data: Michelin Guide Data
+    :param work_path: Directory of the partition files
+    :param num_partitions: Number of partitions
+    :param is_corpus: Write the corpus rows of each partition
+    :param is_evaluation_set: Derive the evaluation set of each partition
+    :return: Paths of the sorted corpus partitions, evaluation set partitions and number of restaurants
+    """
+    import pyarrow as pa
+    from generate_evaluation_set import derive_evaluation_set
+
+    schema = pa.schema([(column, pa.string()) for column in CORPUS_COLUMNS] + [('Order', pa.int64())])
+    # Restaurants that Only Have Reviews Come After All Michelin Guide Names
+    michelin_names = pd.Index(pd.factorize(michelin_guide_data['Name'], use_na_sentinel=False)[1])
+    michelin_partitions = partition_of_names(michelin_guide_data['Name'], num_partitions)
+    run_paths, evaluation_sets, num_restaurants = [], [], 0
+    for partition in range(num_partitions):
+        partition_path = os.path.join(work_path, f"reviews_{partition}.arrow")
+        michelin_partition = michelin_guide_data[michelin_partitions == partition]
+        if not os.path.exists(partition_path) and len(michelin_partition) == 0:
+            continue
+
+        if os.path.exists(partition_path):
+            reviews = read_arrow(partition_path).groupby('Name').agg(' '.join).reset_index()
+            os.remove(partition_path)
+        else:
+            reviews = pd.DataFrame(columns=['Name', 'Title', 'Text', 'Rating'], dtype=object)
+        restaurant_corpus = merge_in_michelin_order(michelin_partition, reviews)
+        order = michelin_names.get_indexer(restaurant_corpus['Name'])
+        restaurant_corpus['Order'] = np.where(order >= 0, order, len(michelin_names))
+        num_restaurants += len(restaurant_corpus)
+        if is_evaluation_set:
+            evaluation_sets.append(derive_evaluation_set(restaurant_corpus).assign(Order=restaurant_corpus['Order']))
+        if not is_corpus:
+            continue
+        restaurant_corpus['Data'] = restaurant_corpus['Content'] + \
+                                    restaurant_corpus['Detail'] + \
+                                    restaurant_corpus['Title'].fillna('-') + \
+                                    restaurant_corpus['Text'].fillna('-')
+
+        run_path = os.path.join(work_path, f"corpus_{partition}.arrow")
+        with pa.ipc.new_stream(run_path, schema) as writer:
+            writer.write_table(pa.Table.from_pandas(restaurant_corpus[CORPUS_COLUMNS + ['Order']], schema=schema,
+                                                    preserve_index=False))
+        run_paths.append(run_path)
+    return run_paths, evaluation_sets, num_restaurants
+
+
+def iterate_sorted_rows(path: str):
+    """
+    Corpus Rows of a Partition, Read Batch by Batch
+    :param path: Corpus partition path
+    :return: Row tuple generator, the name comes first and the merge order last
+    """
+    import pyarrow as pa
+
+    with pa.ipc.open_stream(path) as reader:
+        for batch in reader:
+            yield from zip(*[column.to_pylist() for column in batch.columns])
+
+
+class CorpusWriter:
+    def __init__(self, out_corpus_path: str, batch_size: int = 10000):
+        """
+        Write Corpus Rows in Batches, as Parquet for a .parquet Path, as an Uncompressed Arrow File for an .arrow Path
+        that can be Memory-Mapped, as CSV Otherwise
+        :param out_corpus_path: Output corpus path
+        :param batch_size: Number of rows written at once
+        """
+        self.out_corpus_path = out_corpus_path
+        self.batch_size = batch_size
+        self.is_parquet = out_corpus_path.endswith('.parquet')
+        self.is_arrow = out_corpus_path.endswith('.arrow')
+        self.rows = []
+        self.num_rows = 0
+        self.columnar_writer = None
+
+    def add(self, row: tuple):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the Buffered Rows
+        :return: None
+        """
+        batch = pd.DataFrame(self.rows, columns=CORPUS_COLUMNS, dtype=object)
+        batch.index += self.num_rows
+        if self.is_parquet or self.is_arrow:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = pa.schema([(column, pa.string()) for column in CORPUS_COLUMNS])
+            if self.columnar_writer is None:
+                self.columnar_writer = pq.ParquetWriter(self.out_corpus_path, schema) if self.is_parquet \
+                    else pa.ipc.new_file(self.out_corpus_path, schema)
+            self.columnar_writer.write_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+        else:
+            # The Row Position is Written as the Index Column, Like the Previous Script
+            batch.to_csv(self.out_corpus_path, mode='a' if self.num_rows > 0 else 'w', header=self.num_rows == 0)
+        self.num_rows += len(batch)
+        self.rows = []
+
+    def close(self):
+        if len(self.rows) > 0 or self.num_rows == 0:
+            self.flush()
+        if self.columnar_writer is not None:
+            self.columnar_writer.close()
+
+
+def build_restaurant_corpus(michelin_guide_data_path: str, tripadvisor_restaurant_reviews_paths: list,
+                            out_corpus_path: str, out_evaluation_set_path: str = None, work_path: str = 'corpus_build',
+                            num_partitions: int = 64, chunk_size: int = 200000) -> dict:
+    """
+    Streaming Version of merge_restaurant_data_and_reviews and generate_evaluation_set with the Same Outputs
+    Reviews are read in chunks and spilled to hash partitions by restaurant name, each partition is joined and merged
+    with its Michelin Guide rows on its own, then the sorted partitions are merged by name, so memory is bounded
+    by a partition. Both outputs are derived from the same read and merge.
+    :param michelin_guide_data_path: Michelin Guide Data
+    :param tripadvisor_restaurant_reviews_paths: TripAdvisor Restaurant Reviews
+    :param out_corpus_path: Corpus Data Saving Path (.csv, .parquet or .arrow), None to skip the corpus
+    :param out_evaluation_set_path: Evaluation Data Saving Path, None to skip the evaluation set
+    :param work_path: Directory of the temporary partition files
+    :param num_partitions: Number of partitions, more partitions use less memory
+    :param chunk_size: Number of reviews read at once
+    :return: Number of reviews and restaurants
+    """
+    if os.path.exists(work_path):
+        shutil.rmtree(work_path)
+    os.makedirs(work_path)
+    try:
+        num_reviews = spill_reviews_to_partitions(tripadvisor_restaurant_reviews_paths, work_path,
+                                                  num_partitions, chunk_size)
+        run_paths, evaluation_sets, num_restaurants = merge_partitions(
+            pd.read_csv(michelin_guide_data_path), work_path, num_partitions, is_corpus=out_corpus_path is not None,
+            is_evaluation_set=out_evaluation_set_path is not None)
+
+        # Rows are Merged by Michelin Guide Order, then by Name for Restaurants that Only Have Reviews
+        if out_corpus_path is not None:
+            corpus_writer = CorpusWriter(out_corpus_path)
+            for row in heapq.merge(*[iterate_sorted_rows(run_path) for run_path in run_paths],
+                                   key=lambda row: (row[-1], row[0])):
+                corpus_writer.add(row[:-1])
+            corpus_writer.close()
+        # A Restaurant Name Belongs to One Partition, so a Stable Sort Keeps the Order of the Same Names
+        if out_evaluation_set_path is not None:
+            evaluation_set = pd.concat(evaluation_sets, ignore_index=True).sort_values(['Order', 'Name'],
+                                                                                       kind='stable')
+            evaluation_set.drop(columns='Order').to_csv(out_evaluation_set_path, index=False)
+    finally:
+        shutil.rmtree(work_path)
+    return {'reviews': num_reviews, 'restaurants': num_restaurants}
+
+
 def main(args):
-    merge_restaurant_data_and_reviews(michelin_guide_data_path=args.restaurant_michelin_data_path,
-                                      tripadvisor_restaurant_reviews_paths=args.restaurant_tripadvisor_reviews_path,
-                                      out_corpus_path=args.out_corpus_path)
+    if args.legacy:
+        merge_restaurant_data_and_reviews(michelin_guide_data_path=args.restaurant_michelin_data_path,
+                                          tripadvisor_restaurant_reviews_paths=args.restaurant_tripadvisor_reviews_path,
+                                          out_corpus_path=args.out_corpus_path)
+        if args.out_evaluation_set_path is not None:
+            from generate_evaluation_set import generate_evaluation_set
+
+            generate_evaluation_set(michelin_guide_data_path=args.restaurant_michelin_data_path,
+                                    tripadvisor_restaurant_reviews_paths=args.restaurant_tripadvisor_reviews_path,
+                                    out_evaluation_set_path=args.out_evaluation_set_path)
+        return
+    counts = build_restaurant_corpus(michelin_guide_data_path=args.restaurant_michelin_data_path,
+                                     tripadvisor_restaurant_reviews_paths=args.restaurant_tripadvisor_reviews_path,
+                                     out_corpus_path=args.out_corpus_path,
+                                     out_evaluation_set_path=args.out_evaluation_set_path, work_path=args.work_path,
+                                     num_partitions=args.num_partitions, chunk_size=args.chunk_size)
+    print(f"{counts['reviews']} reviews, {counts['restaurants']} restaurants written to {args.out_corpus_path}")
 
 
 if __name__ == '__main__':
@@ -60,10 +370,24 @@ if __name__ == '__main__':
                                  "../data/restaurant_reviews_3.csv",
                                  "../data/restaurant_reviews_4.csv",
                                  "../data/restaurant_reviews_5.csv"],
-                        type=list, help='TripAdvisor Restaurant Reviews')
+                        type=str, nargs='+', help='TripAdvisor Restaurant Reviews')
 
     parser.add_argument('--out_corpus_path', default="../data/restaurant_corpus.csv",
-                        type=str, help='Output Corpus Path')
+                        type=str, help='Output Corpus Path (.csv, .parquet or .arrow for the columnar formats)')
+
+    parser.add_argument('--out_evaluation_set_path', default=None, type=str,
+                        help='Also Write the Evaluation Set from the Same Merge (../data/evaluation_set.csv)')
+
+    parser.add_argument('--legacy', action='store_true',
+                        help='Build the corpus in memory with the previous implementation')
+
+    parser.add_argument('--work_path', default="corpus_build", type=str,
+                        help='Directory of the temporary review partitions')
+
+    parser.add_argument('--num_partitions', default=64, type=int,
+                        help='Number of review partitions, more partitions use less memory')
+
+    parser.add_argument('--chunk_size', default=200000, type=int, help='Number of reviews read at once')
 
     args = parser.parse_args()
     main(args)
@@ -2,6 +2,7 @@
 import pandas as pd
 import numpy as np
 import argparse
+from generate_corpus import build_restaurant_corpus, merge_in_michelin_order
 
 char_mappings = {
     'ı': 'i',
@@ -17,6 +18,7 @@ char_mappings = {
     'Ö': 'O',
     'Ç': 'C'
 }
+CHAR_TRANSLATION_TABLE = str.maketrans(char_mappings)
 
 def generate_evaluation_set(michelin_guide_data_path: str,
                             tripadvisor_restaurant_reviews_paths:list, out_evaluation_set_path: str):
@@ -36,11 +38,11 @@ def generate_evaluation_set(michelin_guide_data_path: str,
 
     merged_tripadvisor_reviews = pd.concat(tripadvisor_reviews)
     for column in merged_tripadvisor_reviews.columns:
-        merged_tripadvisor_reviews[column] = merged_tripadvisor_reviews[column].astype(str)
+        merged_tripadvisor_reviews[column] = merged_tripadvisor_reviews[column].fillna('nan').astype(str)
 
     ## Manually Labelled for Terrace, Wine Menu and Vegetarian Menu
     merged_tripadvisor_reviews = merged_tripadvisor_reviews.groupby('Name').agg(' '.join).reset_index()
-    evaluation_set = pd.merge(michelin_guide_data, merged_tripadvisor_reviews, on='Name', how='outer')
+    evaluation_set = merge_in_michelin_order(michelin_guide_data, merged_tripadvisor_reviews)
     evaluation_set['Cuisine Type'] = evaluation_set['Content'].str.split(r'[\n·]').apply(lambda x: x[-1])
     evaluation_set['Expensiveness'] = evaluation_set['Content'].str.split(r'[\n·]').apply(lambda x: len(x[-2]))
     evaluation_set['Country'] = evaluation_set['Content'].str.split(r'[\n·]').apply(lambda x: x[1].split(r',')[-1])
@@ -63,10 +65,62 @@ def generate_evaluation_set(michelin_guide_data_path: str,
     evaluation_set.to_csv(out_evaluation_set_path, index=False)
 
 
+def calculate_mean_ratings(ratings: pd.Series) -> np.ndarray:
+    """
+    Mean of the Space Separated Ratings of each Restaurant, 0 for Restaurants Without Reviews
+    All ratings are parsed at once, then rows with the same number of ratings are averaged together as one matrix,
+    so each mean is summed in the same order as np.mean of the row
+    :param ratings: Joined review ratings of each restaurant
+    :return: Mean ratings
+    """
+    ratings = ratings.fillna('0').astype(str)
+    counts = ratings.str.count(r'\S+').to_numpy()
+    values = np.fromstring(' '.join(ratings), sep=' ')
+    if len(values) != counts.sum():
+        raise ValueError("Ratings contain values that are not numbers")
+    offsets = np.cumsum(counts) - counts
+
+    mean_ratings = np.full(len(counts), np.nan)
+    for count in np.unique(counts[counts > 0]):
+        rows = np.flatnonzero(counts == count)
+        mean_ratings[rows] = values[offsets[rows, np.newaxis] + np.arange(count)].mean(axis=1)
+    return mean_ratings
+
+
+def derive_evaluation_set(restaurant_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Evaluation Set Labels with Vectorized String Operations, the Same Values as generate_evaluation_set
+    Content is split by new lines and '·': the second part ends with the country, the one before last is the
+    price range and the last one is the cuisine type
+    :param restaurant_data: Michelin Guide Data merged with the reviews joined per restaurant
+    :return: Evaluation set
+    """
+    content, services = restaurant_data['Content'], restaurant_data['Services']
+    last_parts = content.str.replace('\n', '·', regex=False).str.rsplit('·', n=2)
+    evaluation_set = pd.DataFrame({'Name': restaurant_data['Name']})
+    evaluation_set['Cuisine Type'] = last_parts.str[-1]
+    evaluation_set['Expensiveness'] = last_parts.str[-2].str.len()
+    evaluation_set['Country'] = content.str.extract(r'\A[^\n·]*[\n·](?:[^\n·]*,)?([^\n·,]*)', expand=False) \
+        .str.replace(' ', '', regex=False) \
+        .str.translate(CHAR_TRANSLATION_TABLE) \
+        .str.replace('Turkiye', 'Turkey', regex=False)
+    evaluation_set['Mean Rating'] = calculate_mean_ratings(restaurant_data['Rating'])
+    evaluation_set['Terrace Available'] = services.str.contains('Terrace', regex=False)
+    evaluation_set['Vegetarian Menu Available'] = services.str.contains('[vV]egetarian')
+    evaluation_set['Wine Menu Available'] = services.str.contains('[wW]ine')
+    return evaluation_set
+
+
 def main(args):
-    generate_evaluation_set(michelin_guide_data_path=args.restaurant_michelin_data_path,
-                                      tripadvisor_restaurant_reviews_paths=args.restaurant_tripadvisor_reviews_path,
-                                      out_evaluation_set_path=args.out_evaluation_set_path)
+    if args.legacy:
+        generate_evaluation_set(michelin_guide_data_path=args.restaurant_michelin_data_path,
+                                tripadvisor_restaurant_reviews_paths=args.restaurant_tripadvisor_reviews_path,
+                                out_evaluation_set_path=args.out_evaluation_set_path)
+        return
+    build_restaurant_corpus(michelin_guide_data_path=args.restaurant_michelin_data_path,
+                            tripadvisor_restaurant_reviews_paths=args.restaurant_tripadvisor_reviews_path,
+                            out_corpus_path=None, out_evaluation_set_path=args.out_evaluation_set_path,
+                            work_path=args.work_path)
 
 
 if __name__ == '__main__':
@@ -82,10 +136,16 @@ if __name__ == '__main__':
                                   "../data/restaurant_reviews_3.csv",
                                  "../data/restaurant_reviews_4.csv",
                                  "../data/restaurant_reviews_5.csv"],
-                        type=list, help='TripAdvisor Restaurant Reviews')
+                        type=str, nargs='+', help='TripAdvisor Restaurant Reviews')
 
     parser.add_argument('--out_evaluation_set_path', default="../data/evaluation_set.csv",
                         type=str, help='Output Evaluation Path')
 
+    parser.add_argument('--legacy', action='store_true',
+                        help='Build the evaluation set with the previous row by row implementation')
+
+    parser.add_argument('--work_path', default="corpus_build", type=str,
+                        help='Directory of the temporary review partitions')
+
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,73 @@
+import argparse
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--url', default="http://127.0.0.1:8080", type=str, help='Search service address')
+    parser.add_argument('--queries', default=["pizza in rome", "vegan restaurant in paris"], type=str, nargs='+',
+                        help='Queries sent to the service')
+    parser.add_argument('--top_k', default=10, type=int, help='Number of restaurants requested per query')
+    parser.add_argument('--clicks', default=2, type=int,
+                        help='Number of top results clicked per query, 0 skips the click requests')
+    parser.add_argument('--concurrency', default=4, type=int, help='Number of requests sent at the same time')
+
+    args = parser.parse_args()
+    return args
+
+
+def send_request(url: str, body: dict = None) -> dict:
+    """
+    Send a GET Request, or a POST Request with a JSON Body, and Decode the JSON Response
+    :param url: Request URL
+    :param body: JSON body, None sends a GET request
+    :return: Decoded response
+    """
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def search(url: str, query: str, top_k: int) -> tuple:
+    """
+    Search a Query and Measure the Latency
+    :param url: Search service address
+    :param query: Query
+    :param top_k: Number of restaurants requested
+    :return: Response and latency in seconds
+    """
+    start_time = time.perf_counter()
+    response = send_request(f"{url}/search?" + urllib.parse.urlencode({'query': query, 'top_k': top_k}))
+    return response, time.perf_counter() - start_time
+
+
+def main():
+    args = get_args()
+    print("Health:", send_request(f"{args.url}/health"))
+
+    # Searches are Sent Concurrently to Exercise the Service Thread Pool
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        responses = list(executor.map(lambda query: search(args.url, query, args.top_k), args.queries))
+
+    for response, latency in responses:
+        print(f"\nQuery: {response['query']} ({latency * 1000:.1f} ms)")
+        for result in response['results']:
+            print(f"  {result['rank']:>3}. [{result['id']}] {result['name']}")
+
+        if args.clicks > 0 and len(response['results']) > 0:
+            doc_ids = [result['id'] for result in response['results'][:args.clicks]]
+            try:
+                print("  Click:", send_request(f"{args.url}/click", {'query': response['query'], 'doc_ids': doc_ids}))
+            except urllib.error.HTTPError as error:
+                print("  Click:", json.loads(error.read()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.append(SRC_PATH)
+
+HEAVY_MODULES = ('lucene', 'lupyne', 'gensim', 'nltk', 'scipy', 'PyQt5')
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--modules', default=['helpers', 'index_inverter', 'supplementer_model_1',
+                                              'supplementer_model_2', 'mgr_guru_model', 'search_service', 'main_gui'],
+                        type=str, nargs='+', help='Modules whose import time is reported')
+    parser.add_argument('--top', default=10, type=int, help='Number of slowest imports listed per module')
+    parser.add_argument('--max_import_ms', default=None, type=float,
+                        help='Fail if importing any module takes longer than this')
+    parser.add_argument('--first_query', action='store_true',
+                        help='Also measure the time until a fresh process answers its first query')
+    parser.add_argument('--model_name', default="supp_model_1",
+                        type=str, help='IR Model Name (mgr_guru, supp_model_1 or supp_model_2)')
+    parser.add_argument('--corpus_path', default="../data/restaurant_corpus.csv", type=str, help='Corpus path')
+    parser.add_argument('--embedding_model_path', default="../models/GoogleNews-vectors-negative300.bin",
+                        type=str, help='word2vec model path')
+    parser.add_argument('--index_path', default="temp", type=str, help='Lucene index directory')
+    parser.add_argument('--backend', default="lucene", type=str, help='Search backend (lucene or sparse)')
+    parser.add_argument('--query', default="pizza restaurant with a terrace view", type=str,
+                        help='Query used for the first query measurement')
+    parser.add_argument('--first_query_child', action='store_true', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    return args
+
+
+def measure_import(module: str) -> dict:
+    """
+    Import a Module in a Fresh Interpreter with -X importtime and Parse the Report
+    :param module: Module name
+    :return: Total import time in ms, imported modules with their self and cumulative times, error if any
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=SRC_PATH,
+                             capture_output=True, text=True)
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative_time, name = line[len('import time:'):].split('|')
+        imports.append({'name': name.strip(), 'self_ms': int(self_time) / 1000,
+                        'cumulative_ms': int(cumulative_time) / 1000})
+
+    total_ms = next((entry['cumulative_ms'] for entry in imports if entry['name'] == module), None)
+    error = process.stderr.strip().splitlines()[-1] if process.returncode != 0 else None
+    return {'module': module, 'total_ms': total_ms, 'imports': imports, 'error': error}
+
+
+def first_query_child(args):
+    """
+    Runs in a Fresh Process: Import, Build the Model and Answer One Query, Then Print the Timings as JSON
+    :param args: Command line arguments
+    :return: None
+    """
+    start = time.perf_counter()
+    import pandas as pd
+    from helpers import BM25Parameters, create_ranking_model
+    import_seconds = time.perf_counter() - start
+
+    ranking_model = create_ranking_model(args.model_name, restaurants_data=pd.read_csv(args.corpus_path, dtype=str),
+                                         bm25_parameters=BM25Parameters(),
+                                         embedding_model_path=args.embedding_model_path,
+                                         index_path_name=args.index_path, persistent_index=True,
+                                         backend=args.backend)
+    model_seconds = time.perf_counter() - start
+
+    ranking_model.sort_documents(args.query, top_k=10)
+    print(json.dumps({'import_seconds': import_seconds, 'model_ready_seconds': model_seconds,
+                      'first_query_seconds': time.perf_counter() - start,
+                      'heavy_modules': sorted(name for name in HEAVY_MODULES if name in sys.modules)}))
+
+
+def main():
+    args = get_args()
+    if args.first_query_child:
+        first_query_child(args)
+        return
+
+    is_failed = False
+    for module in args.modules:
+        report = measure_import(module)
+        if report['error'] is not None:
+            print(f"\n{module}: import failed ({report['error']})")
+            continue
+
+        imported_names = {entry['name'] for entry in report['imports']}
+        heavy_modules = [name for name in HEAVY_MODULES if name in imported_names]
+        print(f"\n{module}: {report['total_ms']:.1f} ms, heavy modules imported: {', '.join(heavy_modules) or 'none'}")
+        for entry in sorted(report['imports'], key=lambda entry: entry['self_ms'], reverse=True)[:args.top]:
+            print(f"  {entry['self_ms']:>9.1f} ms self {entry['cumulative_ms']:>9.1f} ms cumulative  {entry['name']}")
+
+        if args.max_import_ms is not None and report['total_ms'] > args.max_import_ms:
+            print(f"  Import time is above the {args.max_import_ms} ms budget")
+            is_failed = True
+
+    if args.first_query:
+        # Persistent Index, so a Second Run Reports the Startup of an Already Indexed Corpus
+        command = [sys.executable, os.path.abspath(__file__), '--first_query_child', '--model_name', args.model_name,
+                   '--corpus_path', os.path.abspath(args.corpus_path), '--embedding_model_path',
+                   os.path.abspath(args.embedding_model_path), '--index_path', os.path.abspath(args.index_path),
+                   '--backend', args.backend, '--query', args.query]
+        process = subprocess.run(command, capture_output=True, text=True)
+        if process.returncode != 0:
+            print(f"\nFirst query failed:\n{process.stderr}")
+            is_failed = True
+        else:
+            timings = json.loads(process.stdout.strip().splitlines()[-1])
+            print(f"\nTime to import: {timings['import_seconds']:.2f}s, model ready: "
+                  f"{timings['model_ready_seconds']:.2f}s, first query: {timings['first_query_seconds']:.2f}s")
+            print(f"Heavy modules loaded: {', '.join(timings['heavy_modules']) or 'none'}")
+
+    if is_failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from helpers import BM25Parameters, remove_punctuation, create_ranking_model
+from utils.evaluation import BatchEvaluation
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--model_name', default="mgr_guru",
+                        type=str, help='IR Model Name (mgr_guru, supp_model_1 or supp_model_2)')
+    parser.add_argument('--corpus_path', default="../data/restaurant_corpus.csv", type=str, help='Corpus path')
+    parser.add_argument('--embedding_model_path', default="../models/GoogleNews-vectors-negative300.bin",
+                        type=str, help='word2vec model path')
+    parser.add_argument('--query_results_path', default="../data/query_results.csv", type=str,
+                        help='Query log whose queries are evaluated')
+    parser.add_argument('--evaluation_set_path', default="../data/evaluation_set.csv", type=str,
+                        help='Labelled restaurants used as ground truth')
+    parser.add_argument('--default_country', default="Italy", type=str,
+                        help='Country of queries that do not name one, as in the evaluation notebook')
+    parser.add_argument('--k1', default=[0.6, 0.9, 1.2, 1.5, 1.8, 2.1], type=float, nargs='+', help='k1 grid')
+    parser.add_argument('--b', default=[0.0, 0.25, 0.5, 0.75, 1.0], type=float, nargs='+', help='b grid')
+    parser.add_argument('--top_k', default=10, type=int, help='Number of top documents evaluated per query')
+    parser.add_argument('--num_threads', default=None, type=int,
+                        help='Number of grid points searched at the same time, default is CPU count')
+    parser.add_argument('--index_path', default="temp", type=str, help='Lucene index directory')
+    parser.add_argument('--persistent_index', action='store_true', help='Keep the index for the next sweep')
+    parser.add_argument('--analyzer', default="python", type=str, help='Text analysis mode (python or lucene)')
+    parser.add_argument('--backend', default="lucene", type=str, help='Search backend (lucene or sparse)')
+    parser.add_argument('--out_path', default="../data/bm25_sweep.csv", type=str, help='Metrics table path')
+
+    args = parser.parse_args()
+    return args
+
+
+def determine_evaluation_set_column_name(query: str) -> str:
+    """
+    Evaluation Set Column that Labels the Restaurants Relevant to a Query, as in the Evaluation Notebook
+    :param query: Query
+    :return: Column name
+    """
+    if 'terrace' in query or 'Terrace' in query:
+        return 'Terrace Available'
+    elif 'vegetarian' in query or 'vegeterian' in query:
+        return 'Vegetarian Menu Available'
+    return 'Wine Menu Available'
+
+
+def build_ground_truth(queries: list, evaluation_set: pd.DataFrame, default_country: str) -> tuple:
+    """
+    Relevant Restaurants of each Query Sorted by Mean Rating, and their Ratings for nDCG
+    :param queries: Queries
+    :param evaluation_set: Labelled restaurants
+    :param default_country: Country of queries that do not name one
+    :return: Ground truth name lists and rating mappings
+    """
+    countries = evaluation_set['Country'].dropna().unique()
+    gt_results_list, ratings_list = [], []
+    for query in queries:
+        country = next((country for country in countries if country in query.split()), default_country)
+        relevant = evaluation_set[(evaluation_set['Country'] == country) &
+                                  (evaluation_set[determine_evaluation_set_column_name(query)] == True)]
+        relevant = relevant.sort_values('Mean Rating', ascending=False)
+        gt_results_list.append(list(relevant['Name']))
+        ratings_list.append(dict(zip(relevant['Name'], relevant['Mean Rating'] / 10)))
+    return gt_results_list, ratings_list
+
+
+def evaluate_grid_point(backend, bm25_parameters: BM25Parameters, query_terms_list: list, names: np.ndarray,
+                        gt_results_list: list, ratings_list: list, top_k: int) -> dict:
+    """
+    Search All Queries with One BM25 Setting over the Shared Index and Evaluate the Rankings
+    :param backend: Search backend of the opened index
+    :param bm25_parameters: Okapi BM25 parameters (k1 and b)
+    :param query_terms_list: Terms List of each Query
+    :param names: Restaurant name of each document
+    :param gt_results_list: Ground truth name lists
+    :param ratings_list: Rating mapping of each query
+    :param top_k: Number of top documents evaluated per query
+    :return: Metrics of the grid point
+    """
+    start = time.perf_counter()
+    grid_backend = backend.with_bm25_parameters(bm25_parameters)
+    model_results_list = [list(names[grid_backend.search(query_terms, top_k)[0]]) for query_terms in query_terms_list]
+
+    batch_evaluation = BatchEvaluation(model_results_list, gt_results_list, ratings_list)
+    precision, recall = batch_evaluation.precision_recall_at_k([top_k])
+    return {'k1': bm25_parameters.k1, 'b': bm25_parameters.b,
+            f'Precision@{top_k}': round(float(precision.mean()), 4), f'Recall@{top_k}': round(float(recall.mean()), 4),
+            'MAP': round(batch_evaluation.mean_average_precision(), 4),
+            f'nDCG@{top_k}': round(float(batch_evaluation.ndcg_at_k([top_k]).mean()), 4),
+            'Seconds': round(time.perf_counter() - start, 3)}
+
+
+def main():
+    args = get_args()
+    from index_inverter import attach_current_thread
+
+    restaurants_data = pd.read_csv(args.corpus_path, dtype=str)
+    queries = [remove_punctuation(query) for query in pd.read_csv(args.query_results_path)['Query'].unique()]
+    gt_results_list, ratings_list = build_ground_truth(queries, pd.read_csv(args.evaluation_set_path),
+                                                       args.default_country)
+
+    # The Index is Built (or Opened) Once, Query Terms do Not Depend on the BM25 Parameters
+    start = time.perf_counter()
+    ranking_model = create_ranking_model(args.model_name, restaurants_data=restaurants_data,
+                                         bm25_parameters=BM25Parameters(),
+                                         embedding_model_path=args.embedding_model_path,
+                                         index_path_name=args.index_path, persistent_index=args.persistent_index,
+                                         analyzer=args.analyzer, backend=args.backend)
+    query_terms_list = ranking_model.build_query_terms_batch(queries)
+    print(f"Index and query terms ready in {time.perf_counter() - start:.1f}s")
+
+    grid = [BM25Parameters(k1=k1, b=b) for k1, b in itertools.product(args.k1, args.b)]
+    names = restaurants_data['Name'].values
+    backend = ranking_model.index_inverter.backend
+    start = time.perf_counter()
+    try:
+        num_threads = args.num_threads if args.num_threads is not None else os.cpu_count()
+        with ThreadPoolExecutor(max_workers=num_threads, initializer=attach_current_thread) as executor:
+            results = list(executor.map(lambda bm25_parameters: evaluate_grid_point(
+                backend, bm25_parameters, query_terms_list, names, gt_results_list, ratings_list, args.top_k), grid))
+    finally:
+        if not args.persistent_index:
+            ranking_model.index_inverter.delete_directory()
+    print(f"{len(grid)} grid points evaluated in {time.perf_counter() - start:.1f}s")
+
+    results = pd.DataFrame(results).sort_values([f'nDCG@{args.top_k}', 'MAP'], ascending=False)
+    results.to_csv(args.out_path, index=False)
+    print(results.to_string(index=False))
+    best = results.iloc[0]
+    print(f"\nBest: k1={best['k1']}, b={best['b']} (nDCG@{args.top_k} {best[f'nDCG@{args.top_k}']}, MAP {best['MAP']})")
+
+
+if __name__ == '__main__':
+    main()
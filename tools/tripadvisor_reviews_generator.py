@@ -1,7 +1,16 @@
 import argparse
+import os
+import sys
+import threading
+import time
 import pandas as pd
 
-from utils.tripadvisor_site_driver import TripadvisorSiteDriver
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.tripadvisor_site_driver import TRIPADVISOR_URL, TripadvisorSiteDriver
+from utils.crawl_job_queue import CrawlJobQueue
+
+REVIEW_COLUMNS = ["Name", "Title", "User", "Date", "Rating", "Text"]
+REVIEW_SEPARATOR = "½"
 
 
 def get_args():
@@ -12,6 +21,17 @@ def get_args():
     parser.add_argument("--num_pages_per_item", type=int, default=10, help="Number of review pages per restaurant.")
     parser.add_argument("--results_path", type=str, default="../data/ratings_reviews.csv",
                         help="Path of the csv file in which ratings and reviews will be saved.")
+    parser.add_argument("--crawler", action="store_true",
+                        help="Crawl with a pool of drivers from a persistent job queue, a restart resumes the crawl")
+    parser.add_argument("--num_drivers", type=int, default=4, help="Number of Chrome drivers in crawler mode.")
+    parser.add_argument("--queue_path", type=str, default="../data/ratings_reviews_queue.sqlite",
+                        help="SQLite job queue of the crawler, kept between runs to resume.")
+    parser.add_argument("--max_attempts", type=int, default=3, help="Attempts per restaurant in crawler mode.")
+    parser.add_argument("--max_jobs", type=int, default=None,
+                        help="Stop the crawler after this many restaurants, the rest are crawled by the next run.")
+    parser.add_argument("--base_url", type=str, default=TRIPADVISOR_URL,
+                        help="TripAdvisor address, a local fixture server can be given for testing.")
+    parser.add_argument("--headless", action="store_true", help="Run Chrome without a window.")
 
     args = parser.parse_args()
     return args
@@ -34,6 +54,23 @@ def __read_restaurants_list(restaurants_path: str):
     return [restaurant_names, restaurant_locations]
 
 
+def reviews_to_frame(restaurant_name: str, review_titles: list, review_users: list, review_dates: list,
+                     review_ratings: list, review_texts: list) -> pd.DataFrame:
+    """
+    Reviews of a Restaurant as a Data Frame, Built Once from the Review Lists
+    :param restaurant_name: Restaurant name
+    :param review_titles: Review titles
+    :param review_users: Review users
+    :param review_dates: Review dates
+    :param review_ratings: Review ratings
+    :param review_texts: Review texts
+    :return: Reviews with REVIEW_COLUMNS
+    """
+    return pd.DataFrame({"Name": [restaurant_name] * len(review_titles), "Title": review_titles,
+                         "User": review_users, "Date": review_dates, "Rating": review_ratings,
+                         "Text": review_texts}, columns=REVIEW_COLUMNS)
+
+
 def generate_restaurant_reviews(site_driver: TripadvisorSiteDriver, restaurant_names: str, restaurant_locations: str, \
                                 num_pages_per_restaurant: int, output_results_path: str):
     """
@@ -47,38 +84,197 @@ def generate_restaurant_reviews(site_driver: TripadvisorSiteDriver, restaurant_n
     """
     first_result_written = False
     for i in range(len(restaurant_names)):
-        reviews_ratings_df_curRestaurant = pd.DataFrame(columns=["Name", "Title", "User", "Date", "Rating", "Text"])
         curName = restaurant_names[i]
         curLocation = restaurant_locations[i]
         review_titles, review_users, review_dates, review_ratings, review_texts = \
             site_driver.get_reviews_ratings(restaurant_name=curName, restaurant_location=curLocation,
                                             num_pages=num_pages_per_restaurant)
-        for j in range(len(review_titles)):
-            reviews_ratings_df_curRestaurant = reviews_ratings_df_curRestaurant.append({
-                "Name": curName,
-                "Title": review_titles[j],
-                "User": review_users[j],
-                "Date": review_dates[j],
-                "Rating": review_ratings[j],
-                "Text": review_texts[j]
-            }, ignore_index=True)
+        reviews_ratings_df_curRestaurant = reviews_to_frame(curName, review_titles, review_users, review_dates,
+                                                            review_ratings, review_texts)
         if not first_result_written:
-            reviews_ratings_df_curRestaurant.to_csv(output_results_path, sep="½")
+            reviews_ratings_df_curRestaurant.to_csv(output_results_path, sep=REVIEW_SEPARATOR)
             first_result_written = True
         else:
-            reviews_ratings_df_curRestaurant.to_csv(output_results_path, mode="a", header=False, sep="½")
+            reviews_ratings_df_curRestaurant.to_csv(output_results_path, mode="a", header=False, sep=REVIEW_SEPARATOR)
+
+
+class ReviewWriter:
+    def __init__(self, results_path: str, committed_end: int = None):
+        """
+        Appends the Reviews of Each Restaurant to the Results File as Soon as They are Scraped
+        Rows have the same format as generate_restaurant_reviews, the row index restarts for each restaurant
+        :param results_path: Results file
+        :param committed_end: File size at the last checkpoint, later rows are from an interrupted run and are removed.
+        None starts a new file, an existing file is only replaced if it has nothing but the header
+        """
+        self.results_path = results_path
+        self.lock = threading.Lock()
+        header = pd.DataFrame(columns=REVIEW_COLUMNS).to_csv(sep=REVIEW_SEPARATOR)
+        if committed_end is None:
+            if os.path.exists(results_path) and os.path.getsize(results_path) > 0:
+                with open(results_path, encoding="utf-8", newline="") as results_file:
+                    is_header_only = results_file.read(len(header) + 1) == header
+                if not is_header_only:
+                    raise FileExistsError(f"{results_path} has reviews but the job queue has no finished "
+                                          f"restaurants, give another --results_path or --queue_path")
+            with open(results_path, "w", encoding="utf-8", newline="") as results_file:
+                results_file.write(header)
+        else:
+            results_size = os.path.getsize(results_path)
+            if results_size < committed_end:
+                raise ValueError(f"{results_path} has {results_size} bytes but the job queue checkpointed "
+                                 f"{committed_end} bytes, it belongs to another crawl")
+            with open(results_path, "r+b") as results_file:
+                results_file.truncate(committed_end)
+
+    def write_reviews(self, reviews: pd.DataFrame, on_written=None) -> int:
+        """
+        Append and Sync the Reviews of a Restaurant
+        :param reviews: Reviews of one restaurant
+        :param on_written: Called with the file size under the writer lock, so checkpoints follow the file order
+        :return: File size after the reviews are written
+        """
+        rows = reviews.to_csv(header=False, sep=REVIEW_SEPARATOR)
+        with self.lock:
+            with open(self.results_path, "a", encoding="utf-8", newline="") as results_file:
+                results_file.write(rows)
+                results_file.flush()
+                os.fsync(results_file.fileno())
+                results_end = results_file.tell()
+            if on_written is not None:
+                on_written(results_end)
+        return results_end
+
+
+def crawl_restaurant_reviews(job_queue: CrawlJobQueue, review_writer: ReviewWriter, create_site_driver,
+                             num_drivers: int, num_pages_per_restaurant: int, max_jobs: int = None,
+                             max_driver_failures: int = 3) -> int:
+    """
+    Crawl the Pending Restaurants of the Queue with a Pool of Drivers
+    Each driver runs in its own thread, a failed restaurant returns to the queue and the driver is restarted
+    :param job_queue: Persistent job queue
+    :param review_writer: Results file writer
+    :param create_site_driver: Returns a new, not yet opened site driver
+    :param num_drivers: Number of drivers
+    :param num_pages_per_restaurant: Review pages per restaurant
+    :param max_jobs: Maximum number of restaurants claimed in this run, None crawls the whole queue
+    :param max_driver_failures: A driver that fails to start this many times in a row leaves the pool
+    :return: Number of restaurants checkpointed in this run
+    """
+    claim_lock = threading.Lock()
+    counters = {"claimed": 0, "completed": 0}
+
+    def claim():
+        with claim_lock:
+            if max_jobs is not None and counters["claimed"] >= max_jobs:
+                return None
+            job = job_queue.claim()
+            if job is not None:
+                counters["claimed"] += 1
+            return job
+
+    def close(site_driver):
+        try:
+            site_driver.close_driver()
+        except Exception:
+            pass
+
+    def run_driver(driver_number: int):
+        site_driver = None
+        driver_failures = 0
+        try:
+            job = claim()
+            while job is not None:
+                position, restaurant_name, restaurant_location = job
+                if site_driver is None:
+                    try:
+                        site_driver = create_site_driver()
+                        site_driver.open_driver()
+                        driver_failures = 0
+                    except Exception as error:
+                        if site_driver is not None:
+                            close(site_driver)
+                        site_driver = None
+                        driver_failures += 1
+                        will_retry = job_queue.fail(position, f"driver failed to start: {error!r}")
+                        print(f"Driver {driver_number} failed to start ({driver_failures}/{max_driver_failures}): "
+                              f"{error!r}, {restaurant_name} is {'returned to the queue' if will_retry else 'failed'}")
+                        if driver_failures >= max_driver_failures:
+                            print(f"Driver {driver_number} leaves the pool")
+                            return
+                        time.sleep(2 ** driver_failures)
+                        job = claim()
+                        continue
+                try:
+                    review_lists = site_driver.crawl_reviews_ratings(restaurant_name=restaurant_name,
+                                                                     restaurant_location=restaurant_location,
+                                                                     num_pages=num_pages_per_restaurant)
+                except Exception as error:
+                    will_retry = job_queue.fail(position, repr(error))
+                    print(f"{restaurant_name}: {error!r}, {'retrying' if will_retry else 'giving up'}")
+                    # A Fresh Browser for the Next Restaurant, the Page May be Left in Any State
+                    close(site_driver)
+                    site_driver = None
+                else:
+                    reviews = reviews_to_frame(restaurant_name, *review_lists)
+                    review_writer.write_reviews(
+                        reviews, on_written=lambda results_end: job_queue.complete(position, len(reviews),
+                                                                                   results_end))
+                    with claim_lock:
+                        counters["completed"] += 1
+                    print(f"{restaurant_name}: {len(reviews)} reviews")
+                job = claim()
+        finally:
+            if site_driver is not None:
+                close(site_driver)
+
+    threads = [threading.Thread(target=run_driver, args=(driver_number,), daemon=True)
+               for driver_number in range(num_drivers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counters["completed"]
+
+
+def run_crawler(args, restaurant_names: list, restaurant_locations: list):
+    """
+    Crawler Mode: Resume the Job Queue and Stream the Reviews to the Results File
+    :param args: Command line arguments
+    :param restaurant_names: Restaurant names
+    :param restaurant_locations: Restaurant locations
+    :return: None
+    """
+    job_queue = CrawlJobQueue(args.queue_path, max_attempts=args.max_attempts)
+    num_new_jobs = job_queue.add_jobs(restaurant_names, restaurant_locations)
+    num_recovered_jobs = job_queue.recover()
+    committed_end = job_queue.committed_results_end()
+    if committed_end is not None and not os.path.exists(args.results_path):
+        raise FileNotFoundError(f"{args.results_path} is missing but {args.queue_path} has finished restaurants")
+    print(f"{num_new_jobs} new and {num_recovered_jobs} interrupted restaurants, {job_queue.status_counts()}")
+
+    review_writer = ReviewWriter(args.results_path, committed_end=committed_end)
+    num_completed = crawl_restaurant_reviews(
+        job_queue, review_writer, lambda: TripadvisorSiteDriver(base_url=args.base_url, headless=args.headless),
+        num_drivers=args.num_drivers, num_pages_per_restaurant=args.num_pages_per_item, max_jobs=args.max_jobs)
+    print(f"{num_completed} restaurants crawled, {job_queue.status_counts()}")
+    job_queue.close()
 
 
 def main():
 
     args = get_args()
 
-    site_driver = TripadvisorSiteDriver()
-    site_driver.open_driver()
-
     # Read restaurant names and locations from CSV
     restaurant_names, restaurant_locations = __read_restaurants_list(args.restaurants_path)
 
+    if args.crawler:
+        run_crawler(args, restaurant_names, restaurant_locations)
+        return
+
+    site_driver = TripadvisorSiteDriver(base_url=args.base_url, headless=args.headless)
+    site_driver.open_driver()
+
     # Get reviews and ratings for each restaurant and write them to CSV file
     generate_restaurant_reviews(site_driver=site_driver, restaurant_names=restaurant_names, restaurant_locations=restaurant_locations, \
         num_pages_per_restaurant=args.num_pages_per_item, output_results_path=args.results_path)
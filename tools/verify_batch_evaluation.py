@@ -0,0 +1,124 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.evaluation import Evaluation, BatchEvaluation
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--evaluation_set_path', default="../data/evaluation_set.csv", type=str,
+                        help='Evaluation set whose restaurant names and ratings are used as items')
+    parser.add_argument('--queries', default=2000, type=int, help='Number of random queries')
+    parser.add_argument('--max_results', default=100, type=int, help='Maximum result list length of a query')
+    parser.add_argument('--max_ground_truth', default=60, type=int, help='Maximum ground truth list length')
+    parser.add_argument('--ks', default=[1, 5, 10, 20, 50], type=int, nargs='+', help='Cutoffs')
+    parser.add_argument('--tolerance', default=1e-12, type=float, help='Maximum absolute metric difference')
+    parser.add_argument('--seed', default=0, type=int, help='Random seed')
+
+    args = parser.parse_args()
+    return args
+
+
+def generate_queries(names: np.ndarray, num_queries: int, max_results: int, max_ground_truth: int,
+                     random_state) -> tuple:
+    """
+    Random Result and Ground Truth Lists, Including Empty Lists, Short Lists and Duplicated Results
+    :param names: Restaurant names
+    :param num_queries: Number of queries
+    :param max_results: Maximum result list length
+    :param max_ground_truth: Maximum ground truth list length
+    :param random_state: NumPy random generator
+    :return: Result lists and ground truth lists
+    """
+    model_results_list, gt_results_list = [], []
+    for _ in range(num_queries):
+        results = list(random_state.choice(names, random_state.integers(0, max_results + 1), replace=False))
+        if len(results) > 1 and random_state.random() < 0.1:
+            results.append(results[0])
+        model_results_list.append(results)
+        gt_results_list.append(list(random_state.choice(names, random_state.integers(0, max_ground_truth + 1),
+                                                        replace=False)))
+    return model_results_list, gt_results_list
+
+
+def evaluate_per_query(model_results_list: list, gt_results_list: list, ratings_list: list, ks: list) -> dict:
+    """
+    Metrics with the Per Query Functions of Evaluation
+    :param model_results_list: Result list of each query
+    :param gt_results_list: Ground truth list of each query
+    :param ratings_list: Rating mapping of each query
+    :param ks: Cutoffs
+    :return: Metric matrices
+    """
+    evaluator = Evaluation()
+    precision, recall, average_precision, ndcg = [], [], [], []
+    for results, gt_results, ratings in zip(model_results_list, gt_results_list, ratings_list):
+        pr_at_k = [evaluator.calculate_pr_at_k(results, gt_results, k) for k in ks]
+        precision.append([value[0] for value in pr_at_k])
+        recall.append([value[1] for value in pr_at_k])
+        average_precision.append(evaluator.calculate_average_precision(results, gt_results))
+        ndcg.append([evaluator.compute_ndcg_with_ratings(results[:k], gt_results, ratings) for k in ks] +
+                    [evaluator.compute_ndcg_with_ratings(results, gt_results, ratings)])
+    return {'Precision@k': np.array(precision), 'Recall@k': np.array(recall),
+            'Average Precision': np.array(average_precision), 'nDCG@k': np.array(ndcg)}
+
+
+def evaluate_batch(model_results_list: list, gt_results_list: list, ratings_list: list, ks: list) -> dict:
+    """
+    Metrics with BatchEvaluation
+    :param model_results_list: Result list of each query
+    :param gt_results_list: Ground truth list of each query
+    :param ratings_list: Rating mapping of each query
+    :param ks: Cutoffs
+    :return: Metric matrices
+    """
+    batch_evaluation = BatchEvaluation(model_results_list, gt_results_list, ratings_list)
+    precision, recall = batch_evaluation.precision_recall_at_k(ks)
+    return {'Precision@k': precision, 'Recall@k': recall, 'Average Precision': batch_evaluation.average_precision(),
+            'nDCG@k': batch_evaluation.ndcg_at_k(list(ks) + [None])}
+
+
+def main():
+    args = get_args()
+    random_state = np.random.default_rng(args.seed)
+    if os.path.exists(args.evaluation_set_path):
+        evaluation_set = pd.read_csv(args.evaluation_set_path).drop_duplicates('Name')
+        names, mean_ratings = evaluation_set['Name'].values, evaluation_set['Mean Rating'].values / 10
+    else:
+        names = np.array([f"Restaurant {i}" for i in range(1000)])
+        mean_ratings = random_state.uniform(1, 5, len(names))
+
+    model_results_list, gt_results_list = generate_queries(names, args.queries, min(args.max_results, len(names)),
+                                                           min(args.max_ground_truth, len(names)), random_state)
+    rating_of = dict(zip(names, mean_ratings))
+    ratings_list = [{name: rating_of[name] for name in gt_results} for gt_results in gt_results_list]
+
+    start = time.perf_counter()
+    expected = evaluate_per_query(model_results_list, gt_results_list, ratings_list, args.ks)
+    per_query_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = evaluate_batch(model_results_list, gt_results_list, ratings_list, args.ks)
+    batch_seconds = time.perf_counter() - start
+    print(f"Queries: {args.queries}, per query: {per_query_seconds:.2f}s, batch: {batch_seconds:.3f}s "
+          f"({per_query_seconds / batch_seconds:.0f}x)")
+
+    is_failed = False
+    for metric, expected_values in expected.items():
+        difference = float(np.max(np.abs(expected_values - actual[metric]), initial=0.0))
+        print(f"{metric}: max difference {difference:.2e}")
+        is_failed |= difference > args.tolerance
+
+    if is_failed:
+        print("FAILED: batch metrics do not match the per query metrics")
+        sys.exit(1)
+    print("PASSED")
+
+
+if __name__ == '__main__':
+    main()
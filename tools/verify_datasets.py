@@ -0,0 +1,118 @@
+import argparse
+import filecmp
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from generate_corpus import merge_restaurant_data_and_reviews, build_restaurant_corpus
+from generate_evaluation_set import generate_evaluation_set
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--restaurant_michelin_data_path', default="../data/restaurants_details.csv", type=str,
+                        help='Michelin Site Restaurant Data, a synthetic one is made from the evaluation set if missing')
+    parser.add_argument('--evaluation_set_path', default="../data/evaluation_set.csv", type=str,
+                        help='Evaluation set the synthetic Michelin data is made from')
+    parser.add_argument('--reviews_paths', default=["../data/raw_data/restaurant_reviews.csv",
+                                                    "../data/raw_data/restaurant_reviews_2.csv",
+                                                    "../data/raw_data/restaurant_reviews_5.csv"],
+                        type=str, nargs='+', help='TripAdvisor review files')
+    parser.add_argument('--expected_corpus_path', default=None, type=str,
+                        help='Existing corpus file the pipeline output must be identical to')
+    parser.add_argument('--expected_evaluation_set_path', default=None, type=str,
+                        help='Existing evaluation set file the pipeline output must be identical to')
+    parser.add_argument('--work_path', default="datasets_check", type=str, help='Directory of the generated files')
+
+    args = parser.parse_args()
+    return args
+
+
+def write_synthetic_michelin_data(evaluation_set_path: str, out_path: str):
+    """
+    Michelin Guide Data Whose Content and Services Parse Back to the Labels of the Evaluation Set
+    Countries are written with Turkish characters and spaces, so the country normalization is exercised too
+    :param evaluation_set_path: Evaluation set
+    :param out_path: Output Michelin data path
+    :return: None
+    """
+    evaluation_set = pd.read_csv(evaluation_set_path, dtype={'Country': str})
+    countries = evaluation_set['Country'].fillna('').replace({'Turkey': 'Türkiye', 'UnitedKingdom': 'United Kingdom'})
+    services = pd.Series(['Air conditioning'] * len(evaluation_set))
+    services += evaluation_set['Terrace Available'].map({True: '\nTerrace', False: ''})
+    services += evaluation_set['Vegetarian Menu Available'].map({True: '\nVegetarian menu', False: ''})
+    services += evaluation_set['Wine Menu Available'].map({True: '\nInteresting wine list', False: ''})
+    michelin_guide_data = pd.DataFrame({
+        'Name': evaluation_set['Name'],
+        'Link': [f"https://guide.michelin.com/restaurant/{i}" for i in range(len(evaluation_set))],
+        'Content': 'Main Street 1\nSome City, ' + countries + '\n' +
+                   evaluation_set['Expensiveness'].map(lambda expensiveness: '€' * expensiveness) + '·' +
+                   evaluation_set['Cuisine Type'],
+        'Detail': 'Placeholder detail of the restaurant. ',
+        'Services': services,
+        'Hour': 'Monday closed'})
+    michelin_guide_data.to_csv(out_path, index=False)
+
+
+def compare_files(name: str, expected_path: str, actual_path: str) -> bool:
+    """
+    Byte by Byte File Comparison, the First Differing Row is Printed
+    :param name: Output name
+    :param expected_path: Expected file
+    :param actual_path: Pipeline output
+    :return: True if the files are identical
+    """
+    is_same = filecmp.cmp(expected_path, actual_path, shallow=False)
+    print(f"{name}: {'identical' if is_same else 'DIFFERENT'} ({expected_path} - {actual_path})")
+    if not is_same:
+        with open(expected_path, encoding='utf-8') as expected_file, open(actual_path, encoding='utf-8') as actual_file:
+            for line_number, (expected_line, actual_line) in enumerate(zip(expected_file, actual_file)):
+                if expected_line != actual_line:
+                    print(f"  first difference at line {line_number + 1}:\n  - {expected_line[:200]!r}\n"
+                          f"  + {actual_line[:200]!r}")
+                    break
+    return is_same
+
+
+def main():
+    args = get_args()
+    os.makedirs(args.work_path, exist_ok=True)
+    michelin_guide_data_path = args.restaurant_michelin_data_path
+    if not os.path.exists(michelin_guide_data_path):
+        michelin_guide_data_path = os.path.join(args.work_path, 'restaurants_details.csv')
+        write_synthetic_michelin_data(args.evaluation_set_path, michelin_guide_data_path)
+        print(f"Michelin data is missing, a synthetic one is written to {michelin_guide_data_path}")
+
+    paths = {name: os.path.join(args.work_path, f"{name}.csv") for name in
+             ['legacy_corpus', 'legacy_evaluation_set', 'pipeline_corpus', 'pipeline_evaluation_set']}
+    start = time.perf_counter()
+    merge_restaurant_data_and_reviews(michelin_guide_data_path, args.reviews_paths, paths['legacy_corpus'])
+    generate_evaluation_set(michelin_guide_data_path, args.reviews_paths, paths['legacy_evaluation_set'])
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    build_restaurant_corpus(michelin_guide_data_path, args.reviews_paths, paths['pipeline_corpus'],
+                            out_evaluation_set_path=paths['pipeline_evaluation_set'],
+                            work_path=os.path.join(args.work_path, 'build'))
+    pipeline_seconds = time.perf_counter() - start
+    print(f"Previous scripts: {legacy_seconds:.2f}s, pipeline: {pipeline_seconds:.2f}s")
+
+    is_same = compare_files('corpus', paths['legacy_corpus'], paths['pipeline_corpus'])
+    is_same &= compare_files('evaluation set', paths['legacy_evaluation_set'], paths['pipeline_evaluation_set'])
+    if args.expected_corpus_path is not None:
+        is_same &= compare_files('corpus', args.expected_corpus_path, paths['pipeline_corpus'])
+    if args.expected_evaluation_set_path is not None:
+        is_same &= compare_files('evaluation set', args.expected_evaluation_set_path,
+                                 paths['pipeline_evaluation_set'])
+
+    if not is_same:
+        print("FAILED: the pipeline outputs differ")
+        sys.exit(1)
+    print("PASSED")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import sqlite3
+import threading
+import time
+
+JOB_STATUSES = ('pending', 'running', 'done', 'failed')
+
+
+class CrawlJobQueue:
+    def __init__(self, path: str, max_attempts: int = 3):
+        """
+        Persistent Queue of Restaurants to Crawl, Backed by SQLite
+        A job is checkpointed when its reviews are written, so a restarted crawler continues with the remaining jobs
+        :param path: SQLite database path
+        :param max_attempts: A job that fails this many times is not retried
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS jobs (position INTEGER PRIMARY KEY, name TEXT NOT NULL, '
+                                'location TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL, '
+                                'num_reviews INTEGER, results_end INTEGER, error TEXT, updated REAL NOT NULL)')
+        self.connection.commit()
+
+    def add_jobs(self, restaurant_names: list, restaurant_locations: list) -> int:
+        """
+        Add a Job per Restaurant, Jobs of a Previous Run are Kept with Their Status
+        :param restaurant_names: Restaurant names
+        :param restaurant_locations: Restaurant locations used in the search
+        :return: Number of new jobs
+        """
+        now = time.time()
+        with self.lock:
+            stored = dict(self.connection.execute('SELECT position, name FROM jobs').fetchall())
+            for position, name in enumerate(restaurant_names):
+                if position in stored and stored[position] != name:
+                    raise ValueError(f"{self.path} belongs to another restaurant list, "
+                                     f"job {position} is {stored[position]!r} instead of {name!r}")
+            new_jobs = [(position, name, location, 'pending', 0, now) for position, (name, location)
+                        in enumerate(zip(restaurant_names, restaurant_locations)) if position not in stored]
+            self.connection.executemany('INSERT INTO jobs (position, name, location, status, attempts, updated) '
+                                        'VALUES (?, ?, ?, ?, ?, ?)', new_jobs)
+            self.connection.commit()
+        return len(new_jobs)
+
+    def recover(self) -> int:
+        """
+        Return the Jobs that were Running when the Previous Run Stopped to the Queue
+        :return: Number of recovered jobs
+        """
+        with self.lock:
+            recovered = self.connection.execute("UPDATE jobs SET status = 'pending', updated = ? "
+                                                "WHERE status = 'running'", (time.time(),)).rowcount
+            self.connection.commit()
+        return recovered
+
+    def claim(self):
+        """
+        Take the First Pending Job
+        :return: (position, name, location) of the job, None if no job is pending
+        """
+        with self.lock:
+            job = self.connection.execute("SELECT position, name, location FROM jobs WHERE status = 'pending' "
+                                          "ORDER BY position LIMIT 1").fetchone()
+            if job is not None:
+                self.connection.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, updated = ? "
+                                        "WHERE position = ?", (time.time(), job[0]))
+                self.connection.commit()
+        return job
+
+    def complete(self, position: int, num_reviews: int, results_end: int):
+        """
+        Checkpoint a Job After its Reviews are Written
+        :param position: Job position
+        :param num_reviews: Number of written reviews
+        :param results_end: Size of the results file after the reviews are written
+        :return: None
+        """
+        with self.lock:
+            self.connection.execute("UPDATE jobs SET status = 'done', num_reviews = ?, results_end = ?, error = NULL, "
+                                    "updated = ? WHERE position = ?", (num_reviews, results_end, time.time(), position))
+            self.connection.commit()
+
+    def fail(self, position: int, error: str):
+        """
+        Return a Failed Job to the Queue, or Mark it Failed After max_attempts
+        :param position: Job position
+        :param error: Error message
+        :return: True if the job will be retried
+        """
+        with self.lock:
+            self.connection.execute("UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                                    "error = ?, updated = ? WHERE position = ?",
+                                    (self.max_attempts, error, time.time(), position))
+            self.connection.commit()
+            status, = self.connection.execute('SELECT status FROM jobs WHERE position = ?', (position,)).fetchone()
+        return status == 'pending'
+
+    def committed_results_end(self):
+        """
+        Size of the Results File When the Last Checkpointed Job was Written
+        :return: Size in bytes, None if no job is done
+        """
+        with self.lock:
+            results_end, = self.connection.execute("SELECT MAX(results_end) FROM jobs WHERE status = 'done'").fetchone()
+        return results_end
+
+    def status_counts(self) -> dict:
+        """
+        Number of Jobs in each Status
+        :return: Status - count mapping
+        """
+        with self.lock:
+            counts = dict(self.connection.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 
 class Evaluation:
     def __init__(self):
@@ -79,3 +80,134 @@ class Evaluation:
         average_precision = precision_sum / relevant_docs_len_in_results
         return average_precision
 
+
+
+class BatchEvaluation:
+    def __init__(self, model_results_list:list, sorted_gt_doc_results_list:list, ratings=None):
+        """
+        Evaluation Metrics of Many Queries at Once, Results Match the Per Query Functions of Evaluation
+        :param model_results_list: Model Results List of each Query
+        :param sorted_gt_doc_results_list: Ground Truth Results List of each Query, sorted by rating
+        :param ratings: Rating of the ground truth results for nDCG, a mapping shared by all queries or a list with
+                        one mapping per query, None gives every ground truth result a rating of 1
+        """
+        self.num_queries = len(model_results_list)
+        result_lengths = np.array([len(results) for results in model_results_list], dtype=np.int64)
+        gt_lengths = np.array([len(gt_results) for gt_results in sorted_gt_doc_results_list], dtype=np.int64)
+        self.result_lengths, self.gt_lengths = result_lengths, gt_lengths
+
+        # Items of All Queries Become Integer Codes, a (Query, Item) Pair Becomes a Single Key
+        result_items = [item for results in model_results_list for item in results]
+        gt_items = [item for gt_results in sorted_gt_doc_results_list for item in gt_results]
+        codes, uniques = pd.factorize(pd.Series(result_items + gt_items, dtype=object))
+        num_codes = max(len(uniques), 1)
+        result_queries = np.repeat(np.arange(self.num_queries), result_lengths)
+        gt_queries = np.repeat(np.arange(self.num_queries), gt_lengths)
+        result_keys = result_queries * num_codes + codes[:len(result_items)]
+        gt_keys = gt_queries * num_codes + codes[len(result_items):]
+
+        # Gain of each Ground Truth Entry, the First Entry of an Item Gives its Gain
+        if ratings is None:
+            gt_gains = np.ones(len(gt_items))
+        elif isinstance(ratings, (list, tuple)):
+            gt_gains = np.array([ratings[query][item] for query, item in zip(gt_queries, gt_items)], dtype=np.float64)
+        else:
+            gt_gains = np.array([ratings[item] for item in gt_items], dtype=np.float64)
+        unique_gt_keys, first_gt_indexes = np.unique(gt_keys, return_index=True)
+        self.gt_counts = np.bincount(unique_gt_keys // num_codes, minlength=self.num_queries)
+
+        # Results Padded to the Longest List, Duplicated Results are Relevant but Counted Once for Precision
+        is_relevant = np.isin(result_keys, unique_gt_keys)
+        is_first = np.zeros(len(result_keys), dtype=bool)
+        is_first[np.unique(result_keys, return_index=True)[1]] = True
+        gains = np.zeros(len(result_keys))
+        gains[is_relevant] = gt_gains[first_gt_indexes[np.searchsorted(unique_gt_keys, result_keys[is_relevant])]]
+
+        self.max_length = int(max(result_lengths.max(initial=0), gt_lengths.max(initial=0), 1))
+        result_positions = np.arange(len(result_keys)) - np.repeat(np.cumsum(result_lengths) - result_lengths,
+                                                                   result_lengths)
+        gt_positions = np.arange(len(gt_keys)) - np.repeat(np.cumsum(gt_lengths) - gt_lengths, gt_lengths)
+        self.relevant = self.pad(result_queries, result_positions, is_relevant)
+        self.relevant_hits = np.cumsum(self.pad(result_queries, result_positions, is_relevant & is_first), axis=1)
+
+        # Discount of Rank i is 1 for the First Two Ranks, then 1/log2(i + 1)
+        self.discount_denominators = np.log2(np.arange(self.max_length) + 1.0)
+        self.discount_denominators[0] = 1.0
+        self.dcg = np.cumsum(self.pad(result_queries, result_positions, gains) / self.discount_denominators, axis=1)
+        self.idcg = np.cumsum(self.pad(gt_queries, gt_positions, gt_gains) / self.discount_denominators, axis=1)
+
+    def pad(self, queries:np.ndarray, positions:np.ndarray, values:np.ndarray) -> np.ndarray:
+        """
+        Place Flat Per Query Values into a (Queries x Ranks) Matrix Padded with Zeros
+        :param queries: Query index of each value
+        :param positions: Rank of each value in its query
+        :param values: Values
+        :return: Padded matrix
+        """
+        matrix = np.zeros((self.num_queries, self.max_length), dtype=np.asarray(values).dtype)
+        matrix[queries, positions] = values
+        return matrix
+
+    def cutoff_lengths(self, k:int = None) -> np.ndarray:
+        """
+        Number of Results Considered at a Cutoff
+        :param k: Cutoff, None considers every result
+        :return: Number of results of each query
+        """
+        return self.result_lengths if k is None else np.minimum(self.result_lengths, k)
+
+    @staticmethod
+    def take_at(matrix:np.ndarray, counts:np.ndarray) -> np.ndarray:
+        """
+        Cumulative Value After count Ranks of each Query, 0 for No Ranks
+        :param matrix: Cumulative values (Queries x Ranks)
+        :param counts: Number of ranks of each query
+        :return: Value of each query
+        """
+        values = matrix[np.arange(len(counts)), np.maximum(counts, 1) - 1]
+        return np.where(counts > 0, values, 0)
+
+    def precision_recall_at_k(self, ks:list) -> tuple:
+        """
+        Calculate Precision@k and Recall@k of All Queries for Several Cutoffs
+        :param ks: Cutoffs
+        :return: Precision@k and Recall@k matrices (Queries x Cutoffs)
+        """
+        hits = np.stack([self.take_at(self.relevant_hits, self.cutoff_lengths(k)) for k in ks], axis=1)
+        precision = hits / np.array(ks, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            recall = np.where(self.gt_counts[:, np.newaxis] > 0, hits / self.gt_counts[:, np.newaxis], 0.0)
+        return precision, recall
+
+    def average_precision(self) -> np.ndarray:
+        """
+        Calculate Average Precision of All Queries Over Their Whole Result Lists
+        :return: Average precision of each query
+        """
+        precision_at_rank = self.relevant_hits / np.arange(1, self.max_length + 1)
+        precision_sum = np.cumsum(precision_at_rank * self.relevant, axis=1)[:, -1]
+        relevant_count = self.take_at(self.relevant_hits, self.result_lengths)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where((self.gt_counts > 0) & (relevant_count > 0), precision_sum / relevant_count, 0.0)
+
+    def mean_average_precision(self) -> float:
+        """
+        Mean of the Average Precision of All Queries
+        :return: MAP
+        """
+        return float(self.average_precision().mean()) if self.num_queries > 0 else 0.0
+
+    def ndcg_at_k(self, ks:list = (None,)) -> np.ndarray:
+        """
+        Compute Normalized Discounted Cumulative Gain of All Queries for Several Cutoffs
+        :param ks: Cutoffs, None considers every result like compute_ndcg_with_ratings
+        :return: nDCG matrix (Queries x Cutoffs)
+        """
+        ndcg = []
+        for k in ks:
+            result_counts = self.cutoff_lengths(k)
+            dcg = self.take_at(self.dcg, result_counts)
+            idcg = self.take_at(self.idcg, np.minimum(self.gt_lengths, result_counts))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ndcg.append(np.where(idcg > 0, dcg / idcg, 0.0))
+        return np.stack(ndcg, axis=1)
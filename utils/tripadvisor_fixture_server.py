@@ -0,0 +1,222 @@
+import argparse
+import html
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+import pandas as pd
+
+REVIEWS_PER_PAGE = 10
+REVIEW_PAGE_PATTERN = re.compile(r"^/Restaurant_Review-g0-d(\d+)-Reviews-(?:or(\d+)-)?[^/]*\.html$")
+
+PAGE_STYLE = """<style>
+.noQuotes, .partial_entry { white-space: pre-wrap; }
+#onetrust-banner-sdk { position: fixed; bottom: 0; width: 100%; background: #eee; }
+</style>"""
+
+COOKIE_BANNER = """<div id="onetrust-banner-sdk"><button id="onetrust-accept-btn-handler"
+onclick="document.getElementById('onetrust-banner-sdk').style.display = 'none'">Accept</button></div>"""
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Fixture TripAdvisor</title>{style}</head><body>
+<div class="slvrn Z0 Wh EcFTp"><form class="hZNMq o" action="/Search" method="get" autocomplete="off"><input
+id="search_input" type="search" name="q"></form></div>
+<div id="typeahead_results" class="ROqMU"></div>
+{cookie_banner}
+<script>
+const searchInput = document.getElementById('search_input');
+searchInput.addEventListener('input', () => {{
+    const query = searchInput.value;
+    fetch('/typeahead?q=' + encodeURIComponent(query)).then(response => response.text()).then(results => {{
+        // Responses of Earlier Keystrokes are Dropped
+        if (searchInput.value === query) {{
+            document.getElementById('typeahead_results').innerHTML = results;
+        }}
+    }});
+}});
+</script>
+</body></html>"""
+
+REVIEW_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{name}</title>{style}</head><body>
+<h1>{name}</h1>
+{reviews}
+<div class="pageNumbers"><a class="{next_classes}" href="{next_href}">Next</a></div>
+{cookie_banner}
+</body></html>"""
+
+REVIEW_CONTAINER = """<div class="review-container"><div class="member_info"><div class="info_text pointer_cursor"><div
+>{user}</div></div></div><span class="ui_bubble_rating bubble_{rating}"></span><span class="ratingDate"
+title="{date}">Reviewed {date}</span><a class="title"><span class="noQuotes">{title}</span></a><p
+class="partial_entry">{text}</p></div>"""
+
+
+def restaurant_slug(restaurant_name: str) -> str:
+    """
+    URL Part of a Restaurant Name
+    :param restaurant_name: Restaurant name
+    :return: Percent-encoded name with underscores instead of spaces
+    """
+    return quote(restaurant_name.replace(" ", "_"), safe="")
+
+
+class TripadvisorFixtureServer:
+    def __init__(self, restaurants_path: str, reviews_paths: list, pages_path: str = None, host: str = "127.0.0.1",
+                 port: int = 0):
+        """
+        Local HTTP Server that Serves TripAdvisor Pages for Testing the Review Crawler
+        Pages are rendered from saved restaurants and reviews with the markup TripadvisorSiteDriver reads,
+        a page saved under pages_path with the same URL path is served instead
+        :param restaurants_path: Restaurant list (Name, Link) the crawler reads
+        :param reviews_paths: Review files the pages show, in the format of the review generator
+        :param pages_path: Directory of saved pages, e.g. Restaurant_Review-g0-d0-Reviews-Aila.html
+        :param host: Host to listen on
+        :param port: Port to listen on, 0 picks a free port
+        """
+        restaurants = pd.read_csv(restaurants_path)
+        reviews = pd.concat([pd.read_csv(reviews_path, sep="½", dtype=str, keep_default_na=False, engine="python")
+                             for reviews_path in reviews_paths], ignore_index=True)
+        self.restaurant_names = restaurants["Name"].tolist()
+        self.restaurant_locations = [link.split("/")[-3] for link in restaurants["Link"]]
+        self.restaurant_reviews = {name: group for name, group in reviews.groupby("Name", sort=False)}
+        self.search_results = {f"{name} Restaurant {location}": position for position, (name, location)
+                               in enumerate(zip(self.restaurant_names, self.restaurant_locations))}
+        self.pages_path = pages_path
+        self.http_server = ThreadingHTTPServer((host, port), self.__create_handler())
+        self.http_server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.http_server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> str:
+        """
+        Serve in a Background Thread
+        :return: Base URL of the server
+        """
+        self.thread = threading.Thread(target=self.http_server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.http_server.shutdown()
+        self.http_server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def review_page_path(self, position: int, offset: int = 0) -> str:
+        """
+        URL Path of a Review Page, Pages After the First Have the Review Offset as in TripAdvisor
+        :param position: Restaurant position in the restaurant list
+        :param offset: Offset of the first review on the page
+        :return: URL path
+        """
+        offset_part = f"or{offset}-" if offset > 0 else ""
+        return f"/Restaurant_Review-g0-d{position}-Reviews-{offset_part}" \
+               f"{restaurant_slug(self.restaurant_names[position])}.html"
+
+    def render_typeahead(self, query: str) -> str:
+        """
+        Search Suggestions, Only a Query of the Form "Name Restaurant location" Finds the Restaurant
+        :param query: Typed query
+        :return: Suggestion links
+        """
+        position = self.search_results.get(query)
+        if position is None:
+            return '<div class="no_results">No results</div>'
+        return f'<a role="option" class="result" href="{self.review_page_path(position)}">' \
+               f'{html.escape(self.restaurant_names[position])}</a>'
+
+    def render_review_page(self, position: int, offset: int) -> str:
+        """
+        Review Page of a Restaurant with REVIEWS_PER_PAGE Reviews, the Next Link is Disabled on the Last Page
+        :param position: Restaurant position in the restaurant list
+        :param offset: Offset of the first review on the page
+        :return: HTML page
+        """
+        restaurant_name = self.restaurant_names[position]
+        reviews = self.restaurant_reviews.get(restaurant_name)
+        num_reviews = 0 if reviews is None else len(reviews)
+        page_reviews = [] if reviews is None else \
+            reviews.iloc[offset:offset + REVIEWS_PER_PAGE].to_dict("records")
+        review_containers = "\n".join(REVIEW_CONTAINER.format(
+            user=html.escape(review["User"]), rating=html.escape(review["Rating"]), date=html.escape(review["Date"]),
+            title=html.escape(review["Title"]), text=html.escape(review["Text"])) for review in page_reviews)
+        has_next_page = offset + REVIEWS_PER_PAGE < num_reviews
+        return REVIEW_PAGE.format(name=html.escape(restaurant_name), style=PAGE_STYLE, reviews=review_containers,
+                                  next_classes="nav next ui_button primary" + ("" if has_next_page else " disabled"),
+                                  next_href=self.review_page_path(position, offset + REVIEWS_PER_PAGE)
+                                  if has_next_page else "#",
+                                  cookie_banner=COOKIE_BANNER)
+
+    def render(self, path: str, query: dict):
+        """
+        Page of a Request Path
+        :param path: URL path
+        :param query: Parsed query string
+        :return: (status, HTML)
+        """
+        if self.pages_path is not None:
+            saved_page_path = os.path.join(self.pages_path, unquote(path).lstrip("/") or "index.html")
+            if os.path.isfile(saved_page_path):
+                with open(saved_page_path, encoding="utf-8") as saved_page_file:
+                    return 200, saved_page_file.read()
+        if path == "/":
+            return 200, HOME_PAGE.format(style=PAGE_STYLE, cookie_banner=COOKIE_BANNER)
+        if path == "/typeahead":
+            return 200, self.render_typeahead(query.get("q", [""])[0])
+        match = REVIEW_PAGE_PATTERN.match(path)
+        if match is not None and int(match.group(1)) < len(self.restaurant_names):
+            return 200, self.render_review_page(int(match.group(1)), int(match.group(2) or 0))
+        return 404, "<html><body>Not Found</body></html>"
+
+    def __create_handler(self):
+        fixture_server = self
+
+        class FixtureRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, page = fixture_server.render(url.path, parse_qs(url.query))
+                body = page.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return FixtureRequestHandler
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--restaurants_path", type=str, default="../data/raw_data/restaurants_list.csv",
+                        help="Restaurant list the crawler reads.")
+    parser.add_argument("--reviews_paths", type=str, nargs="+", default=["../data/raw_data/restaurant_reviews.csv"],
+                        help="Saved reviews the pages show.")
+    parser.add_argument("--pages_path", type=str, default=None, help="Directory of saved TripAdvisor pages.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = get_args()
+    fixture_server = TripadvisorFixtureServer(args.restaurants_path, args.reviews_paths, pages_path=args.pages_path,
+                                              port=args.port)
+    print(f"Serving TripAdvisor fixture pages at {fixture_server.url}")
+    try:
+        fixture_server.http_server.serve_forever()
+    except KeyboardInterrupt:
+        fixture_server.http_server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,27 +6,58 @@ from selenium.webdriver.common.keys import Keys
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
+
+TRIPADVISOR_URL = "https://www.tripadvisor.com/"
+REVIEW_CONTAINER_XPATH = ".//div[@class='review-container']"
+SEARCH_RESULTS_XPATH = ".//div[@class='ui_columns is-multiline is-mobile']"
 
 
 class TripadvisorSiteDriver:
 
-    def __init__(self) -> None:
+    def __init__(self, base_url: str = TRIPADVISOR_URL, headless: bool = False, wait_seconds: float = 10) -> None:
+        """
+        Selenium Driver of the TripAdvisor Site, Page Changes are Awaited with Explicit Waits
+        :param base_url: Site address, a local fixture server can be given for testing
+        :param headless: Run Chrome without a window
+        :param wait_seconds: Maximum time an explicit wait waits for its condition
+        """
         self.driver = None
         self.cookies_accepted = False
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.headless = headless
+        self.wait_seconds = wait_seconds
 
     def open_driver(self):
-        self.driver = webdriver.Chrome(ChromeDriverManager().install())
+        options = webdriver.ChromeOptions()
+        if self.headless:
+            options.add_argument("--headless=new")
+        self.driver = webdriver.Chrome(ChromeDriverManager().install(), options=options)
 
     def close_driver(self):
-        self.driver.close()
+        self.driver.quit()
+
+    def __wait_until(self, condition, wait_seconds: float = None):
+        """
+        Wait Until the Condition Holds Instead of Sleeping a Fixed Time
+        :param condition: Expected condition
+        :param wait_seconds: Maximum wait, default is the driver's wait time
+        :return: Value returned by the condition
+        """
+        return WebDriverWait(self.driver, wait_seconds if wait_seconds is not None else self.wait_seconds) \
+            .until(condition)
+
+    def __wait_until_loaded(self):
+        """
+        Wait Until the Current Page has Finished Loading
+        :return: None
+        """
+        self.__wait_until(lambda driver: driver.execute_script("return document.readyState") == "complete")
 
     def __goto_tripadvisor_restaurant_link(self, restaurant_name: str, restaurant_location: str):
         """
         Searches a given restaurant in Tripadvisor to get its URL. Returns the URL.
         """
-        self.driver.get("https://www.tripadvisor.com/")
-        self.driver.implicitly_wait(10)
+        self.driver.get(self.base_url)
 
         # Accept cookies if necessary
         try:
@@ -38,29 +69,27 @@ class TripadvisorSiteDriver:
             pass
 
         # Search restaurant in the search box, and get the link of the first result
-        element_form = element_form = self.driver.find_element_by_xpath(
-            ".//div[contains(@class, 'slvrn Z0 Wh EcFTp')]"). \
+        element_form = self.__wait_until(EC.presence_of_element_located(
+            (By.XPATH, ".//div[contains(@class, 'slvrn Z0 Wh EcFTp')]"))). \
             find_element_by_xpath(".//form[contains(@class, 'hZNMq o') and @action='/Search']")
         element_input = element_form.find_element_by_xpath("input")
         element_input.click()
         element_input.send_keys(restaurant_name + " Restaurant " + restaurant_location)
-        time.sleep(1)
         # element_results = WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((By.ID, "typeahead_results")))
-        top_result = WebDriverWait(self.driver, 10).until(EC.element_to_be_clickable(
+        top_result = self.__wait_until(EC.element_to_be_clickable(
             (By.XPATH, ".//a[contains(@role, 'option') and contains(@href, 'Restaurant_Review')]")))
         # element_results = self.driver.find_element_by_xpath(".//div[contains(@id, 'typeahead_results') and contains(@class, 'ROqMU')]")
         # top_result = element_results.find_elements_by_xpath("a")[0]
         top_result.click()
+        self.__wait_until(EC.url_contains("Restaurant_Review"))
+        self.__wait_until_loaded()
 
-    def __get_resturant_reviews(self, num_pages: int):
+    def __get_resturant_reviews(self, num_pages: int, review_lists: list):
         """
-        Reads review title, date, rating and text from Tripadvisor and returns corresponding lists.
+        Reads review title, date, rating and text from Tripadvisor and appends them to the given lists.
+        Each page waits for its reviews, a page whose reviews do not appear raises a timeout
         """
-        review_titles = []
-        review_users = []
-        review_dates = []
-        review_ratings = []
-        review_texts = []
+        review_titles, review_users, review_dates, review_ratings, review_texts = review_lists
 
         # Accept cookies
         try:
@@ -71,43 +100,36 @@ class TripadvisorSiteDriver:
         except:
             pass
 
-        try:
-            for i in range(0, num_pages):
-                # expand the review
-                container = self.driver.find_elements_by_xpath(".//div[@class='review-container']")
-                for j in range(len(container)):
-                    title = container[j].find_element_by_xpath(".//span[@class='noQuotes']").text
-                    user = container[j].find_element_by_xpath(
-                        ".//div[contains(@class,'info_text pointer_cursor')]").find_element_by_xpath(
-                        "div").get_attribute("innerText")
-                    date = container[j].find_element_by_xpath(".//span[contains(@class, 'ratingDate')]").get_attribute(
-                        "title")
-                    rating = container[j].find_element_by_xpath(
-                        ".//span[contains(@class, 'ui_bubble_rating bubble_')]").get_attribute("class").split("_")[3]
-                    review_text = container[j].find_element_by_xpath(".//p[@class='partial_entry']").text.replace("\n",
-                                                                                                                  " ")
-
-                    review_titles.append(title)
-                    review_users.append(user)
-                    review_dates.append(date)
-                    review_ratings.append(rating)
-                    review_texts.append(review_text)
-
-                # change the page
-                try:
-                    next_page_element = WebDriverWait(self.driver, 1).until(EC.presence_of_element_located(
-                        (By.XPATH, ".//a[contains(@class,'nav next ui_button primary')]")))
-                    if not "disabled" in next_page_element.get_attribute("class"):
-                        next_page_element.click()
-                        time.sleep(2)
-                    else:
-                        break
-                except:
-                    break
-        except:
-            return [review_titles, review_users, review_dates, review_ratings, review_texts]
-
-        return [review_titles, review_users, review_dates, review_ratings, review_texts]
+        for i in range(0, num_pages):
+            # Reviews may Render After the Page is Loaded, Reading Before They Appear Would Lose Them
+            container = self.__wait_until(EC.presence_of_all_elements_located((By.XPATH, REVIEW_CONTAINER_XPATH)))
+            for j in range(len(container)):
+                title = container[j].find_element_by_xpath(".//span[@class='noQuotes']").text
+                user = container[j].find_element_by_xpath(
+                    ".//div[contains(@class,'info_text pointer_cursor')]").find_element_by_xpath(
+                    "div").get_attribute("innerText")
+                date = container[j].find_element_by_xpath(".//span[contains(@class, 'ratingDate')]").get_attribute(
+                    "title")
+                rating = container[j].find_element_by_xpath(
+                    ".//span[contains(@class, 'ui_bubble_rating bubble_')]").get_attribute("class").split("_")[3]
+                review_text = container[j].find_element_by_xpath(".//p[@class='partial_entry']").text.replace("\n",
+                                                                                                              " ")
+
+                review_titles.append(title)
+                review_users.append(user)
+                review_dates.append(date)
+                review_ratings.append(rating)
+                review_texts.append(review_text)
+
+            # change the page
+            next_page_elements = self.driver.find_elements_by_xpath(
+                ".//a[contains(@class,'nav next ui_button primary')]")
+            if len(next_page_elements) == 0 or \
+                    "disabled" in next_page_elements[0].get_attribute("class"):
+                break
+            next_page_elements[0].click()
+            # The Next Page is Loaded When the Reviews of this Page are Detached
+            self.__wait_until(EC.staleness_of(container[0]))
 
 
     def get_query_results(self, query: str, num_pages: int):
@@ -116,8 +138,7 @@ class TripadvisorSiteDriver:
         """
 
         query_results = []
-        self.driver.get("https://www.tripadvisor.com/")
-        self.driver.implicitly_wait(10)
+        self.driver.get(self.base_url)
 
         # Accept cookies
         try:
@@ -126,16 +147,16 @@ class TripadvisorSiteDriver:
                 cookie_accept_element.click()
         except:
             pass
-        time.sleep(1)
 
         # Enter query in the search box
+        self.__wait_until(EC.element_to_be_clickable((By.XPATH, ".//div[contains(@class, 'slvrn Z0 Wh EcFTp')]")))
         element_form = self.driver.find_element_by_xpath(".//div[contains(@class, 'slvrn Z0 Wh EcFTp')]"). \
             find_element_by_xpath(".//form[contains(@class, 'hZNMq o') and @action='/Search']")
         element_input = element_form.find_element_by_xpath("input")
         element_input.click()
         element_input.send_keys("{}".format(query))
         element_input.send_keys(Keys.ENTER)
-        time.sleep(3)
+        self.__wait_until(EC.presence_of_element_located((By.XPATH, ".//div[contains(@class, 'slvrn Z0 Wh UfhjQ')]")))
 
         # Accept cookies
         try:
@@ -144,7 +165,6 @@ class TripadvisorSiteDriver:
                 cookie_accept_element.click()
         except:
             pass
-        time.sleep(1)
 
         # Enter query in the search box
         element_form = self.driver.find_element_by_xpath(
@@ -155,7 +175,8 @@ class TripadvisorSiteDriver:
         element_input.clear()
         element_input.send_keys("michelin star restaurants {}".format(query))
         element_input.send_keys(Keys.ENTER)
-        time.sleep(3)
+        self.__wait_until(EC.staleness_of(element_input))
+        self.__wait_until(EC.presence_of_element_located((By.XPATH, SEARCH_RESULTS_XPATH)))
 
         # Click "Show More" button
         try:
@@ -165,26 +186,18 @@ class TripadvisorSiteDriver:
         except:
             pass
 
-        self.driver.implicitly_wait(0)
         # For a pre-determined number of pages, get titles and ratings of the restaurants
         for i in range(num_pages):
             # Get results and ratings
             try:
-                all_results_div_element = self.driver.find_element_by_xpath(
-                    ".//div[@class='ui_columns is-multiline is-mobile']")
+                all_results_div_element = self.driver.find_element_by_xpath(SEARCH_RESULTS_XPATH)
             except:
                 break
             results = all_results_div_element.find_elements_by_xpath(
                 ".//div[@class='prw_rup prw_search_search_result_poi']")
 
             for result in results:
-                michelin_title = False
-                try:
-                    michelin_title_element = WebDriverWait(result, 0.05).until(
-                        EC.presence_of_element_located((By.XPATH, ".//div[@class='michelin-title']")))
-                    michelin_title = True
-                except:
-                    pass
+                michelin_title = len(result.find_elements_by_xpath(".//div[@class='michelin-title']")) > 0
                 if michelin_title:
                     title = result.find_element_by_xpath(".//div[@class='result-title']").find_element_by_xpath(
                         "span").get_attribute("innerText")
@@ -194,35 +207,45 @@ class TripadvisorSiteDriver:
                     query_results.append((title, rating))
 
             # Change the page
-            try:
-                next_page_element = WebDriverWait(self.driver, 1).until(
-                    EC.presence_of_element_located((By.XPATH, ".//a[contains(@class,'ui_button nav next primary')]")))
-                if not "disabled" in next_page_element.get_attribute("class"):
-                    next_page_element.click()
-                    time.sleep(2)
-                else:
-                    break
-            except:
+            next_page_elements = self.driver.find_elements_by_xpath(
+                ".//a[contains(@class,'ui_button nav next primary')]")
+            if len(next_page_elements) == 0 or "disabled" in next_page_elements[0].get_attribute("class"):
                 break
-
-            time.sleep(2)
-
-        self.driver.implicitly_wait(5)
+            next_page_elements[0].click()
+            self.__wait_until(EC.staleness_of(all_results_div_element))
+            self.__wait_until(EC.presence_of_element_located((By.XPATH, SEARCH_RESULTS_XPATH)))
 
         return query_results
 
-    def get_reviews_ratings(self, restaurant_name: str, restaurant_location: str, num_pages: int):
-        review_titles = []
-        review_users = []
-        review_dates = []
-        review_ratings = []
-        review_texts = []
+    def crawl_reviews_ratings(self, restaurant_name: str, restaurant_location: str, num_pages: int,
+                              review_lists: list = None):
+        """
+        Reads the Reviews of a Restaurant, Unlike get_reviews_ratings Any Failure is Raised
+        so that a crawler can retry the restaurant
+        :param restaurant_name: Restaurant name
+        :param restaurant_location: Restaurant location used in the search
+        :param num_pages: Number of review pages
+        :param review_lists: Five lists the reviews are appended to, they keep the pages read before a failure
+        :return: Review titles, users, dates, ratings and texts
+        """
+        review_lists = review_lists if review_lists is not None else [[], [], [], [], []]
+        self.__goto_tripadvisor_restaurant_link(restaurant_name=restaurant_name,
+                                                restaurant_location=restaurant_location)
+        self.__get_resturant_reviews(num_pages=num_pages, review_lists=review_lists)
+        return tuple(review_lists)
 
+    def get_reviews_ratings(self, restaurant_name: str, restaurant_location: str, num_pages: int):
+        """
+        Reads the Reviews of a Restaurant, a Failure is Printed and the Reviews of the Pages Read Before it are Kept
+        :param restaurant_name: Restaurant name
+        :param restaurant_location: Restaurant location used in the search
+        :param num_pages: Number of review pages
+        :return: Review titles, users, dates, ratings and texts
+        """
+        review_lists = [[], [], [], [], []]
         try:
-            self.__goto_tripadvisor_restaurant_link(restaurant_name=restaurant_name,
-                                                    restaurant_location=restaurant_location)
-            review_titles, review_users, review_dates, review_ratings, review_texts = self.__get_resturant_reviews(
-                num_pages=num_pages)
-        except:
-            return review_titles, review_users, review_dates, review_ratings, review_texts
-        return review_titles, review_users, review_dates, review_ratings, review_texts
\ No newline at end of file
+            self.crawl_reviews_ratings(restaurant_name=restaurant_name, restaurant_location=restaurant_location,
+                                       num_pages=num_pages, review_lists=review_lists)
+        except Exception as error:
+            print(f"{restaurant_name}: reviews could not be read after {len(review_lists[0])} reviews, {error!r}")
+        return tuple(review_lists)